@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import json
+from bisect import bisect_right
+from itertools import accumulate
+from pathlib import Path
+from typing import *
+
+import constants
+from exceptions import DecoderFailed
+from information import decode_information
+from typing_types import JsonSerializable, PathStr
+from utils import pstr
+
+
+def get_index_path(video: PathStr) -> Path:
+    """Returns the path of the sidecar index of a video"""
+    video = pstr(video)
+    return video.with_name(video.name + constants.INDEX_SUFFIX)
+
+
+def get_video_position(chunk: int, parity_frames: int = 0, group_size: int = constants.ERASURE_GROUP_SIZE) -> int:
+    """Returns the position of a data frame in the video, parity frames are placed after every group"""
+    return chunk + (chunk // group_size) * parity_frames
+
+
+def iter_packages(data: str) -> Generator[Tuple[int, int, JsonSerializable, str], None, None]:
+    """Yields the start, end, information and encoder id of every package in raw data"""
+    position = 0
+    
+    while (end := data.find(constants.FULL_DELIMITER, position)) != -1:
+        _, encoded_information, encoder = data[position:end].split(constants.DELIMITER)
+        
+        yield position, end + 1, decode_information(encoded_information), encoder
+        position = end + 1
+
+
+def create_index(
+        chunks: List[str],
+        archive_id: str,
+        *,
+        parity_frames: int = 0,
+        group_size: int = constants.ERASURE_GROUP_SIZE,
+) -> JsonSerializable:
+    """
+    Creates the index of an archive, mapping every package to the frames it`s stored in.
+    
+    :param chunks: The split data (without frame headers)
+    :param archive_id: The archive id of the frame headers
+    :param parity_frames: Amount of parity frames per group
+    :param group_size: Amount of data frames per group
+    :return: The index
+    """
+    offsets = [0, *accumulate(len(chunk) for chunk in chunks)]
+    packages = []
+    
+    for number, (start, end, information, encoder) in enumerate(iter_packages("".join(chunks))):
+        first_chunk = bisect_right(offsets, start) - 1
+        last_chunk = bisect_right(offsets, end - 1) - 1
+        
+        packages.append({
+            "path": information.get("path"),
+            "package": number,
+            "encoder": encoder,
+            "first_frame": get_video_position(first_chunk, parity_frames, group_size),
+            "last_frame": get_video_position(last_chunk, parity_frames, group_size),
+            "first_chunk": first_chunk,
+            "last_chunk": last_chunk,
+            "start": start - offsets[first_chunk],
+            "end": end - offsets[last_chunk],
+            "offset": start,
+            "length": end - start,
+        })
+    
+    return {
+        "archive_id": archive_id,
+        "total": len(chunks),
+        "parity_frames": parity_frames,
+        "group_size": group_size,
+        "packages": packages,
+    }
+
+
+def write_index(index: JsonSerializable, file: PathStr, *, encoding: str = "utf-8") -> None:
+    file = pstr(file)
+    
+    with file.open("w", encoding=encoding) as file:
+        json.dump(index, file, separators=(",", ":"))
+
+
+def read_index(file: PathStr, *, encoding: str = "utf-8") -> JsonSerializable:
+    file = pstr(file)
+    
+    if not file.exists():
+        raise DecoderFailed(f'Index "{file}" not found!')
+    
+    with file.open("r", encoding=encoding) as file:
+        return json.load(file)
+
+
+def find_index(video: PathStr) -> Optional[JsonSerializable]:
+    """Returns the sidecar index of a video or None if there`s none"""
+    if (path := get_index_path(video)).exists():
+        return read_index(path)
+    return None
+
+
+def merge_package_ranges(packages: Iterable[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Groups packages that share or touch frames, so every frame only needs to be decoded once"""
+    groups = []
+    
+    for package in sorted(packages, key=lambda x: x["first_chunk"]):
+        if groups and package["first_chunk"] <= groups[-1][-1]["last_chunk"] + 1:
+            groups[-1].append(package)
+        else:
+            groups.append([package])
+    
+    return groups
@@ -0,0 +1,913 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import json
+import random
+import shutil
+import string
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from itertools import chain, product
+from multiprocessing import get_context
+from pathlib import Path
+from typing import *
+
+import qrcode
+
+import constants
+import decode
+from archive_index import create_index
+from decode import HandleDataExtractor
+from encode import FileDataInsertor
+from exceptions import EncoderFailed
+from frame_header import add_frame_headers, create_archive_id
+from frame_store import get_frame_path
+from typing_types import JsonSerializable, Kwargs, PathStr
+from utils import pstr
+
+if TYPE_CHECKING:
+    from cv2.cv2 import VideoCapture
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the peak memory usage isn`t measured there
+    resource = None
+
+# Name: (amount of small text files, size of a small file, amount of large binaries, size of a large binary)
+CORPORA = {
+    "small": (200, 2 * 1024, 0, 0),
+    "large": (0, 0, 3, 256 * 1024),
+    "mixed": (60, 2 * 1024, 2, 128 * 1024),
+    # A short payload, used by the autotuner
+    "sample": (16, 2 * 1024, 1, 16 * 1024),
+}
+# The encode settings the decoder is benchmarked with, every combination is used
+DECODE_MATRIX = {
+    "version": [1],
+    "error_correction": ["L"],
+    "box_size": [3],
+    "chunk_size": [constants.DATA_CHUNK_SIZE],
+    "codec": ["libx264", "ffv1"],
+    "preset": ["slower"],
+}
+ERROR_CORRECTIONS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+# Only these codecs know the "-preset" option
+PRESET_CODECS = {"libx264", "libx265"}
+DECODE_METHODS = ("decode_video", "decode_video_instantly", "handle_video_instantly")
+# The ffmpeg settings the autotuner tries, every combination is used. None uses the default of the codec.
+AUTOTUNE_MATRIX = {
+    "codec": ["libx264", "libx265", "ffv1"],
+    "preset": ["ultrafast", "medium", "slower"],
+    "crf": [None, 0],
+    "pix_fmt": [None, "gray"],
+}
+# Only these codecs know the "-crf" option
+CRF_CODECS = {"libx264", "libx265", "libvpx-vp9"}
+# The command line modules and the modules imported by worker processes
+STARTUP_MODULES = ("qr_encoder", "qr_decoder", "qr_merge", "qr_benchmark", "encode", "decode")
+# These must only be imported by the code paths that need them
+HEAVY_MODULES = ("cv2", "numpy", "pyzbar", "tqdm", "magic")
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+@contextmanager
+def timed(results: Dict[str, float], name: str):
+    """Adds the run time of the block to `results[name]`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[name] = results.get(name, 0.0) + time.perf_counter() - start
+
+
+def get_rate(amount: float, seconds: float) -> Optional[float]:
+    return amount / seconds if seconds > 0 else None
+
+
+def create_corpus(name: str, folder: PathStr, *, scale: float = 1.0, seed: int = 0) -> List[Path]:
+    """
+    Creates the files of a synthetic corpus (see `CORPORA`) inside `folder`. The same seed always creates the same
+    files.
+    
+    :param name: The name of the corpus.
+    :param folder: The folder the files should be created in, it`ll be created if necessary.
+    :param scale: Multiplies the amount of files.
+    :param seed: Seed of the random content.
+    :return: The created files
+    """
+    small_amount, small_size, large_amount, large_size = CORPORA[name]
+    folder = pstr(folder)
+    generator = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + " \n"
+    files = []
+    
+    for number in range(int(small_amount * scale)):
+        path = folder.joinpath(name, f"text-{number % 10}", f"file-{number}.txt")
+        path.parent.mkdir(exist_ok=True, parents=True)
+        path.write_text("".join(generator.choices(alphabet, k=small_size)), encoding="utf-8")
+        files.append(path)
+    
+    for number in range(max(int(large_amount * scale), 1 if large_amount else 0)):
+        path = folder.joinpath(name, "binary", f"blob-{number}.bin")
+        path.parent.mkdir(exist_ok=True, parents=True)
+        path.write_bytes(generator.getrandbits(large_size * 8).to_bytes(large_size, "little"))
+        files.append(path)
+    
+    return files
+
+
+def benchmark_encode_stages(
+        files: List[Path],
+        temp: PathStr,
+        *,
+        frame_opts: Optional[Kwargs] = None,
+        ffmpeg_location: Path = Path("ffmpeg"),
+        ffmpeg_opts: Optional[Kwargs] = None,
+) -> JsonSerializable:
+    """
+    Runs every stage of the encoder on its own (in a single process) and measures how long it takes.
+    
+    :param files: The files to encode.
+    :param temp: Folder for the frames and the video, it`ll be emptied.
+    :param frame_opts: Options for the qrcode generator.
+    :param ffmpeg_location: Path to the ffmpeg executable.
+    :param ffmpeg_opts: Options for ffmpeg.
+    :return: The amount of bytes and frames and the seconds of every stage
+    """
+    temp = pstr(temp)
+    if temp.exists():
+        shutil.rmtree(temp)
+    temp.mkdir(parents=True)
+    use_opts = {**constants.DEFAULT_OPTS, **(frame_opts or {})}
+    seconds: Dict[str, float] = {}
+    size = 0
+    
+    with timed(seconds, "ingestion"):
+        for file in files:
+            with file.open("rb") as opened:
+                size += len(opened.read())
+    
+    with timed(seconds, "encoding"):
+        data = "".join(FileDataInsertor.get_encoded_data(file) for file in files)
+    
+    with timed(seconds, "chunking"):
+        chunks = FileDataInsertor.split_data(data)
+        archive_id = create_archive_id()
+        create_index(chunks, archive_id)
+        chunks = add_frame_headers(chunks, archive_id)
+    
+    for index, chunk in enumerate(chunks):
+        with timed(seconds, "matrix"):
+            qr = qrcode.QRCode(**use_opts)
+            qr.add_data(chunk)
+            qr.make(fit=True)
+        with timed(seconds, "rasterization"):
+            image = qr.make_image()
+        with timed(seconds, "png"):
+            path = get_frame_path(temp, index)
+            path.parent.mkdir(exist_ok=True)
+            image.save(path, compress_level=constants.TEMP_PNG_COMPRESS_LEVEL)
+    
+    use_ffmpeg_opts = {**constants.DEFAULT_FFMPEG_OPTS, **(ffmpeg_opts or {})}
+    with timed(seconds, "ffmpeg"):
+        FileDataInsertor.run_ffmpeg(
+            temp, temp.joinpath("video.avi"), len(chunks), ffmpeg_location,
+            chain.from_iterable(use_ffmpeg_opts.items()), quiet=True
+        )
+    
+    return {
+        "bytes": size,
+        "encoded_bytes": len(data),
+        "frames": len(chunks),
+        "seconds": seconds,
+    }
+
+
+def benchmark_encode_end_to_end(
+        files: List[Path],
+        temp: PathStr,
+        *,
+        threads: Optional[int] = None,
+        video_opts: Optional[Kwargs] = None,
+) -> float:
+    """Runs `FileDataInsertor.encode_multiple` and returns how many seconds it took"""
+    temp = pstr(temp)
+    if temp.exists():
+        shutil.rmtree(temp)
+    temp.mkdir(parents=True)
+    
+    start = time.perf_counter()
+    FileDataInsertor.encode_multiple(
+        files, temp.joinpath("video.avi"),
+        video_opts={"temp": temp.joinpath("frames"), "clear_temp": True, "threads": threads, **(video_opts or {})}
+    )
+    return time.perf_counter() - start
+
+
+def run_encode_benchmark(
+        folder: PathStr,
+        corpora: Iterable[str] = tuple(CORPORA),
+        *,
+        scale: float = 1.0,
+        seed: int = 0,
+        threads: Optional[int] = None,
+        ffmpeg_location: Path = Path("ffmpeg"),
+) -> JsonSerializable:
+    """
+    Benchmarks the encoder with synthetic corpora.
+    
+    :param folder: Working folder, the corpora and the videos are created inside it.
+    :param corpora: The names of the corpora to use, see `CORPORA`.
+    :param scale: Multiplies the amount of files of every corpus.
+    :param seed: Seed of the corpora.
+    :param threads: Amount of processes used to create the frames in the end-to-end run.
+    :param ffmpeg_location: Path to the ffmpeg executable.
+    :return: The results, bytes/s and frames/s per corpus and stage
+    """
+    folder = pstr(folder)
+    results = {}
+    
+    for name in corpora:
+        files = create_corpus(name, folder.joinpath("corpora"), scale=scale, seed=seed)
+        stages = benchmark_encode_stages(files, folder.joinpath("stages"), ffmpeg_location=ffmpeg_location)
+        end_to_end = benchmark_encode_end_to_end(
+            files, folder.joinpath("end_to_end"), threads=threads, video_opts={"ffmpeg_location": ffmpeg_location}
+        )
+        
+        results[name] = {
+            "files": len(files),
+            "bytes": stages["bytes"],
+            "encoded_bytes": stages["encoded_bytes"],
+            "frames": stages["frames"],
+            "stages": {
+                stage: {
+                    "seconds": seconds,
+                    "bytes_per_second": get_rate(stages["bytes"], seconds),
+                    "frames_per_second": get_rate(stages["frames"], seconds),
+                }
+                for stage, seconds in stages["seconds"].items()
+            },
+            "end_to_end": {
+                "seconds": end_to_end,
+                "bytes_per_second": get_rate(stages["bytes"], end_to_end),
+                "frames_per_second": get_rate(stages["frames"], end_to_end),
+            },
+        }
+    
+    return {
+        "benchmark": "encode",
+        "scale": scale,
+        "seed": seed,
+        "results": results,
+    }
+
+
+class TimedCapture:
+    """Wraps a `VideoCapture` (or `FFmpegCapture`) and adds the time spent reading frames to `seconds["reading"]`"""
+    
+    def __init__(self, cap: "VideoCapture", seconds: Dict[str, float]):
+        self.cap = cap
+        self.seconds = seconds
+    
+    def read(self):
+        with timed(self.seconds, "reading"):
+            return self.cap.read()
+    
+    def __getattr__(self, name: str):
+        return getattr(self.cap, name)
+
+
+@contextmanager
+def timed_pyzbar(seconds: Dict[str, float]):
+    """Adds the time spent in pyzbar by the decoder to `seconds["pyzbar"]`"""
+    original = decode.decode_pyzbar
+    
+    def timed_decode(*args, **kwargs):
+        with timed(seconds, "pyzbar"):
+            return original(*args, **kwargs)
+    
+    decode.decode_pyzbar = timed_decode
+    try:
+        yield
+    finally:
+        decode.decode_pyzbar = original
+
+
+def get_peak_memory() -> Optional[int]:
+    """Returns the peak resident set size of the current process in bytes, None if it can`t be measured"""
+    if resource is None:
+        return None
+    
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_decode_cases(matrix: Optional[Dict[str, List[Any]]] = None) -> List[Kwargs]:
+    """Returns every combination of the encode settings in `matrix` (see `DECODE_MATRIX`), missing keys use defaults"""
+    matrix = {**DECODE_MATRIX, **(matrix or {})}
+    cases = []
+    
+    for values in product(*matrix.values()):
+        case = dict(zip(matrix, values))
+        if case["codec"] not in PRESET_CODECS:
+            case["preset"] = None
+        if case not in cases:
+            cases.append(case)
+    
+    return cases
+
+
+def get_case_name(case: Kwargs) -> str:
+    name = f'v{case["version"]}-{case["error_correction"]}-b{case["box_size"]}-c{case["chunk_size"]}-{case["codec"]}'
+    return name if case["preset"] is None else f'{name}-{case["preset"]}'
+
+
+def encode_decode_case(
+        files: List[Path],
+        output: Path,
+        case: Kwargs,
+        *,
+        threads: Optional[int] = None,
+        ffmpeg_location: Path = Path("ffmpeg"),
+) -> int:
+    """Encodes `files` into `output` using the settings of a decode case and returns the amount of frames"""
+    data = "".join(FileDataInsertor.get_encoded_data(file) for file in files)
+    chunks = FileDataInsertor.split_data(data, case["chunk_size"])
+    ffmpeg_opts = {"-vcodec": case["codec"]}
+    if case["preset"] is not None:
+        ffmpeg_opts["-preset"] = case["preset"]
+    
+    FileDataInsertor.create_video(
+        chunks, output,
+        temp=output.parent.joinpath("frames"),
+        clear_temp=True,
+        ffmpeg_location=ffmpeg_location,
+        ffmpeg_opts=ffmpeg_opts,
+        threads=threads,
+        frame_opts={
+            "version": case["version"],
+            "error_correction": ERROR_CORRECTIONS[case["error_correction"]],
+            "box_size": case["box_size"],
+        },
+    )
+    
+    return len(chunks)
+
+
+def measure_decode(method: str, video: Path, output: Path, crop: bool = True) -> JsonSerializable:
+    """
+    Decodes a video using one of `DECODE_METHODS` and measures the time spent reading frames, in pyzbar and
+    parsing (everything else, e.g. assembling frames, splitting packages and writing files). Should be run in a
+    fresh process, so the peak memory usage belongs to this decoding only.
+    
+    :param method: The method of `HandleDataExtractor` to benchmark.
+    :param video: The video.
+    :param output: Folder the files are written to by "handle_video_instantly".
+    :param crop: Whether only the region of the QR-Code should be searched, see `RegionOfInterest`.
+    :return: The seconds of every stage, the peak memory usage and the error, if decoding failed
+    """
+    from cv2.cv2 import VideoCapture
+    
+    from roi import RegionOfInterest
+    
+    # Constrain values
+    if method not in DECODE_METHODS:
+        raise ValueError(f'Unknown method "{method}"! Use one of: {", ".join(DECODE_METHODS)}')
+    
+    seconds: Dict[str, float] = {"reading": 0.0, "pyzbar": 0.0}
+    cap = TimedCapture(VideoCapture(str(video)), seconds)
+    roi = RegionOfInterest() if crop else None
+    error = None
+    
+    try:
+        with timed_pyzbar(seconds), timed(seconds, "total"):
+            if method == "decode_video":
+                HandleDataExtractor.decode_video(video, cap=cap, roi=roi)
+            elif method == "decode_video_instantly":
+                for _ in HandleDataExtractor.decode_video_instantly(cap=cap, roi=roi):
+                    pass
+            else:
+                HandleDataExtractor.handle_video_instantly(video, cap=cap, roi=roi, skip_error=False, base_path=output)
+    except Exception as exception:
+        error = f"{type(exception).__name__}: {exception}"
+    finally:
+        cap.release()
+    
+    seconds["parsing"] = max(seconds["total"] - seconds["reading"] - seconds["pyzbar"], 0.0)
+    
+    return {
+        "seconds": seconds,
+        "peak_memory": get_peak_memory(),
+        "error": error,
+    }
+
+
+def run_decode_benchmark(
+        folder: PathStr,
+        corpora: Iterable[str] = ("mixed",),
+        *,
+        matrix: Optional[Dict[str, List[Any]]] = None,
+        methods: Iterable[str] = DECODE_METHODS,
+        crop: bool = True,
+        scale: float = 1.0,
+        seed: int = 0,
+        threads: Optional[int] = None,
+        ffmpeg_location: Path = Path("ffmpeg"),
+) -> JsonSerializable:
+    """
+    Benchmarks the decoder. The corpora are encoded using every combination of the encode settings in `matrix` and
+    every video is decoded using every method in `methods`, each in a fresh process.
+    
+    :param folder: Working folder, the corpora, the videos and the decoded files are created inside it.
+    :param corpora: The names of the corpora to use, see `CORPORA`.
+    :param matrix: The encode settings to use, see `DECODE_MATRIX`. Missing settings use its defaults.
+    :param methods: The decode methods to benchmark, see `DECODE_METHODS`.
+    :param crop: Whether only the region of the QR-Code should be searched, see `RegionOfInterest`.
+    :param scale: Multiplies the amount of files of every corpus.
+    :param seed: Seed of the corpora.
+    :param threads: Amount of processes used to create the frames.
+    :param ffmpeg_location: Path to the ffmpeg executable.
+    :return: The results, bytes/s, frames/s, the seconds of every stage and the peak memory usage per corpus, case
+    and method
+    """
+    folder = pstr(folder)
+    cases = get_decode_cases(matrix)
+    results = {}
+    
+    for name in corpora:
+        files = create_corpus(name, folder.joinpath("corpora"), scale=scale, seed=seed)
+        size = sum(file.stat().st_size for file in files)
+        
+        for case in cases:
+            case_name = f"{name}/{get_case_name(case)}"
+            video = folder.joinpath("videos", *case_name.split("/"), "video.avi")
+            video.parent.mkdir(exist_ok=True, parents=True)
+            frames = encode_decode_case(files, video, case, threads=threads, ffmpeg_location=ffmpeg_location)
+            results[case_name] = {"case": case, "bytes": size, "frames": frames, "video_size": video.stat().st_size}
+            
+            for method in methods:
+                output = folder.joinpath("output", *case_name.split("/"), method)
+                if output.exists():
+                    shutil.rmtree(output)
+                output.mkdir(parents=True)
+                
+                with get_context("spawn").Pool(1) as pool:
+                    measured = pool.apply(measure_decode, (method, video, output, crop))
+                    # Let the process exit on its own, terminating it would leak its semaphores
+                    pool.close()
+                    pool.join()
+                
+                total = measured["seconds"]["total"]
+                results[case_name][method] = {
+                    "seconds": total,
+                    "bytes_per_second": get_rate(size, total) if measured["error"] is None else None,
+                    "frames_per_second": get_rate(frames, total) if measured["error"] is None else None,
+                    "stages": {stage: measured["seconds"][stage] for stage in ("reading", "pyzbar", "parsing")},
+                    "peak_memory": measured["peak_memory"],
+                    "error": measured["error"],
+                }
+    
+    return {
+        "benchmark": "decode",
+        "scale": scale,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def measure_import(module: str, repeat: int = 3) -> Tuple[float, List[str]]:
+    """
+    Imports a module in fresh interpreters and returns the fastest import time (in seconds) and the names of the
+    `HEAVY_MODULES` it imported.
+    """
+    times = []
+    heavy = []
+    
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=str(Path(__file__).parent),
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        seconds, heavy = json.loads(output.decode("utf-8").splitlines()[-1])
+        times.append(seconds)
+    
+    return min(times), heavy
+
+
+def run_startup_benchmark(
+        modules: Iterable[str] = STARTUP_MODULES,
+        *,
+        budget: float = constants.STARTUP_BUDGET,
+        repeat: int = 3,
+) -> JsonSerializable:
+    """
+    Measures how long importing the command line modules and the modules of the worker processes takes and checks
+    that it stays within `budget` and doesn`t import any of the `HEAVY_MODULES`.
+    
+    :param modules: The modules to import.
+    :param budget: Maximum import time in seconds.
+    :param repeat: Every module is imported this many times, the fastest import counts.
+    :return: The results, the import time, the imported heavy modules and whether the module passed per module
+    """
+    results = {}
+    
+    for module in modules:
+        seconds, heavy = measure_import(module, repeat)
+        results[module] = {
+            "seconds": seconds,
+            "heavy_modules": heavy,
+            "passed": seconds <= budget and not heavy,
+        }
+    
+    return {
+        "benchmark": "startup",
+        "budget": budget,
+        "results": results,
+    }
+
+
+def get_autotune_candidates(matrix: Optional[Dict[str, List[Any]]] = None) -> List[Kwargs]:
+    """Returns every combination of the settings in `matrix` (see `AUTOTUNE_MATRIX`), missing keys use defaults"""
+    matrix = {**AUTOTUNE_MATRIX, **(matrix or {})}
+    candidates = []
+    
+    for values in product(*matrix.values()):
+        candidate = dict(zip(matrix, values))
+        if candidate["codec"] not in PRESET_CODECS:
+            candidate["preset"] = None
+        if candidate["codec"] not in CRF_CODECS:
+            candidate["crf"] = None
+        if candidate not in candidates:
+            candidates.append(candidate)
+    
+    return candidates
+
+
+def get_candidate_name(candidate: Kwargs) -> str:
+    name = candidate["codec"]
+    if candidate["preset"] is not None:
+        name += f'-{candidate["preset"]}'
+    if candidate["crf"] is not None:
+        name += f'-crf{candidate["crf"]}'
+    if candidate["pix_fmt"] is not None:
+        name += f'-{candidate["pix_fmt"]}'
+    return name
+
+
+def get_candidate_opts(candidate: Kwargs) -> Dict[str, str]:
+    """Returns the ffmpeg options of a candidate, the options of settings that are None are left out"""
+    opts = {
+        "-vcodec": candidate["codec"],
+        "-preset": candidate["preset"],
+        "-crf": candidate["crf"],
+        "-pix_fmt": candidate["pix_fmt"],
+    }
+    return {key: str(value) for key, value in opts.items() if value is not None}
+
+
+def measure_frames(video: Path, chunks: List[str], crop: bool = True) -> JsonSerializable:
+    """
+    Decodes every frame of a video and counts the frames containing one of the expected `chunks`. Should be run in a
+    fresh process, like `measure_decode`.
+    
+    :return: The seconds it took and the amount of expected chunks that were found
+    """
+    from cv2.cv2 import VideoCapture
+    
+    from roi import RegionOfInterest
+    
+    expected = set(chunks)
+    found = set()
+    seconds: Dict[str, float] = {}
+    cap = VideoCapture(str(video))
+    roi = RegionOfInterest() if crop else None
+    
+    try:
+        with timed(seconds, "total"):
+            success, frame = cap.read()
+            
+            while success:
+                try:
+                    data = HandleDataExtractor.decode_qr(frame, roi=roi)
+                except (IndexError, UnicodeDecodeError):
+                    pass
+                else:
+                    if data in expected:
+                        found.add(data)
+                
+                success, frame = cap.read()
+    finally:
+        cap.release()
+    
+    return {"seconds": seconds["total"], "decoded": len(found)}
+
+
+def get_pareto_front(results: Dict[str, JsonSerializable]) -> List[str]:
+    """
+    Returns the names of the candidates no other candidate beats in every measurement: encode seconds, video size and
+    decode seconds (lower is better) and the success rate (higher is better). Failed candidates are left out.
+    """
+    def get_costs(values: JsonSerializable) -> Tuple[float, ...]:
+        return values["encode_seconds"], values["video_size"], values["decode_seconds"], -values["success_rate"]
+    
+    costs = {name: get_costs(values) for name, values in results.items() if values["error"] is None}
+    
+    return [
+        name
+        for name, cost in costs.items()
+        if not any(
+            other != cost and all(a <= b for a, b in zip(other, cost))
+            for other in costs.values()
+        )
+    ]
+
+
+def get_best_candidate(
+        results: Dict[str, JsonSerializable],
+        front: Iterable[str],
+        min_success_rate: float = constants.AUTOTUNE_MIN_SUCCESS_RATE,
+) -> Optional[str]:
+    """Returns the candidate of the Pareto `front` with the most decodable bytes per second, None if none decodes"""
+    usable = [name for name in front if results[name]["success_rate"] >= min_success_rate]
+    
+    return max(usable, key=lambda name: results[name]["bytes_per_second"] or 0.0, default=None)
+
+
+def run_autotune(
+        folder: PathStr,
+        corpus: str = "sample",
+        *,
+        matrix: Optional[Dict[str, List[Any]]] = None,
+        min_success_rate: float = constants.AUTOTUNE_MIN_SUCCESS_RATE,
+        crop: bool = True,
+        scale: float = 1.0,
+        seed: int = 0,
+        threads: Optional[int] = None,
+        ffmpeg_location: Path = Path("ffmpeg"),
+        frame_opts: Optional[Kwargs] = None,
+) -> JsonSerializable:
+    """
+    Tries the ffmpeg settings of `matrix` on a sample payload and picks the best ones. The frames are created once,
+    then every candidate encodes them using ffmpeg and the video is decoded in a fresh process.
+    
+    The candidates are compared by their encode seconds (ffmpeg only), video size, decode success rate (the share of
+    frames that could be decoded) and decode seconds. The best candidate is the one of the Pareto front with the most
+    decodable bytes per second (the payload size times the success rate, divided by the encode and decode seconds),
+    see `write_ffmpeg_profile`.
+    
+    :param folder: Working folder, the corpus, the frames and the videos are created inside it.
+    :param corpus: The name of the corpus to use, see `CORPORA`.
+    :param matrix: The settings to try, see `AUTOTUNE_MATRIX`. Missing settings use its defaults.
+    :param min_success_rate: Candidates decoding a smaller share of the frames can`t be picked.
+    :param crop: Whether only the region of the QR-Code should be searched, see `RegionOfInterest`.
+    :param scale: Multiplies the amount of files of the corpus.
+    :param seed: Seed of the corpus.
+    :param threads: Amount of processes used to create the frames.
+    :param ffmpeg_location: Path to the ffmpeg executable.
+    :param frame_opts: Optional. Options for the QR-Codes, see `create_frames`.
+    :return: The results, the measurements per candidate, the names of the Pareto front and the best candidate
+    """
+    folder = pstr(folder)
+    files = create_corpus(corpus, folder.joinpath("corpora"), scale=scale, seed=seed)
+    size = sum(file.stat().st_size for file in files)
+    
+    data = "".join(FileDataInsertor.get_encoded_data(file) for file in files)
+    chunks = add_frame_headers(FileDataInsertor.split_data(data), create_archive_id())
+    frames = folder.joinpath("frames")
+    if frames.exists():
+        shutil.rmtree(frames)
+    FileDataInsertor.create_frames(chunks, threads=threads, frame_opts=frame_opts, temp=frames, skip_existing=False)
+    
+    # The options `create_video` uses, the candidate replaces some of them like a profile does
+    base_opts = {**constants.DEFAULT_FFMPEG_OPTS, "-g": str(constants.INDEX_KEYFRAME_INTERVAL)}
+    results = {}
+    
+    for candidate in get_autotune_candidates(matrix):
+        name = get_candidate_name(candidate)
+        video = folder.joinpath("videos", f"{name}.avi")
+        video.parent.mkdir(exist_ok=True, parents=True)
+        if video.exists():
+            video.unlink()
+        
+        ffmpeg_opts = get_candidate_opts(candidate)
+        results[name] = {"candidate": candidate, "ffmpeg_opts": ffmpeg_opts, "error": None}
+        seconds: Dict[str, float] = {}
+        
+        try:
+            with timed(seconds, "encode"):
+                FileDataInsertor.run_ffmpeg(
+                    frames, video, len(chunks), ffmpeg_location,
+                    chain.from_iterable({**base_opts, **ffmpeg_opts}.items()), quiet=True
+                )
+        except EncoderFailed as exception:
+            results[name]["error"] = str(exception)
+            continue
+        
+        with get_context("spawn").Pool(1) as pool:
+            measured = pool.apply(measure_frames, (video, chunks, crop))
+            # Let the process exit on its own, terminating it would leak its semaphores
+            pool.close()
+            pool.join()
+        
+        success_rate = measured["decoded"] / len(chunks)
+        results[name].update({
+            "encode_seconds": seconds["encode"],
+            "video_size": video.stat().st_size,
+            "success_rate": success_rate,
+            "decode_seconds": measured["seconds"],
+            "bytes_per_second": get_rate(size * success_rate, seconds["encode"] + measured["seconds"]),
+        })
+    
+    front = get_pareto_front(results)
+    
+    return {
+        "benchmark": "autotune",
+        "corpus": corpus,
+        "scale": scale,
+        "seed": seed,
+        "bytes": size,
+        "frames": len(chunks),
+        "results": results,
+        "pareto": front,
+        "best": get_best_candidate(results, front, min_success_rate),
+    }
+
+
+def write_ffmpeg_profile(results: JsonSerializable, file: PathStr) -> None:
+    """
+    Writes the ffmpeg options of the best candidate of `run_autotune` to `file`, together with its measurements.
+    Pass it to `create_video` as "ffmpeg_profile" or to `qr_encoder --ffmpeg-profile`.
+    """
+    best = results["best"]
+    if best is None:
+        raise ValueError("No candidate decoded well enough, there is no profile to write!")
+    
+    write_results({
+        "ffmpeg_opts": results["results"][best]["ffmpeg_opts"],
+        "candidate": best,
+        "measurements": results["results"][best],
+        "pareto": {name: results["results"][name] for name in results["pareto"]},
+    }, file)
+
+
+def iter_rates(results: JsonSerializable) -> Generator[Tuple[str, float], None, None]:
+    """Yields the name and bytes/s of every measurement, e.g. ("small/stages/png", 1234.5)"""
+    
+    def walk(value: Any, path: List[str]):
+        if type(value) is not dict:
+            return
+        if "bytes_per_second" in value:
+            if value["bytes_per_second"] is not None:
+                yield "/".join(path), value["bytes_per_second"]
+            return
+        for key, child in value.items():
+            yield from walk(child, [*path, key])
+    
+    yield from walk(results["results"], [])
+
+
+def compare_results(
+        results: JsonSerializable,
+        baseline: JsonSerializable,
+        threshold: float = constants.BENCHMARK_REGRESSION_THRESHOLD
+) -> Tuple[List[Tuple[str, float, float, float]], List[str]]:
+    """
+    Compares the throughput of two benchmark runs.
+    
+    :param results: The current results.
+    :param baseline: The stored results to compare with.
+    :param threshold: Relative slowdown that counts as a regression, e.g. 0.1 for 10%.
+    :return: (name, baseline bytes/s, current bytes/s, relative change) of every measurement in both runs and the
+    names of the regressions
+    """
+    old = dict(iter_rates(baseline))
+    rows = [
+        (name, old[name], rate, rate / old[name] - 1)
+        for name, rate in iter_rates(results)
+        if name in old
+    ]
+    regressions = [name for name, _, _, change in rows if change < -threshold]
+    
+    return rows, regressions
+
+
+def format_rate(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    for unit in ("", "K", "M", "G"):
+        if value < 1000:
+            return f"{value:.1f}{unit}"
+        value /= 1000
+    return f"{value:.1f}T"
+
+
+def format_encode_results(results: JsonSerializable) -> str:
+    """Returns a table of the bytes/s and frames/s of every corpus and stage"""
+    lines = [f'{"corpus":<8} {"stage":<14} {"seconds":>9} {"bytes/s":>9} {"frames/s":>9}']
+    
+    for name, result in results["results"].items():
+        for stage, values in chain(result["stages"].items(), [("end_to_end", result["end_to_end"])]):
+            lines.append(
+                f'{name:<8} {stage:<14} {values["seconds"]:>9.3f} {format_rate(values["bytes_per_second"]):>9} '
+                f'{format_rate(values["frames_per_second"]):>9}'
+            )
+    
+    return "\n".join(lines)
+
+
+def format_decode_results(results: JsonSerializable) -> str:
+    """Returns a table of the throughput, the seconds of every stage and the peak memory usage of every case"""
+    lines = [
+        f'{"case":<40} {"method":<23} {"seconds":>8} {"reading":>8} {"pyzbar":>8} {"parsing":>8} {"bytes/s":>8} '
+        f'{"frames/s":>8} {"peak RSS":>8}'
+    ]
+    
+    for name, result in results["results"].items():
+        for method in DECODE_METHODS:
+            if (values := result.get(method)) is None:
+                continue
+            
+            stages = values["stages"]
+            memory = f'{values["peak_memory"] / 1024 ** 2:.0f}M' if values["peak_memory"] is not None else "-"
+            lines.append(
+                f'{name:<40} {method:<23} {values["seconds"]:>8.3f} {stages["reading"]:>8.3f} '
+                f'{stages["pyzbar"]:>8.3f} {stages["parsing"]:>8.3f} {format_rate(values["bytes_per_second"]):>8} '
+                f'{format_rate(values["frames_per_second"]):>8} {memory:>8}'
+            )
+            if values["error"] is not None:
+                lines.append(f'    {values["error"]}')
+    
+    return "\n".join(lines)
+
+
+def format_autotune_results(results: JsonSerializable) -> str:
+    """Returns a table of the measurements of every candidate, the Pareto front is marked with "*" """
+    lines = [
+        f'{"candidate":<34} {"encode":>8} {"size":>8} {"success":>8} {"decode":>8} {"bytes/s":>8}'
+    ]
+    
+    for name, values in results["results"].items():
+        marker = "*" if name in results["pareto"] else " "
+        if values["error"] is not None:
+            lines.append(f'{marker}{name:<33} {values["error"]}')
+            continue
+        
+        lines.append(
+            f'{marker}{name:<33} {values["encode_seconds"]:>8.3f} {format_rate(values["video_size"]):>8} '
+            f'{values["success_rate"]:>8.1%} {values["decode_seconds"]:>8.3f} '
+            f'{format_rate(values["bytes_per_second"]):>8}'
+        )
+    
+    lines.append("")
+    lines.append(f'Best: {results["best"] or "-"}')
+    
+    return "\n".join(lines)
+
+
+def format_startup_results(results: JsonSerializable) -> str:
+    """Returns a table of the import time and the imported heavy modules of every module"""
+    lines = [f'{"module":<14} {"seconds":>8}  {"result":<6}  heavy modules']
+    
+    for module, values in results["results"].items():
+        lines.append(
+            f'{module:<14} {values["seconds"]:>8.3f}  {"ok" if values["passed"] else "FAILED":<6}  '
+            f'{", ".join(values["heavy_modules"]) or "-"}'
+        )
+    
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Tuple[str, float, float, float]], regressions: List[str]) -> str:
+    lines = [f'{"measurement":<30} {"baseline":>9} {"current":>9} {"change":>8}']
+    
+    for name, old, new, change in rows:
+        marker = " REGRESSION" if name in regressions else ""
+        lines.append(f'{name:<30} {format_rate(old):>9} {format_rate(new):>9} {change:>+8.1%}{marker}')
+    
+    return "\n".join(lines)
+
+
+def write_results(results: JsonSerializable, file: PathStr) -> None:
+    with pstr(file).open("w", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+
+
+def read_results(file: PathStr) -> JsonSerializable:
+    with pstr(file).open("r", encoding="utf-8") as file:
+        return json.load(file)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import *
+
+import constants
+from exceptions import DecoderFailed
+from frame_header import FrameAssembler
+from typing_types import PathStr
+from utils import pstr
+
+
+def get_checkpoint_path(video: PathStr) -> Path:
+    """Returns the path of the checkpoint of a video"""
+    video = pstr(video)
+    return video.with_name(video.name + constants.CHECKPOINT_SUFFIX)
+
+
+class DecodeCheckpoint:
+    """
+    Saves the progress of `HandleDataExtractor.handle_video_instantly`, so a decoding that crashed or has been killed
+    can be resumed. A checkpoint contains the position in the video, the partially loaded package data at that
+    position, the state of the frame assembler and the numbers of the packages after it that have already been
+    handled.
+    
+    The packages are numbered consecutively from the start of the video and handled by other threads, possibly out of
+    order. The state after a frame is kept until all packages of it and of all frames before have been handled, only
+    then it`s safe to save it. The numbers of packages that have been handled after that are saved as well, so they
+    won`t be handled again (see `is_handled`). As a save is only due every `frames` frames or `seconds` seconds, the
+    state is only taken that often.
+    """
+    
+    def __init__(
+            self,
+            file: PathStr,
+            *,
+            frames: int = constants.CHECKPOINT_FRAMES,
+            seconds: float = constants.CHECKPOINT_SECONDS,
+    ):
+        """
+        :param file: Path the checkpoint should be saved to.
+        :param frames: A checkpoint is saved after this many frames.
+        :param seconds: A checkpoint is saved after this many seconds.
+        """
+        self.file = pstr(file)
+        self.frames = frames
+        self.seconds = seconds
+        self.position = 0
+        # Amount of packages before `position`
+        self.submitted = 0
+        self.found = ""
+        self.assembler_state: Optional[Dict[str, Any]] = None
+        # (packages submitted up to this frame, position, found, assembler state)
+        self._pending: Deque[Tuple[int, int, str, Dict[str, Any]]] = deque()
+        self._submitted = 0
+        # Handled packages after `_watermark`, all packages before it have been handled
+        self._done: Set[int] = set()
+        self._watermark = 0
+        self._lock = threading.Lock()
+        self._saved_position = 0
+        self._saved_time = time.monotonic()
+        self._state_position = 0
+        self._state_time = time.monotonic()
+    
+    @classmethod
+    def load(cls, file: PathStr, **kwargs) -> "DecodeCheckpoint":
+        """
+        Loads a saved checkpoint.
+        
+        :raises:
+            DecoderFailed: The checkpoint doesn`t exist
+        """
+        checkpoint = cls(file, **kwargs)
+        
+        if not checkpoint.file.exists():
+            raise DecoderFailed(f'Checkpoint "{checkpoint.file}" not found!')
+        
+        with checkpoint.file.open("r", encoding="utf-8") as file:
+            state = json.load(file)
+        
+        checkpoint.position = checkpoint._saved_position = checkpoint._state_position = state["position"]
+        checkpoint.submitted = checkpoint._submitted = checkpoint._watermark = state["submitted"]
+        checkpoint.found = state["found"]
+        checkpoint.assembler_state = state["assembler"]
+        checkpoint._done = set(state["handled"])
+        checkpoint._raise_watermark()
+        
+        logging.info(
+            f'Resuming at frame {checkpoint.position}, {len(state["handled"])} packages after it have been handled.'
+        )
+        
+        return checkpoint
+    
+    def create_assembler(self) -> FrameAssembler:
+        if self.assembler_state is None:
+            return FrameAssembler()
+        return FrameAssembler.from_state(self.assembler_state)
+    
+    def track(self, position: int, found: str, assembler: FrameAssembler, packages: int) -> None:
+        """
+        Remembers the state after the frame at `position` - 1, until its packages have been handled.
+        
+        :param packages: Amount of packages that have been completed by this frame. They are numbered consecutively
+        from the start of the video, a resumed decoding continues at `submitted`.
+        """
+        with self._lock:
+            self._submitted += packages
+            
+            # Only the states of frames that could be saved are taken
+            if (
+                    position - self._state_position >= self.frames or
+                    time.monotonic() - self._state_time >= self.seconds
+            ):
+                self._pending.append((self._submitted, position, found, assembler.get_state()))
+                self._state_position = position
+                self._state_time = time.monotonic()
+            
+            self._advance()
+    
+    def is_handled(self, number: int) -> bool:
+        """Whether a package has been handled before resuming, see `track` for `number`"""
+        with self._lock:
+            return number < self._watermark or number in self._done
+    
+    def handled(self, number: int) -> None:
+        """
+        Marks a package as handled and saves the checkpoint if it`s due. Thread-safe.
+        
+        :param number: The number of the package, see `track`.
+        """
+        with self._lock:
+            self._done.add(number)
+            self._raise_watermark()
+            self._advance()
+    
+    def _raise_watermark(self) -> None:
+        while self._watermark in self._done:
+            self._done.remove(self._watermark)
+            self._watermark += 1
+    
+    def _advance(self) -> None:
+        # Use the state of the last frame whose packages (and all packages before) have been handled
+        while self._pending and self._pending[0][0] <= self._watermark:
+            self.submitted, self.position, self.found, self.assembler_state = self._pending.popleft()
+        
+        if self.position - self._saved_position >= self.frames or time.monotonic() - self._saved_time >= self.seconds:
+            self._save()
+    
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+    
+    def _save(self) -> None:
+        # Write to a temporary file first, so a crash while saving doesn`t destroy the previous checkpoint
+        temp = self.file.with_name(self.file.name + ".tmp")
+        
+        with temp.open("w", encoding="utf-8") as file:
+            json.dump({
+                "position": self.position,
+                "submitted": self.submitted,
+                "found": self.found,
+                "assembler": self.assembler_state,
+                # Packages after `position` that have been handled already
+                "handled": sorted({*range(self.submitted, self._watermark), *self._done}),
+            }, file, separators=(",", ":"))
+        
+        os.replace(temp, self.file)
+        
+        self._saved_position = self.position
+        self._saved_time = time.monotonic()
+    
+    def remove(self) -> None:
+        if self.file.exists():
+            self.file.unlink()
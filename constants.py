@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import qrcode
 
 DELIMITER = ","
@@ -8,10 +10,79 @@ ENCODER_ID_REGEX = "[a-zA-Z]+"
 DATA_STRING = f"{{data}}{DELIMITER}{{information}}{DELIMITER}{{encoder.encoder_id}}{FULL_DELIMITER}"
 DATA_STRING_REVERSE = f"^({BASE64_REGEX}){DELIMITER}({BASE64_REGEX}){DELIMITER}({ENCODER_ID_REGEX})$"
 
+# Every frame starts with a header: <archive id>.<frame index>.<total frames>.<crc32 of the chunk>:
+FRAME_HEADER = "{archive_id}.{index:x}.{total:x}.{crc:08x}:"
+FRAME_HEADER_REGEX = "^([0-9a-f]{8})\\.([0-9a-f]+)\\.([0-9a-f]+)\\.([0-9a-f]{8}):"
+# Parity frames follow the data frames of their group. The parity data is base85 encoded:
+# <archive id>.p<group>.<parity index>.<group size>.<total frames>.<crc32 of the parity data>:
+PARITY_HEADER = "{archive_id}.p{group:x}.{index:x}.{group_size:x}.{total:x}.{crc:08x}:"
+PARITY_HEADER_REGEX = "^([0-9a-f]{8})\\.p([0-9a-f]+)\\.([0-9a-f]+)\\.([0-9a-f]+)\\.([0-9a-f]+)\\.([0-9a-f]{8}):"
+ERASURE_GROUP_SIZE = 20
+
+# The index of a video is saved next to it as "<video name><INDEX_SUFFIX>"
+INDEX_SUFFIX = ".index.json"
+# Keyframe interval used for videos with an index, seeking only needs to decode up to this many frames
+INDEX_KEYFRAME_INTERVAL = 24
+
+# The checkpoint of a decoding is saved next to the video as "<video name><CHECKPOINT_SUFFIX>"
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+# A checkpoint is saved after this many frames or seconds, whichever comes first
+CHECKPOINT_FRAMES = 500
+CHECKPOINT_SECONDS = 60
+
+# Maximum amount of decoded packages waiting for the writer threads of `handle_video_instantly`
+WRITER_QUEUE_SIZE = 16
+
+# Decoded streams of videos are cached here, so a video doesn`t need to be decoded again
+CACHE_DIRECTORY = Path.home().joinpath(".cache", "DataToQR")
+# The oldest cached streams are removed once the cache gets larger than this (in bytes)
+CACHE_MAX_SIZE = 1024 ** 3
+# Amount and size of the blocks of a video that are hashed to identify it
+CACHE_SAMPLE_BLOCKS = 16
+CACHE_SAMPLE_SIZE = 64 * 1024
+
+# Dumps to files with these suffixes are written as JSON Lines (one package per line)
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+
+# Margin around the QR-Code that is searched once it has been found, relative to its size
+ROI_MARGIN = 0.1
+# The searched region is downscaled until a module is about this many pixels large
+ROI_MODULE_SIZE = 3
+
+# Amount of reused frame buffers of `FFmpegCapture`
+FFMPEG_BUFFERS = 2
+
+# Benchmarks count a measurement as regressed once its throughput drops by more than this, relative to the baseline
+BENCHMARK_REGRESSION_THRESHOLD = 0.1
+# The autotuner only picks ffmpeg settings whose videos decode at least this share of the frames
+AUTOTUNE_MIN_SUCCESS_RATE = 1.0
+# Importing a command line module (or the module of the frame workers) must not take longer than this (in seconds)
+STARTUP_BUDGET = 0.5
+
 ACTION_WRITE = "write_file"
 ACTION_SHOW = "show"
 
 DATA_CHUNK_SIZE = 2300
+# Frames are sent to the worker processes in batches taking about this many seconds each, at most FRAME_BATCH_MAX_SIZE
+FRAME_BATCH_SECONDS = 0.5
+FRAME_BATCH_MAX_SIZE = 256
+# Every worker gets at least this many batches, so they finish at about the same time
+FRAME_BATCHES_PER_WORKER = 4
+# Codec of videos written using OpenCV (`video_writer.OpenCVWriter`), FFV1 is lossless and every frame is an intra frame
+OPENCV_FOURCC = "FFV1"
+# Frame archives (`frame_archive`) store every frame as a 1-bit image, "png" or "pbm", in subfolders of this many frames
+FRAME_ARCHIVE_FORMAT = "png"
+FRAME_ARCHIVE_SHARD_SIZE = 1000
+FRAME_ARCHIVE_MANIFEST = "manifest.json"
+# Amount of frames of an archive that are loaded in advance while decoding
+FRAME_ARCHIVE_READAHEAD = 16
+# The frames of the ffmpeg writer are saved in subfolders of this many frames, finished ones are added to the journal
+TEMP_SHARD_SIZE = 1000
+TEMP_JOURNAL = "frames.journal"
+# zlib level of the temporary frames, they`re 1-bit and only read once by ffmpeg
+TEMP_PNG_COMPRESS_LEVEL = 1
+# Every n-th pixel of every n-th row is used to detect duplicated frames, must be smaller than `box_size`
+FINGERPRINT_STEP = 2
 ENCODE_TYPE = "utf-8"
 
 DEFAULT_OPTS = {
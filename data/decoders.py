@@ -3,14 +3,15 @@ __author__ = "Miguel Krasniqi"
 
 import base64
 import logging
+import threading
 from datetime import date
-from pathlib import Path
 from typing import *
 
 import constants
+from data.sinks import BaseSink, FileSystemSink
 from exceptions import DecoderError
 from typing_types import JsonSerializable, PathStr
-from utils import pstrcwd, read_only_properties
+from utils import pstrcwd, pstrnone, read_only_properties
 
 
 @read_only_properties("information", "data", "__raw_data")
@@ -32,57 +33,74 @@ class BaseDataDecoderInterface:
 
 
 class FileDecoder(BaseDataDecoderInterface):
-    def write_action(self, path, **kwargs):
+    def get_bytes(self, **kwargs) -> bytes:
         encoding = self.information.get("encoding", "utf-8")
         
-        with path.open("w", encoding=encoding) as file:
-            file.write(self.data)
+        return self.data.encode(encoding)
     
-    def handle_data(self, *, log: bool = False, base_path: Optional[PathStr] = None, **_):
+    def handle_data(
+            self,
+            *,
+            log: bool = False,
+            base_path: Optional[PathStr] = None,
+            sink: Optional[BaseSink] = None,
+            **_
+    ):
+        """
+        :param base_path: Optional. Relative paths are restored inside this folder, if None, the cwd will be used.
+        Only used if `sink` is None.
+        :param sink: Optional. Where the file should be written to, if None, it will be written to the filesystem.
+        """
         # Constrain values
         path = self.information.get("path")
         if path is None:
             raise DecoderError(f'Path is missing in "{self}"')
-        path = Path(path)
-        
-        if not path.is_absolute():
-            if not base_path:
-                base_path = Path.cwd()
-            path = base_path.joinpath(str(path)[1:])
-        path.parent.mkdir(exist_ok=True, parents=True)
+        if sink is None:
+            sink = FileSystemSink(pstrnone(base_path))
         
         # Create file and write data
-        self.write_action(path, log=log)
+        sink.write(path, self.get_bytes(log=log))
         
         if log:
-            if base_path is not None:
-                logging.info(f'Created file "{str(path.relative_to(base_path))}"')
+            logging.info(f'Created file "{sink.describe(path)}"')
 
 
 class TextDecoder(BaseDataDecoderInterface):
-    def get_filepath(self, base_path: Path) -> Path:
+    # Writer threads must not pick the same file name, see `handle_data`
+    _filepath_lock = threading.Lock()
+    
+    def get_filepath(self, sink: BaseSink) -> str:
+        """Returns the relative path of the first file name that doesn`t exist in `sink` yet"""
         base = f"QR-Data from {date.today().strftime('%d.%m.%Y')}{{}}.txt"
         filename = base.format("")
         counter = 1
         
         while True:
-            path = base_path.joinpath(filename)
+            path = "\\" + filename
             
-            if path.exists():
+            if sink.exists(path):
                 filename = base.format(f" ({counter})")
                 counter += 1
             else:
                 return path
     
-    def handle_data(self, *, log: bool = False, base_path: Optional[PathStr] = None, write_file: bool = True, **_):
+    def handle_data(
+            self,
+            *,
+            log: bool = False,
+            base_path: Optional[PathStr] = None,
+            write_file: bool = True,
+            sink: Optional[BaseSink] = None,
+            **_
+    ):
         # Constrain values
-        base_path = pstrcwd(base_path)
+        if sink is None:
+            sink = FileSystemSink(pstrcwd(base_path))
         
         if write_file:
-            path = self.get_filepath(base_path)
-            
-            with path.open("w", encoding="utf-8") as file_:
-                file_.write(self.data)
+            # The file name is only free until it`s written
+            with self._filepath_lock:
+                sink.write(self.get_filepath(sink), self.data.encode("utf-8"))
         else:
             logging.info("Here`s the QR-Data printed:")
             logging.info(self.data)
@@ -93,11 +111,8 @@ class BytesDecoder(FileDecoder):
     def get_data(raw: str) -> Any:
         return raw
     
-    def write_action(self, path, encoding: str = "utf-8", **kwargs):
-        data = base64.b64decode(bytes(self.data, encoding))
-        
-        with path.open("wb") as file:
-            file.write(data)
+    def get_bytes(self, encoding: str = "utf-8", **kwargs) -> bytes:
+        return base64.b64decode(bytes(self.data, encoding))
 
 
 DecoderType = Type[BaseDataDecoderInterface]
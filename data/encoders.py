@@ -2,20 +2,33 @@
 __author__ = "Miguel Krasniqi"
 
 import base64
+import os
 import re
 from fnmatch import fnmatch
 
-import magic
-
 import constants
 from checks import is_base64, is_json_serializable
 from data.decoders import BytesDecoder, FileDecoder, TextDecoder
+from data.sources import SourceFile
 from exceptions import EncoderError
 from information import encode_information
 from typing_types import *
 from utils import pstrnone
 
-mime = magic.Magic(mime=True)
+# (pid, handle), libmagic is only loaded once needed and every process gets its own handle
+_mime: Optional[Tuple[int, Any]] = None
+
+
+def get_mime():
+    """Returns the libmagic handle of the current process, it`s created on first use"""
+    global _mime
+    
+    if _mime is None or _mime[0] != os.getpid():
+        import magic
+        
+        _mime = (os.getpid(), magic.Magic(mime=True))
+    
+    return _mime[1]
 
 
 class BaseDataEncoderInterface:
@@ -88,7 +101,7 @@ class FileEncoder(BaseDataEncoderInterface):
     @classmethod
     def can_encode(cls, file: PathStr) -> bool:
         try:
-            mime_type = mime.from_file(str(file))
+            mime_type = get_mime().from_file(str(file))
         except:
             return False
         
@@ -154,6 +167,29 @@ class BytesEncoder(FileEncoder):
         return data.decode(data_encoding)
 
 
+class SourceFileEncoder(BaseDataEncoderInterface):
+    """
+    Encodes the bytes of a file that isn`t read from the filesystem, e.g. a member of a tar archive.
+    """
+    decoder = BytesDecoder
+    
+    def __init__(self, source_file: SourceFile, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not isinstance(source_file, SourceFile):
+            raise EncoderError(f'"{self.__class__.__name__}" only encodes `{SourceFile.__name__}` instances!')
+        
+        self.source_file = source_file
+    
+    def encode(self, data_encoding: str = "utf-8") -> str:
+        return base64.b64encode(self.source_file.data).decode(data_encoding)
+    
+    def get_information(self, encoding: str = "utf-8", **_) -> JsonSerializable:
+        return {
+            "encoding": encoding,
+            "path": self.source_file.path
+        }
+
+
 class FileSplitEncoder(FileDecoder):
     """
     Splits a file into smaller parts when it exceeds a limit and encodes the parts. Otherwise default FileEncoder will
@@ -8,8 +8,14 @@ FILE_ENCODERS = (
     BytesEncoder
 )
 
+# Encodes files of `data.sources` that aren`t read from the filesystem
+SOURCE_ENCODERS = (
+    SourceFileEncoder,
+)
+
 ALL_ENCODERS = (
     FileEncoder,
     BytesEncoder,
     TextEncoder,
+    SourceFileEncoder,
 )
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import io
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import *
+
+from typing_types import PathStr
+from utils import normalize_package_path, pstr, pstrcwd
+
+
+def get_member_name(path: str) -> str:
+    """Returns the name of a package path inside an archive, relative and with forward slashes"""
+    name = normalize_package_path(path)
+    
+    # Absolute windows paths
+    if len(name) > 1 and name[1] == ":":
+        name = name[2:].lstrip("/")
+    
+    return name
+
+
+class BaseSink:
+    """
+    Receives the files restored by decoders. Sinks are used by multiple writer threads at the same time, so writing
+    must be thread-safe.
+    """
+    
+    def write(self, path: str, data: bytes) -> None:
+        """
+        Writes a file.
+        
+        :param path: The path of the package, either relative (starting with a slash) or absolute.
+        :param data: The content of the file.
+        """
+        raise AssertionError(
+            f'The method "write" is missing on "{self.__class__.__name__}" or you used "super().write", you are '
+            'supposed to overwrite this method. You also can`t use this class directly, it`s only an interface.')
+    
+    def exists(self, path: str) -> bool:
+        raise AssertionError(
+            f'The method "exists" is missing on "{self.__class__.__name__}" or you used "super().exists", you are '
+            'supposed to overwrite this method. You also can`t use this class directly, it`s only an interface.')
+    
+    def describe(self, path: str) -> str:
+        """Returns where a file has been written to, used for logging"""
+        return get_member_name(path)
+    
+    def close(self) -> None:
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FileSystemSink(BaseSink):
+    """Writes every file to its own path, relative paths are placed inside `base_path`"""
+    
+    def __init__(self, base_path: Optional[PathStr] = None):
+        self.base_path = pstrcwd(base_path)
+    
+    def get_path(self, path: str) -> Path:
+        path = Path(path)
+        
+        if not path.is_absolute():
+            path = self.base_path.joinpath(str(path)[1:])
+        
+        return path
+    
+    def write(self, path: str, data: bytes) -> None:
+        path = self.get_path(path)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        
+        with path.open("wb") as file:
+            file.write(data)
+    
+    def exists(self, path: str) -> bool:
+        return self.get_path(path).exists()
+    
+    def describe(self, path: str) -> str:
+        path = self.get_path(path)
+        
+        try:
+            return str(path.relative_to(self.base_path))
+        except ValueError:
+            return str(path)
+
+
+class TarSink(BaseSink):
+    """
+    Streams all files into a tar archive, without touching the filesystem for every file.
+    
+    :param file: Path of the archive or a writable binary file object (e.g. `sys.stdout.buffer`). The archive is
+    written as a stream, so the file object doesn`t need to be seekable.
+    :param compression: Optional. "gz", "bz2" or "xz".
+    """
+    
+    def __init__(self, file: Union[PathStr, BinaryIO], compression: str = ""):
+        mode = f"w|{compression}"
+        
+        if isinstance(file, (str, Path)):
+            self._tar = tarfile.open(str(pstr(file)), mode)
+        else:
+            self._tar = tarfile.open(fileobj=file, mode=mode)
+        self._names: Set[str] = set()
+        self._lock = threading.Lock()
+    
+    def write(self, path: str, data: bytes) -> None:
+        info = tarfile.TarInfo(get_member_name(path))
+        info.size = len(data)
+        info.mtime = int(time.time())
+        
+        with self._lock:
+            self._tar.addfile(info, io.BytesIO(data))
+            self._names.add(info.name)
+    
+    def exists(self, path: str) -> bool:
+        return get_member_name(path) in self._names
+    
+    def close(self) -> None:
+        self._tar.close()
+
+
+class ZipSink(BaseSink):
+    """Writes all files into a zip archive"""
+    
+    def __init__(self, file: Union[PathStr, BinaryIO], compression: int = zipfile.ZIP_DEFLATED):
+        if isinstance(file, (str, Path)):
+            file = str(pstr(file))
+        
+        self._zip = zipfile.ZipFile(file, "w", compression=compression)
+        self._lock = threading.Lock()
+    
+    def write(self, path: str, data: bytes) -> None:
+        with self._lock:
+            self._zip.writestr(get_member_name(path), data)
+    
+    def exists(self, path: str) -> bool:
+        with self._lock:
+            return get_member_name(path) in self._zip.NameToInfo
+    
+    def close(self) -> None:
+        self._zip.close()
+
+
+class MemorySink(BaseSink):
+    """Keeps all files in the `files` dict (member name -> content)"""
+    
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+    
+    def write(self, path: str, data: bytes) -> None:
+        with self._lock:
+            self.files[get_member_name(path)] = data
+    
+    def exists(self, path: str) -> bool:
+        return get_member_name(path) in self.files
+
+
+def create_sink(target: PathStr) -> BaseSink:
+    """
+    Creates the sink for a target: "-" streams a tar to stdout, paths ending with ".tar", ".tar.gz", ".tgz",
+    ".tar.bz2", ".tar.xz" or ".zip" create archives, everything else is used as the base path on the filesystem.
+    """
+    name = str(target).lower()
+    
+    if name == "-":
+        return TarSink(sys.stdout.buffer)
+    if name.endswith(".zip"):
+        return ZipSink(target)
+    for suffix, compression in ((".tar", ""), (".tar.gz", "gz"), (".tgz", "gz"), (".tar.bz2", "bz2"),
+                                (".tar.xz", "xz")):
+        if name.endswith(suffix):
+            return TarSink(target, compression)
+    return FileSystemSink(target)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import io
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import *
+
+from typing_types import PathStr
+from utils import pstr
+
+
+class SourceFile(NamedTuple):
+    """A file that isn`t read from the filesystem, e.g. a member of an archive"""
+    # The path of the package, relative paths start with a backslash
+    path: str
+    data: bytes
+
+
+SourceItem = Union[Path, SourceFile]
+
+
+def get_package_path(name: str) -> str:
+    """Returns the package path of an archive member, relative to the archive"""
+    return "\\" + name.replace("\\", "/").lstrip("/")
+
+
+class BaseSource:
+    """
+    Provides the files that should be encoded. Filesystem paths are yielded as `Path`, everything else as `SourceFile`,
+    so it never touches the disk.
+    """
+    
+    def __iter__(self) -> Iterator[SourceItem]:
+        raise AssertionError(
+            f'The method "__iter__" is missing on "{self.__class__.__name__}" or you used "super().__iter__", you '
+            'are supposed to overwrite this method. You also can`t use this class directly, it`s only an interface.')
+
+
+class FileSystemSource(BaseSource):
+    """Yields the given files and all files inside the given folders"""
+    
+    def __init__(self, targets: Iterable[PathStr]):
+        self.targets: List[Path] = [pstr(target) for target in targets]
+    
+    def __iter__(self) -> Iterator[SourceItem]:
+        for target in self.targets:
+            if target.is_dir():
+                yield from sorted(path for path in target.rglob("*") if path.is_file())
+            else:
+                yield target
+
+
+class TarSource(BaseSource):
+    """
+    Yields the files of a tar archive (optionally compressed). The archive is read as a stream, so it can be read from
+    stdin or a pipe.
+    
+    :param file: Path of the archive, "-" for stdin or a readable binary file object.
+    """
+    
+    def __init__(self, file: Union[PathStr, BinaryIO]):
+        self.file = file
+    
+    def __iter__(self) -> Iterator[SourceItem]:
+        if self.file == "-":
+            tar = tarfile.open(fileobj=sys.stdin.buffer, mode="r|*")
+        elif isinstance(self.file, (str, Path)):
+            tar = tarfile.open(str(pstr(self.file)), mode="r|*")
+        else:
+            tar = tarfile.open(fileobj=self.file, mode="r|*")
+        
+        with tar:
+            for member in tar:
+                if member.isfile():
+                    yield SourceFile(get_package_path(member.name), tar.extractfile(member).read())
+
+
+class ZipSource(BaseSource):
+    """
+    Yields the files of a zip archive.
+    
+    :param file: Path of the archive, "-" for stdin or a readable binary file object. A zip archive can`t be read as a
+    stream, so stdin and unseekable file objects are read into memory first.
+    """
+    
+    def __init__(self, file: Union[PathStr, BinaryIO]):
+        self.file = file
+    
+    def __iter__(self) -> Iterator[SourceItem]:
+        if self.file == "-":
+            file = io.BytesIO(sys.stdin.buffer.read())
+        elif isinstance(self.file, (str, Path)):
+            file = str(pstr(self.file))
+        elif not self.file.seekable():
+            file = io.BytesIO(self.file.read())
+        else:
+            file = self.file
+        
+        with zipfile.ZipFile(file) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield SourceFile(get_package_path(info.filename), archive.read(info))
+
+
+class StdinSource(BaseSource):
+    """Yields everything from stdin as a single file called `name`"""
+    
+    def __init__(self, name: str = "stdin"):
+        self.name = name
+    
+    def __iter__(self) -> Iterator[SourceItem]:
+        yield SourceFile(get_package_path(self.name), sys.stdin.buffer.read())
+
+
+class ChainSource(BaseSource):
+    """Yields the files of multiple sources one after another"""
+    
+    def __init__(self, sources: Iterable[BaseSource]):
+        self.sources = list(sources)
+    
+    def __iter__(self) -> Iterator[SourceItem]:
+        for source in self.sources:
+            yield from source
+
+
+SOURCES = {
+    "tar": TarSource,
+    "zip": ZipSource,
+}
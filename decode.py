@@ -1,40 +1,58 @@
 #!/usr/bin/env python
 __author__ = "Miguel Krasniqi"
 
+import hashlib
 import json
 import logging
 import re
-from functools import partial
-from multiprocessing import Pool
 from operator import itemgetter
-
-from cv2.cv2 import CAP_PROP_FRAME_COUNT, VideoCapture
-from pyzbar.pyzbar import decode
-from tqdm import tqdm
+from queue import Queue
+from threading import Thread
 
 import constants
+from archive_index import find_index, get_index_path, get_video_position, merge_package_ranges, read_index
+from checkpoint import DecodeCheckpoint, get_checkpoint_path
 from data.decoders import DecoderType
 from data.encoders import EncoderType
 from data.encoders_list import ALL_ENCODERS
 from exceptions import DecoderFailed
+from frame_header import FrameAssembler
 from information import decode_information
+from metrics import METRICS, measure
+from partial import create_partial, merge_partials, read_partial, write_partial
+from stream_cache import StreamCache, StreamCacheWriter
 from typing_types import *
-from utils import constrain_cap, get_threads, pstr, pstrnone
+from utils import constrain_cap, get_threads, path_matches, pstr, pstrnone
+
+# cv2, numpy, pyzbar and tqdm are imported by the functions using them, so importing this module stays fast
+if TYPE_CHECKING:
+    import numpy as np
+    from cv2.cv2 import VideoCapture
+    
+    from roi import RegionOfInterest
+    from sampler import ModuleSampler
 
 data_string_reverse_regex = re.compile(constants.DATA_STRING_REVERSE)
 
 
+def decode_pyzbar(image) -> list:
+    """Decodes the QR-Codes of an image using pyzbar"""
+    from pyzbar.pyzbar import decode
+    
+    return decode(image)
+
+
 class BaseDataExtractor:
     @staticmethod
     def _find_encoder(name: str, encoders: Iterable[EncoderType]) -> EncoderType:
         """
         Finds the encoder with a given id `name`
-
+        
         :param name: The id name
         :param encoders: For what encoders should be searched
-
+        
         :return: The encoder
-
+        
         :raises:
             DecoderFailed: No encoder found
         """
@@ -113,16 +131,35 @@ class HandleDataExtractor(BaseDataExtractor):
         cls.handle_packed_data(packed_data, **kwargs)
     
     @staticmethod
+    @measure("handle_ready_data")
     def handle_ready_data(data: str, information: JsonSerializable, decoder: DecoderType, **kwargs) -> None:
         """Handles ready-to-use data (pure data, information object, decoder class)"""
         instance = decoder(data, information)
         instance.handle_data(**kwargs)
     
     @classmethod
-    def handle_packed_data(cls, packed: Iterable[Dict[str, Any]], **kwargs) -> None:
-        """Handles packages. Also shows a tqdm progressbar"""
+    def handle_packed_data(
+            cls,
+            packed: Iterable[Dict[str, Any]],
+            *,
+            include: Optional[Iterable[str]] = None,
+            exclude: Optional[Iterable[str]] = None,
+            **kwargs
+    ) -> None:
+        """
+        Handles packages. Also shows a tqdm progressbar
+        
+        :param packed: The packages
+        :param include: Optional. Only packages with a path matching one of these glob patterns will be handled.
+        :param exclude: Optional. Packages with a path matching one of these glob patterns will be skipped.
+        """
         for single_data in packed:
             data, information, encoder = itemgetter("data", "information", "encoder")(single_data)
+            
+            # Check the information before the data gets decoded
+            if (include or exclude) and not path_matches(information.get("path"), include, exclude):
+                continue
+            
             cls.handle_ready_data(data, information, encoder.decoder, **kwargs)
     
     @classmethod
@@ -130,74 +167,405 @@ class HandleDataExtractor(BaseDataExtractor):
             cls,
             file: PathStr,
             encoders: Iterable[EncoderType] = ALL_ENCODERS,
+            *,
+            cap: Optional["VideoCapture"] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+            skip_duplicates: bool = False,
             **kwargs
     ) -> None:
         """Decodes data first and handles it then"""
-        data = cls.decode_video(file)
+        data = cls.decode_video(file, cap=cap, sampler=sampler, roi=roi, skip_duplicates=skip_duplicates)
         cls.handle_raw_data(data, encoders=encoders, **kwargs)
     
+    @classmethod
+    def handle_video_from_index(
+            cls,
+            video: PathStr,
+            paths: Optional[Iterable[str]] = None,
+            *,
+            include: Optional[Iterable[str]] = None,
+            exclude: Optional[Iterable[str]] = None,
+            index: Union[PathStr, JsonSerializable, None] = None,
+            encoders: Iterable[EncoderType] = ALL_ENCODERS,
+            cap: Optional["VideoCapture"] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+            **kwargs
+    ) -> None:
+        """
+        Restores single packages of a video using its index. Only the frames containing these packages are decoded.
+        
+        :param video: Path to the video.
+        :param paths: Optional. The paths of the packages (as saved in the index) that should be restored. If None,
+        all packages will be restored.
+        :param include: Optional. Only packages with a path matching one of these glob patterns will be restored.
+        :param exclude: Optional. Packages with a path matching one of these glob patterns will be skipped.
+        :param index: Optional. The index or the path to it. If None, the index next to the video will be used.
+        :param encoders: The encoders that should be used to find the decoders.
+        :param cap: Optional. A `VideoCapture` or `FFmpegCapture` instance to read the frames from, if None, the video
+        will be opened using `VideoCapture`.
+        :param sampler: Optional. Reads the frames directly using the known geometry, see `decode_qr`.
+        :param roi: Optional. Only the region of the frames containing the QR-Code is searched, see `decode_qr`.
+        """
+        # Constrain values
+        if index is None:
+            index = get_index_path(video)
+        if type(index) is not dict:
+            index = read_index(index)
+        packages = index["packages"]
+        if paths is not None:
+            paths = set(paths)
+            packages = [package for package in packages if package["path"] in paths]
+        if include or exclude:
+            packages = [package for package in packages if path_matches(package["path"], include, exclude)]
+        cap = constrain_cap(video, cap)
+        
+        from tqdm import tqdm
+        
+        for group in tqdm(merge_package_ranges(packages), desc="Restoring packages"):
+            first, last = group[0], group[-1]
+            data = cls.decode_video_range(
+                cap, first["first_chunk"], last["last_chunk"] + 1, first_frame=first["first_frame"], sampler=sampler,
+                roi=roi
+            )
+            base = first["offset"] - first["start"]
+            
+            for package in group:
+                start = package["offset"] - base
+                cls.handle_raw_data(data[start:start + package["length"]], encoders=encoders, **kwargs)
+    
     @classmethod
     def handle_json_file(
             cls,
             file: PathStr,
             encoding: str = "utf-8",
             encoders: Iterable[EncoderType] = ALL_ENCODERS,
+            *,
+            skip_error: bool = False,
+            threads: Optional[int] = None,
+            queue_size: int = constants.WRITER_QUEUE_SIZE,
+            include: Optional[Iterable[str]] = None,
+            exclude: Optional[Iterable[str]] = None,
             **kwargs
     ) -> None:
-        """Handles a json-file"""
+        """
+        Handles a json-file, either a JSON Lines file (one package per line, see
+        `DumpDataExtractor.dump_to_json_lines`) or a single array of packages. JSON Lines files are read line by line,
+        the packages are handled by `threads` writer threads.
+        """
         file = pstr(file)
         
         with file.open("r", encoding=encoding) as file:
-            packages = json.load(file)
-        
-        found = []
-        
-        for package in packages:
-            # Get values
-            data, information, encoder = itemgetter("data", "information", "encoder")(package)
-            encoder = cls._find_encoder(encoder, encoders=encoders)
-            found.append({
-                "data": data,
-                "information": information,
-                "encoder": encoder
-            })
-        
-        cls.handle_packed_data(found, **kwargs)
+            # A single array starts with "[", JSON Lines with "{"
+            first = file.read(1)
+            while first.isspace():
+                first = file.read(1)
+            file.seek(0)
+            
+            if first == "[":
+                packages = json.load(file)
+            else:
+                packages = (json.loads(line) for line in file if line.strip())
+            
+            threads = get_threads(threads)
+            queue, errors, writers = cls._start_writers(threads, queue_size, skip_error=skip_error, **kwargs)
+            
+            try:
+                for number, package in enumerate(packages):
+                    # Get values
+                    data, information, encoder = itemgetter("data", "information", "encoder")(package)
+                    
+                    # Check the information before the data gets decoded
+                    if (include or exclude) and not path_matches(information.get("path"), include, exclude):
+                        continue
+                    
+                    queue.put((number, {
+                        "data": data,
+                        "information": information,
+                        "encoder": cls._find_encoder(encoder, encoders=encoders)
+                    }))
+                    
+                    if errors:
+                        raise errors[0]
+                
+                queue.join()
+                
+                if errors:
+                    raise errors[0]
+            finally:
+                cls._stop_writers(queue, writers)
     
     @staticmethod
-    def decode_qr(opened_image) -> str:
-        """Decodes a qr-code and returns it`s data"""
-        decoded = decode(opened_image)
+    @measure("decode_qr")
+    def decode_qr(
+            opened_image,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None
+    ) -> str:
+        """
+        Decodes a qr-code and returns it`s data.
+        
+        :param opened_image: The frame
+        :param sampler: Optional. If given, the modules will be read directly using the known geometry. pyzbar will
+        only be used if that fails.
+        :param roi: Optional. Once pyzbar found the QR-Code, only its region of the following frames will be searched.
+        The whole frame is only searched again if that fails.
+        """
+        if sampler is not None:
+            try:
+                return sampler.decode(opened_image)
+            except DecoderFailed:
+                pass
+        
+        if roi is not None and roi.box is not None:
+            if decoded := decode_pyzbar(roi.apply(opened_image)):
+                return decoded[0].data.decode("utf-8")
+        
+        decoded = decode_pyzbar(opened_image)
+        
+        if roi is not None and decoded:
+            roi.locate(opened_image, decoded[0].rect)
         
         return decoded[0].data.decode("utf-8")
     
     @staticmethod
-    def _get_video_frames(cap: VideoCapture):
+    def get_frame_fingerprint(frame: "np.ndarray", step: int = constants.FINGERPRINT_STEP) -> bytes:
+        """Returns a hash of the downsampled and binarized luma plane of a frame"""
+        import numpy as np
+        
+        luma = frame[::step, ::step, 1] if frame.ndim == 3 else frame[::step, ::step]
+        
+        return hashlib.blake2b(
+            np.packbits(luma > 127).tobytes(),
+            digest_size=16,
+            key=str(frame.shape).encode("ascii")
+        ).digest()
+    
+    @classmethod
+    def _get_video_frames(cls, cap: "VideoCapture", skip_duplicates: bool = False):
+        previous: Optional[bytes] = None
+        skipped = 0
         success, img = cap.read()
         
         while success:
-            yield img
+            METRICS.count("frames_read")
+            if skip_duplicates:
+                fingerprint = cls.get_frame_fingerprint(img)
+                
+                if fingerprint == previous:
+                    skipped += 1
+                else:
+                    yield img
+                previous = fingerprint
+            else:
+                yield img
             
             success, img = cap.read()
+        
+        if skipped:
+            METRICS.count("duplicate_frames_skipped", skipped)
+            logging.info(f'Skipped {skipped} duplicated frames.')
     
     @classmethod
-    def decode_video(cls, path: PathStr) -> str:
-        """Decodes a video and returns it`s data"""
+    def _decode_frame(
+            cls,
+            frame,
+            assembler: FrameAssembler,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None
+    ) -> str:
+        """
+        Decodes a frame and returns the data that is ready now. Once the video is known to have frame headers,
+        unreadable frames are skipped, the assembler reports them as missing.
+        """
+        try:
+            data = cls.decode_qr(frame, sampler, roi)
+        except (IndexError, UnicodeDecodeError):
+            if not assembler.has_headers:
+                raise
+            
+            METRICS.count("frames_undecodable")
+            logging.warning(f'A frame after frame {assembler.highest} couldn`t be decoded, skipping it.')
+            return ""
+        
+        return assembler.add(data)
+    
+    @classmethod
+    def decode_video(
+            cls,
+            path: PathStr,
+            *,
+            cap: Optional["VideoCapture"] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+            skip_duplicates: bool = False,
+            cache: Optional[StreamCache] = None,
+    ) -> str:
+        """
+        Decodes a video and returns it`s data.
+        
+        :param path: Path to the video.
+        :param cap: Optional. A `VideoCapture` or `FFmpegCapture` instance to read the frames from, if None, the video
+        will be opened using `VideoCapture`.
+        :param sampler: Optional. Reads the frames directly using the known geometry, see `decode_qr`.
+        :param roi: Optional. Only the region of the frames containing the QR-Code is searched, see `decode_qr`.
+        :param skip_duplicates: Whether consecutive identical frames (e.g. duplicated by a player or re-muxer) should
+        only be decoded once. NOTE: Videos without frame headers containing identical consecutive chunks can`t be
+        decoded with this.
+        :param cache: Optional. If the video is cached, the cached data will be returned without decoding the video.
+        Otherwise the decoded data will be cached.
+        
+        :raises:
+            FramesMissing: Frames are missing or corrupt. The exception contains the frame ranges to re-read.
+        """
         # Constrain values
         path = pstr(path)
+        cache_opts = {"skip_duplicates": skip_duplicates}
+        
+        if cache is not None and (data := cache.load(path, cache_opts)) is not None:
+            return data
         
         # Video
-        cap = VideoCapture(str(path))
+        from cv2.cv2 import CAP_PROP_FRAME_COUNT
+        from tqdm import tqdm
+        
+        cap = constrain_cap(path, cap)
         frames = int(cap.get(CAP_PROP_FRAME_COUNT))
+        assembler = FrameAssembler()
+        found: str = ""
+        
+        for frame in tqdm(cls._get_video_frames(cap, skip_duplicates), desc="Reading video", total=frames):
+            found += cls._decode_frame(frame, assembler, sampler, roi)
+        
+        assembler.check()
+        
+        if cache is not None:
+            cache.store(path, found, cache_opts)
+        
+        return found
+    
+    @classmethod
+    def decode_video_range(
+            cls,
+            cap: "VideoCapture",
+            start: int,
+            end: int,
+            *,
+            first_frame: Optional[int] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+    ) -> str:
+        """
+        Seeks to a position in the video and decodes the data frames [start, end) only. Requires frame headers.
+        
+        :param cap: The VideoCapture instance.
+        :param start: Index of the first data frame.
+        :param end: Index after the last data frame.
+        :param first_frame: Optional. Position of the first data frame in the video, if None, `start` will be used.
+        :param sampler: Optional. Reads the frames directly using the known geometry, see `decode_qr`.
+        :param roi: Optional. Only the region of the frames containing the QR-Code is searched, see `decode_qr`.
+        :return: The data of the frames
+        
+        :raises:
+            DecoderFailed: The video has no frame headers
+            FramesMissing: Frames of the range are missing or corrupt
+        """
+        return cls._decode_assembler_range(cap, FrameAssembler(start, end), first_frame, sampler, roi)
+    
+    @classmethod
+    def _decode_assembler_range(
+            cls,
+            cap: "VideoCapture",
+            assembler: FrameAssembler,
+            first_frame: Optional[int] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+    ) -> str:
+        from cv2.cv2 import CAP_PROP_POS_FRAMES
+        
+        cap.set(CAP_PROP_POS_FRAMES, assembler.start if first_frame is None else first_frame)
         found: str = ""
         
-        for frame in tqdm(cls._get_video_frames(cap), desc="Reading video", total=frames):
-            data = cls.decode_qr(frame)
-            found += data
+        for frame in cls._get_video_frames(cap):
+            found += cls._decode_frame(frame, assembler, sampler, roi)
+            
+            # Without headers, the frames of the range can`t be told apart from the others
+            if not assembler.has_headers:
+                raise DecoderFailed("The video has no frame headers, a range of frames can`t be decoded!")
+            if assembler.is_complete:
+                break
+        
+        assembler.check()
         
         return found
     
+    @classmethod
+    def decode_video_partial(
+            cls,
+            video: PathStr,
+            start: int,
+            end: int,
+            output: Optional[PathStr] = None,
+            *,
+            index: Union[PathStr, JsonSerializable, None] = None,
+            cap: Optional["VideoCapture"] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+    ) -> JsonSerializable:
+        """
+        Decodes the data frames [start, end) of a video into a partial result. Partial results of neighbouring ranges
+        can be merged using `handle_partial_results`, so a video can be decoded by multiple machines. Requires frame
+        headers.
+        
+        :param video: Path to the video.
+        :param start: Index of the first data frame.
+        :param end: Index after the last data frame.
+        :param output: Optional. Path the partial result should be saved to.
+        :param index: Optional. The index or the path to it, used to seek to the exact position. If None, the index next
+        to the video will be used if there`s one.
+        :param cap: Optional. A `VideoCapture` or `FFmpegCapture` instance to read the frames from, if None, the video
+        will be opened using `VideoCapture`.
+        :param sampler: Optional. Reads the frames directly using the known geometry, see `decode_qr`.
+        :param roi: Optional. Only the region of the frames containing the QR-Code is searched, see `decode_qr`.
+        :return: The partial result
+        """
+        # Constrain values
+        if index is None:
+            index = find_index(video)
+        elif type(index) is not dict:
+            index = read_index(index)
+        if index is not None:
+            first_frame = get_video_position(start, index["parity_frames"], index["group_size"])
+        else:
+            first_frame = start
+        cap = constrain_cap(video, cap)
+        assembler = FrameAssembler(start, end)
+        
+        data = cls._decode_assembler_range(cap, assembler, first_frame, sampler, roi)
+        partial = create_partial(
+            data, start, min(end, assembler.last or end), total=assembler.total, archive_id=assembler.archive_id
+        )
+        
+        if output is not None:
+            write_partial(partial, output)
+        
+        return partial
+    
+    @classmethod
+    def handle_partial_results(
+            cls,
+            partials: Iterable[Union[PathStr, JsonSerializable]],
+            encoders: Iterable[EncoderType] = ALL_ENCODERS,
+            **kwargs
+    ) -> None:
+        """Merges the partial results of all frame ranges of a video and handles the data"""
+        partials = [partial if type(partial) is dict else read_partial(partial) for partial in partials]
+        
+        cls.handle_raw_data(merge_partials(partials), encoders=encoders, **kwargs)
+    
     @staticmethod
+    @measure("split_partial_data")
     def _split_partial_data(
             data: str,
             single_delimiter: str = constants.DELIMITER,
@@ -231,16 +599,33 @@ class HandleDataExtractor(BaseDataExtractor):
             *,
             video: Optional[PathStr] = None,
             packed_data_only: bool = True,
-            cap: Optional[VideoCapture] = None,
+            cap: Optional["VideoCapture"] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+            skip_duplicates: bool = False,
+            checkpoint: Optional[DecodeCheckpoint] = None,
+            cache_writer: Optional[StreamCacheWriter] = None,
     ) -> Generator[Union[PackedDataTuple, str], str, None]:
         """
         Decodes a video and yields packed data instantly.
         
         :param video: Optional. Path to the video.
         :param packed_data_only: Whether only ready-to-use packed data should be yield.
-        :param cap: Optional. VideoCapture instance, if None, one will be created based on `video` path.
+        :param cap: Optional. `VideoCapture` or `FFmpegCapture` instance, if None, one will be created based on `video`
+        path.
+        :param sampler: Optional. Reads the frames directly using the known geometry, see `decode_qr`.
+        :param roi: Optional. Only the region of the frames containing the QR-Code is searched, see `decode_qr`.
+        :param skip_duplicates: Whether consecutive identical frames should only be decoded once, see `decode_video`.
+        :param checkpoint: Optional. Decoding continues at the position of the checkpoint and the state after every
+        frame is tracked by it.
+        :param cache_writer: Optional. The decoded stream is written to it and committed once all frames have been
+        decoded successfully.
         :return: None
+        
+        :raises:
+            FramesMissing: Frames are missing or corrupt, raised after all decodable data has been yielded.
         """
+        from cv2.cv2 import CAP_PROP_POS_FRAMES
         
         def yield_data(ready, value: str):
             if packed_data_only:
@@ -251,76 +636,245 @@ class HandleDataExtractor(BaseDataExtractor):
         # Constrain values
         cap = constrain_cap(video, cap)
         
-        found: str = ""
-        
-        # Iterate over all frames and decode its data. Then get the ready-to-use data and the partial loaded data.
-        # Yield the ready-to-use data if `packed_data_only` is True, otherwise yield the raw found data so far.
-        for frame in cls._get_video_frames(cap):
-            # Get data
-            data = cls.decode_qr(frame)
-            found += data
+        if checkpoint is not None:
+            cap.set(CAP_PROP_POS_FRAMES, checkpoint.position)
+            assembler = checkpoint.create_assembler()
+            found: str = checkpoint.found
+        else:
+            assembler = FrameAssembler()
+            found: str = ""
+        
+        try:
+            # Iterate over all frames and decode its data. Then get the ready-to-use data and the partial loaded
+            # data. Yield the ready-to-use data if `packed_data_only` is True, otherwise yield the raw found data so
+            # far.
+            for frame in cls._get_video_frames(cap, skip_duplicates):
+                # Get data
+                data = cls._decode_frame(frame, assembler, sampler, roi)
+                found += data
+                if cache_writer is not None:
+                    cache_writer.write(data)
+                
+                # Get ready-to-use and partial loaded data
+                ready_data, new_found = cls._split_partial_data(found)
+                new_found = "".join(new_found)
+                if checkpoint is not None:
+                    checkpoint.track(int(cap.get(CAP_PROP_POS_FRAMES)), new_found, assembler, len(ready_data))
+                
+                yield yield_data(ready_data, found)
+                found = new_found
+            
+            ready_data = cls._split_partial_data(found)[0]
+            if checkpoint is not None:
+                checkpoint.track(int(cap.get(CAP_PROP_POS_FRAMES)), "", assembler, len(ready_data))
             
-            # Get ready-to-use and partial loaded data
-            ready_data, new_found = cls._split_partial_data(found)
             yield yield_data(ready_data, found)
-            found = "".join(new_found)
-        
-        yield yield_data(cls._split_partial_data(found)[0], found)
+            
+            assembler.check()
+        except BaseException:
+            if cache_writer is not None:
+                cache_writer.discard()
+            raise
+        
+        if cache_writer is not None:
+            cache_writer.commit()
     
     @classmethod
-    def _handle_video_instantly_thread(cls, data_list: DataList, skip_error: bool = True, **kwargs):
-        def handle_now(given_data: list):
-            cls.handle_raw_data(constants.DELIMITER.join(given_data) + constants.DELIMITER, **kwargs)
-        
-        for data in data_list:
+    def _handle_packages_writer(
+            cls,
+            packages: Queue,
+            errors: List[BaseException],
+            checkpoint: Optional[DecodeCheckpoint] = None,
+            skip_error: bool = True,
+            **kwargs
+    ) -> None:
+        """Handles packages from the queue until it receives None"""
+        while (item := packages.get()) is not None:
+            number, package = item
+            data, information, encoder = itemgetter("data", "information", "encoder")(package)
+            
             try:
-                handle_now(data)
+                if not errors:
+                    cls.handle_ready_data(data, information, encoder.decoder, **kwargs)
             except Exception as e:
                 if skip_error:
                     logging.warning(
                         "There was an error while handling some data. Original exception: " + str(e)
                     )
+                    # The package is skipped, the checkpoint mustn`t wait for it
+                    if checkpoint is not None:
+                        checkpoint.handled(number)
                 else:
-                    raise e
+                    errors.append(e)
+            else:
+                if checkpoint is not None and not errors:
+                    checkpoint.handled(number)
+            finally:
+                packages.task_done()
+    
+    @classmethod
+    def _start_writers(
+            cls,
+            threads: int,
+            queue_size: int,
+            checkpoint: Optional[DecodeCheckpoint] = None,
+            skip_error: bool = True,
+            **kwargs
+    ) -> Tuple[Queue, List[BaseException], List[Thread]]:
+        """
+        Starts `threads` writer threads handling the (number, package) items of the returned queue. Errors are
+        collected in the returned list if `skip_error` is False.
+        """
+        packages = Queue(maxsize=queue_size)
+        errors: List[BaseException] = []
+        writers = [
+            Thread(
+                target=cls._handle_packages_writer,
+                args=(packages, errors, checkpoint, skip_error),
+                kwargs=kwargs,
+                daemon=True
+            )
+            for _ in range(threads)
+        ]
+        for writer in writers:
+            writer.start()
+        
+        return packages, errors, writers
+    
+    @staticmethod
+    def _stop_writers(packages: Queue, writers: List[Thread]) -> None:
+        for _ in writers:
+            packages.put(None)
     
     @classmethod
     def handle_video_instantly(
             cls,
             video: Optional[PathStr] = None,
+            encoders: Iterable[EncoderType] = ALL_ENCODERS,
             *,
             skip_error: bool = True,
-            cap: Optional[VideoCapture] = None,
+            cap: Optional["VideoCapture"] = None,
             threads: Optional[int] = None,
+            queue_size: int = constants.WRITER_QUEUE_SIZE,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+            skip_duplicates: bool = False,
+            include: Optional[Iterable[str]] = None,
+            exclude: Optional[Iterable[str]] = None,
+            checkpoint: Union[PathStr, DecodeCheckpoint, bool, None] = None,
+            resume: bool = False,
+            cache: Optional[StreamCache] = None,
             **kwargs
     ) -> None:
-        """Decodes a video and handles instantly. If you want to decode a video and handle its data, use this. No
-        data will be returned."""
+        """
+        Decodes a video and handles instantly. If you want to decode a video and handle its data, use this. No
+        data will be returned.
+        
+        Complete packages are passed to `threads` writer threads over a queue holding at most `queue_size` packages.
+        Decoding waits while the queue is full, so memory usage stays flat if the writers fall behind.
+        
+        :param threads: Amount of writer threads, i.e. how many packages are handled (written) at the same time.
+        :param queue_size: Maximum amount of decoded packages waiting to be handled.
+        :param include: Optional. Only packages with a path matching one of these glob patterns will be handled.
+        :param exclude: Optional. Packages with a path matching one of these glob patterns will be skipped.
+        :param checkpoint: Optional. The progress will be saved regularly to this checkpoint (a path or a
+        `DecodeCheckpoint` instance). If True, "<video><CHECKPOINT_SUFFIX>" will be used. The checkpoint is removed
+        once the whole video has been handled.
+        :param resume: Whether decoding should continue at the position of the checkpoint, if it exists.
+        :param cache: Optional. If the video is cached, the cached data will be handled without decoding the video.
+        Otherwise the decoded data will be cached. Requires `video`.
+        """
+        from tqdm import tqdm
         
         # Constrain values
-        cap = constrain_cap(video, cap)
         threads = get_threads(threads)
+        cache_opts = {"skip_duplicates": skip_duplicates}
+        cached = cache.load(video, cache_opts) if cache is not None else None
+        if cached is not None:
+            checkpoint = None
+        if checkpoint is True:
+            if video is None:
+                raise ValueError("A video path is required to use the default checkpoint!")
+            checkpoint = get_checkpoint_path(video)
+        if checkpoint is False:
+            checkpoint = None
+        if checkpoint is not None and not isinstance(checkpoint, DecodeCheckpoint):
+            if resume and pstr(checkpoint).exists():
+                checkpoint = DecodeCheckpoint.load(checkpoint)
+            else:
+                checkpoint = DecodeCheckpoint(checkpoint)
         
-        # Video
-        frames = int(cap.get(CAP_PROP_FRAME_COUNT))
+        packages, errors, writers = cls._start_writers(threads, queue_size, checkpoint, skip_error, **kwargs)
         
-        with Pool(threads) as pool:
-            # Arguments pass method by: https://stackoverflow.com/a/39366868/9878135
-            list(
-                tqdm(
-                    pool.imap(
-                        partial(cls._handle_video_instantly_thread, **{
-                            "skip_error": skip_error,
-                            **kwargs
-                        }),
-                        cls.decode_video_instantly(cap=cap)
-                    ),
-                    desc="Handling video",
-                    total=frames
-                )
+        if cached is not None:
+            stream = [cls._split_partial_data(cached)[0]]
+        else:
+            # A resumed decoding doesn`t see the whole stream, so it can`t be cached
+            if cache is not None and (checkpoint is None or checkpoint.position == 0):
+                cache_writer = cache.writer(video, cache_opts)
+            else:
+                cache_writer = None
+            # Only opened if it isn`t cached
+            cap = constrain_cap(video, cap)
+            stream = cls.decode_video_instantly(
+                cap=cap, sampler=sampler, roi=roi, skip_duplicates=skip_duplicates, checkpoint=checkpoint,
+                cache_writer=cache_writer
             )
+        
+        # Packages are numbered from the start of the video, see `DecodeCheckpoint.track`
+        number = checkpoint.submitted if checkpoint is not None else 0
+        # The amount of packages isn`t known in advance
+        progress = tqdm(desc="Handling packages")
+        try:
+            for ready_data in stream:
+                for data, encoded_information, encoder in ready_data:
+                    if checkpoint is not None and checkpoint.is_handled(number):
+                        # Handled before resuming
+                        number += 1
+                        continue
+                    
+                    package = cls.packed_to_package((data, decode_information(encoded_information), encoder), encoders)
+                    
+                    if (include or exclude) and not path_matches(package["information"].get("path"), include, exclude):
+                        # Nothing to write, but the checkpoint needs to know the package is done
+                        if checkpoint is not None:
+                            checkpoint.handled(number)
+                    else:
+                        packages.put((number, package))
+                    number += 1
+                    progress.update()
+                
+                if errors:
+                    raise errors[0]
+            
+            packages.join()
+            
+            if errors:
+                raise errors[0]
+        except BaseException:
+            if checkpoint is not None:
+                checkpoint.save()
+                logging.warning(f'The progress has been saved to "{checkpoint.file}", resume to continue.')
+            raise
+        finally:
+            progress.close()
+            cls._stop_writers(packages, writers)
+        
+        if checkpoint is not None:
+            checkpoint.remove()
 
 
 class DumpDataExtractor(BaseDataExtractor):
+    @staticmethod
+    def get_json_object(package: Dict[str, Any]) -> Dict[str, JsonSerializable]:
+        """Returns a json serializable copy of a package"""
+        encoder = package["encoder"]
+        
+        return {
+            **package,
+            "encoder": encoder if type(encoder) is str else encoder.get_encoder_id()
+        }
+    
     @classmethod
     def get_json(
             cls,
@@ -343,8 +897,7 @@ class DumpDataExtractor(BaseDataExtractor):
         else:
             raise DecoderFailed(f'Given data type can`t be dumped to json.')
         
-        for dct in object_data:
-            dct["encoder"] = dct["encoder"].get_encoder_id()
+        object_data = [cls.get_json_object(dct) for dct in object_data]
         
         if minify:
             json_kwargs = {"separators": (",", ":")}
@@ -362,11 +915,96 @@ class DumpDataExtractor(BaseDataExtractor):
             encoding: str = "utf-8",
             **kwargs
     ):
+        """
+        Dumps data to a json file. If the file has a JSON Lines suffix (".jsonl", ".ndjson"), every package is written
+        to its own line, see `dump_to_json_lines`.
+        """
         # Constrain values
         file = pstrnone(file)
         if file is None:
             file = Path.cwd().joinpath("data.json")
+        
+        if file.suffix in constants.JSON_LINES_SUFFIXES and type(data) is str:
+            cls.dump_to_json_lines(
+                (cls.packed_to_package(x) for x in cls.raw_to_packed_data(data)), file, encoding=encoding
+            )
+            return
+        
         json_data = cls.get_json(data, **kwargs)
         
         with file.open("w", encoding=encoding) as file:
             file.write(json_data)
+    
+    @classmethod
+    def dump_to_json_lines(
+            cls,
+            packages: Iterable[Dict[str, Any]],
+            file: PathStr,
+            *,
+            encoding: str = "utf-8"
+    ) -> int:
+        """
+        Writes every package to its own line as soon as it`s available, so only one package is kept in memory.
+        
+        :return: Amount of packages written
+        """
+        file = pstr(file)
+        amount = 0
+        
+        with file.open("w", encoding=encoding) as file:
+            for package in packages:
+                file.write(json.dumps(cls.get_json_object(package), separators=(",", ":")))
+                file.write("\n")
+                amount += 1
+        
+        return amount
+    
+    @classmethod
+    def dump_video_to_json_lines(
+            cls,
+            video: PathStr,
+            file: Optional[PathStr] = None,
+            *,
+            encoding: str = "utf-8",
+            cap: Optional["VideoCapture"] = None,
+            sampler: Optional["ModuleSampler"] = None,
+            roi: Optional["RegionOfInterest"] = None,
+            skip_duplicates: bool = False,
+            cache: Optional[StreamCache] = None,
+    ) -> int:
+        """
+        Decodes a video and writes its packages to a JSON Lines file while decoding.
+        
+        :param video: Path to the video.
+        :param file: Optional. The JSON Lines file, if None, "data.jsonl" in the cwd will be used.
+        :param encoding: Encoding of the file.
+        :param cap: Optional. A `VideoCapture` or `FFmpegCapture` instance to read the frames from, if None, the video
+        will be opened using `VideoCapture`.
+        :param sampler: Optional. Reads the frames directly using the known geometry, see `decode_qr`.
+        :param roi: Optional. Only the region of the frames containing the QR-Code is searched, see `decode_qr`.
+        :param skip_duplicates: Whether consecutive identical frames should only be decoded once, see `decode_video`.
+        :param cache: Optional. The cached stream of the video will be used if there`s one, otherwise the decoded
+        stream will be cached.
+        :return: Amount of packages written
+        """
+        # Constrain values
+        file = pstrnone(file)
+        if file is None:
+            file = Path.cwd().joinpath("data.jsonl")
+        cache_opts = {"skip_duplicates": skip_duplicates}
+        cached = cache.load(video, cache_opts) if cache is not None else None
+        
+        if cached is not None:
+            packages = (cls.packed_to_package(x) for x in cls.raw_to_packed_data(cached))
+        else:
+            stream = HandleDataExtractor.decode_video_instantly(
+                video=video, cap=cap, sampler=sampler, roi=roi, skip_duplicates=skip_duplicates,
+                cache_writer=cache.writer(video, cache_opts) if cache is not None else None
+            )
+            packages = (
+                cls.packed_to_package((data, decode_information(encoded_information), encoder))
+                for ready_data in stream
+                for data, encoded_information, encoder in ready_data
+            )
+        
+        return cls.dump_to_json_lines(packages, file, encoding=encoding)
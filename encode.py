@@ -1,30 +1,71 @@
 #!/usr/bin/env python
 __author__ = "Miguel Krasniqi"
 
+import json
 import logging
 import os
 import shutil
 import subprocess
+import time
 import traceback
 from itertools import chain
 from multiprocessing import Pool
 from pathlib import Path
+from queue import Queue
 from typing import *
 
 import qrcode
 from PIL import ImageFile
-from tqdm import tqdm
 
 import constants
 from data.encoders import EncoderType
-from data.encoders_list import ALL_ENCODERS
+from data.encoders_list import ALL_ENCODERS, SOURCE_ENCODERS
+from data.sources import BaseSource, FileSystemSource, SourceFile
+from archive_index import create_index, get_index_path, write_index
 from exceptions import EncoderError, EncoderFailed
-from typing_types import Kwargs, PathStr
-from utils import create_temp, get_skip_files, pstr, pstrnone
+from frame_header import add_frame_headers, create_archive_id
+from frame_store import TempFrameStore, get_frame_path, get_frames_key
+from metrics import METRICS, init_worker, measure
+from typing_types import JsonSerializable, Kwargs, PathStr
+from utils import create_temp, get_kwargs, pstr, pstrnone
+
+if TYPE_CHECKING:
+    import numpy as np
+    from frame_archive import FrameArchiveWriter
+    from video_writer import OpenCVWriter
+
+# QRCode instances of the current process by their options, they`re reused for every frame
+_qr_codes: Dict[Tuple[Tuple[str, Any], ...], qrcode.QRCode] = {}
+
+
+def get_qr_code(opts: dict) -> qrcode.QRCode:
+    """Returns an empty QRCode instance using `opts`, it`s created once per process and options"""
+    key = tuple(sorted(opts.items()))
+    
+    if (qr := _qr_codes.get(key)) is None:
+        qr = _qr_codes[key] = qrcode.QRCode(**opts)
+    else:
+        qr.clear()
+        # The version has been raised to fit the data of the previous frame
+        qr.version = opts.get("version")
+    
+    return qr
+
+
+def read_ffmpeg_profile(file: PathStr) -> Dict[str, str]:
+    """Returns the ffmpeg options of a profile written by the autotuner (see `benchmark.run_autotune`)"""
+    with pstr(file).open("r", encoding="utf-8") as opened:
+        profile = json.load(opened)
+    
+    if type(profile) is not dict or type(profile.get("ffmpeg_opts")) is not dict:
+        raise EncoderFailed(f'"{file}" isn`t an ffmpeg profile!')
+    
+    return {str(key): str(value) for key, value in profile["ffmpeg_opts"].items()}
 
 
 class BaseDataInsertor:
     @staticmethod
+    @measure("get_encoded_data")
     def get_encoded_data(
             targeted: Any,
             *,
@@ -65,6 +106,7 @@ class BaseDataInsertor:
                 
                 continue
             else:
+                METRICS.count("packages_encoded")
                 return data
         
         traceback.print_exc()
@@ -81,19 +123,20 @@ class BaseDataInsertor:
 
 class VideoDataInsertor(BaseDataInsertor):
     @classmethod
+    @measure("create_frame")
     def create_frame(cls, data: str, output: Optional[Path] = None, opts: Optional[dict] = None) -> ImageFile:
         """
         Creates a QR-Code image of the given `data` and saves it as `output`.
-
+        
         :param data: The data
         :type data: str
-
+        
         :param output: The path where the file should be saved. If None, !`cwd()/image.png` will be used.
         :type output: str
-
+        
         :param opts: Options for the qrcode generator
         :type output: dict, optional
-
+        
         :return: ImageFile from qrcode.make_image()
         :rtype: ImageFile
         """
@@ -108,17 +151,212 @@ class VideoDataInsertor(BaseDataInsertor):
         use_opts.update(opts)
         
         # Create qr code
-        qr = qrcode.QRCode(**use_opts)
+        qr = get_qr_code(use_opts)
         qr.add_data(data)
         
         img = qr.make_image()  # type: ImageFile
-        img.save(output)
+        # The image is 1-bit already, a higher compression level hardly makes it smaller
+        img.save(output, compress_level=constants.TEMP_PNG_COMPRESS_LEVEL)
+        METRICS.count("frames_created")
         return img
     
+    @staticmethod
+    @measure("create_matrix")
+    def create_matrix(data: str, opts: Optional[dict] = None) -> "np.ndarray":
+        """
+        Returns the modules of a QR-Code of the given `data`, including its border, as a boolean array (True is dark).
+        Unlike `create_frame` no image is rendered, see `get_frame_pixels`.
+        """
+        import numpy as np
+        
+        # Merge opts
+        use_opts = constants.DEFAULT_OPTS.copy()
+        use_opts.update(opts or {})
+        
+        qr = get_qr_code(use_opts)
+        qr.add_data(data)
+        qr.make(fit=True)
+        
+        METRICS.count("frames_created")
+        return np.array(qr.get_matrix(), dtype=bool)
+    
+    @staticmethod
+    def get_frame_pixels(matrix: "np.ndarray", box_size: int) -> "np.ndarray":
+        """Returns the grayscale pixels (uint8) of a frame, every module becomes a square of `box_size` pixels"""
+        import numpy as np
+        
+        pixels = np.where(matrix, np.uint8(0), np.uint8(255))
+        return pixels.repeat(box_size, axis=0).repeat(box_size, axis=1)
+    
+    @classmethod
+    def _create_frames_batch(
+            cls,
+            batch: Tuple[dict, Path, List[Tuple[int, str]]]
+    ) -> Tuple[List[int], float, JsonSerializable]:
+        """
+        Creates the frames of a batch in a worker process. The options are sent once per batch and every frame reuses
+        the same `QRCode` instance.
+        
+        :return: The indexes of the frames, the seconds it took and the metrics of the worker
+        """
+        opts, temp, chunks = batch
+        start = time.perf_counter()
+        
+        for index, data in chunks:
+            cls.create_frame(data, get_frame_path(temp, index), opts)
+        
+        return [index for index, _ in chunks], time.perf_counter() - start, METRICS.collect()
+    
+    @classmethod
+    def _create_matrices_batch(
+            cls,
+            batch: Tuple[dict, None, List[Tuple[int, str]]]
+    ) -> Tuple[List[Tuple[int, "np.ndarray"]], float, JsonSerializable]:
+        """
+        Like `_create_frames_batch`, but returns the modules of the frames instead of saving images, see
+        `create_matrix`. The modules are much smaller than the pixels, so they`re cheap to send to the main process.
+        """
+        opts, _, chunks = batch
+        start = time.perf_counter()
+        matrices = [(index, cls.create_matrix(data, opts)) for index, data in chunks]
+        
+        return matrices, time.perf_counter() - start, METRICS.collect()
+    
+    @classmethod
+    def _create_images_batch(
+            cls,
+            batch: Tuple[dict, str, List[Tuple[int, str]]]
+    ) -> Tuple[List[Tuple[int, bytes, Tuple[int, int]]], float, JsonSerializable]:
+        """
+        Like `_create_frames_batch`, but returns the frames as 1-bit image files of the given format (see
+        `encode_frame_image`) together with their size, instead of saving them.
+        """
+        from frame_archive import encode_frame_image
+        
+        opts, image_format, chunks = batch
+        box_size = opts.get("box_size", constants.DEFAULT_OPTS["box_size"])
+        start = time.perf_counter()
+        images = []
+        
+        for index, data in chunks:
+            matrix = cls.create_matrix(data, opts)
+            size = matrix.shape[1] * box_size, matrix.shape[0] * box_size
+            images.append((index, encode_frame_image(matrix, box_size, image_format), size))
+        
+        return images, time.perf_counter() - start, METRICS.collect()
+    
+    @staticmethod
+    def get_batch_size(frame_seconds: Optional[float], remaining: int, workers: int) -> int:
+        """
+        Returns the amount of frames of the next batch, so a batch takes about `FRAME_BATCH_SECONDS`. Towards the end
+        the batches get smaller, so all workers finish at about the same time.
+        
+        :param frame_seconds: The measured seconds per frame, if None, a single frame will be sent to measure it.
+        :param remaining: Amount of frames that haven`t been sent yet.
+        :param workers: Amount of worker processes.
+        """
+        if frame_seconds is None:
+            return 1
+        
+        size = int(constants.FRAME_BATCH_SECONDS / max(frame_seconds, 1e-6))
+        balanced = -(-remaining // (workers * constants.FRAME_BATCHES_PER_WORKER))
+        
+        return max(1, min(size, balanced, constants.FRAME_BATCH_MAX_SIZE))
+    
+    @classmethod
+    def _run_frame_batches(
+            cls,
+            pool: Pool,
+            workers: int,
+            data: List[str],
+            indexes: List[int],
+            target: Any,
+            opts: dict,
+            batch_function: Optional[Callable] = None,
+            on_batch: Optional[Callable[[list], None]] = None,
+    ) -> None:
+        """
+        Sends the frames `indexes` of `data` to the workers in batches and waits until all have been created.
+        
+        :param target: Passed to the batch function, e.g. the folder of the images for `_create_frames_batch`.
+        :param batch_function: The function creating a batch in a worker, if None, `_create_frames_batch`.
+        :param on_batch: Optional. Called with the result of every batch, in the order they finish.
+        """
+        from tqdm import tqdm
+        
+        if batch_function is None:
+            batch_function = cls._create_frames_batch
+        
+        finished = Queue()
+        position = 0
+        running = 0
+        frame_seconds: Optional[float] = None
+        
+        with tqdm(desc="Creating frames", total=len(indexes)) as progress:
+            while position < len(indexes) or running:
+                # Keep every worker busy, with one batch waiting
+                while running < workers * 2 and position < len(indexes):
+                    size = cls.get_batch_size(frame_seconds, len(indexes) - position, workers)
+                    batch = [(index, data[index]) for index in indexes[position:position + size]]
+                    pool.apply_async(
+                        batch_function, ((opts, target, batch),),
+                        callback=finished.put, error_callback=finished.put
+                    )
+                    position += size
+                    running += 1
+                
+                result = finished.get()
+                running -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                
+                created, seconds, worker_metrics = result
+                frames = len(created)
+                METRICS.merge(worker_metrics)
+                METRICS.count("frame_batches")
+                if on_batch is not None:
+                    on_batch(created)
+                # Exponential moving average, the first frames are usually slower
+                frame_seconds = seconds / frames if frame_seconds is None else (
+                    0.7 * frame_seconds + 0.3 * seconds / frames
+                )
+                progress.update(frames)
+    
     @classmethod
-    def _create_video_handle_thread(cls, passed: Tuple[str, Path, Optional[dict]]) -> None:
-        data, path, opts = passed
-        cls.create_frame(data, path, opts)
+    def get_matrix_writer(
+            cls,
+            writer: "OpenCVWriter",
+            box_size: int
+    ) -> Callable[[List[Tuple[int, "np.ndarray"]]], None]:
+        """
+        Returns a callback for `_run_frame_batches` that writes the frames to `writer` in order. Batches can finish in
+        any order, so frames are kept until all frames before them have been written.
+        """
+        pending: Dict[int, "np.ndarray"] = {}
+        position = 0
+        
+        def write(matrices: List[Tuple[int, "np.ndarray"]]) -> None:
+            nonlocal position
+            
+            pending.update(matrices)
+            with METRICS.timer("opencv_write"):
+                while position in pending:
+                    writer.write(cls.get_frame_pixels(pending.pop(position), box_size))
+                    position += 1
+        
+        return write
+    
+    @staticmethod
+    def get_uniform_version(data: List[str], opts: Optional[dict] = None) -> int:
+        """Returns the QR-Code version that fits the longest chunk, so all frames can have the same size"""
+        use_opts = constants.DEFAULT_OPTS.copy()
+        use_opts.update(opts or {})
+        
+        qr = qrcode.QRCode(**use_opts)
+        qr.add_data(max(data, key=len))
+        qr.make(fit=True)
+        
+        return qr.version
     
     @classmethod
     def create_frames(
@@ -128,38 +366,78 @@ class VideoDataInsertor(BaseDataInsertor):
             frame_opts: Optional[Kwargs] = None,
             temp: Optional[PathStr] = None,
             skip_existing: bool = True,
-            file_regex: str = "image-([\\d]+).png"
+            pool: Optional[Pool] = None,
+            uniform_version: bool = True,
+            writer: Optional["OpenCVWriter"] = None,
+            archive: Optional["FrameArchiveWriter"] = None,
     ):
+        """
+        Creates the QR-Code images of the chunks in `temp` using worker processes. The frames are sent to the workers
+        in batches, sized by the measured time per frame (see `get_batch_size`).
+        
+        The images are saved in subfolders of `temp` and every finished batch is added to a journal, see
+        `TempFrameStore`.
+        
+        :param skip_existing: Whether the frames of the journal in `temp` should be reused, e.g. to resume an encoding
+        that has been interrupted. Only frames of the same chunks and options are reused.
+        :param threads: Amount of worker processes, if None, one per cpu will be used. If `pool` is given, the amount
+        of processes of the pool.
+        :param pool: Optional. The worker processes to use, e.g. the pool of an `EncoderSession`. It stays open. If
+        None, `threads` new worker processes will be started and stopped afterwards.
+        :param uniform_version: Whether all frames should use the QR-Code version of the longest chunk, so they all
+        have the same size. Otherwise the last frame is usually smaller, which ffmpeg scales to the size of the others.
+        :param writer: Optional. If given, the frames are written to it in order instead of being saved in `temp`,
+        the workers only create the modules and the main process renders the pixels.
+        :param archive: Optional. If given, the frames are saved in it as 1-bit images instead of being saved in
+        `temp`, see `FrameArchiveWriter`.
+        """
         # Constrain values
         if threads is None:
             threads = os.cpu_count()
         if frame_opts is None:
             frame_opts = {}
-        temp = create_temp(temp)
-        if skip_existing:
-            skip = get_skip_files(file_regex, temp, "*.png")
+        if uniform_version and data:
+            frame_opts = {**frame_opts, "version": cls.get_uniform_version(data, frame_opts)}
+        store: Optional[TempFrameStore] = None
+        if writer is None and archive is None:
+            store = TempFrameStore(create_temp(temp), get_frames_key(data, frame_opts))
+            done = store.open(resume=skip_existing)
+            
+            indexes = [index for index in range(len(data)) if index not in done]
+            store.prepare(indexes)
+            run_opts = {"target": store.temp, "on_batch": store.mark_done}
+        elif archive is not None:
+            archive.frame_opts = {**constants.DEFAULT_OPTS, **frame_opts}
+            indexes = list(range(len(data)))
+            run_opts = {
+                "target": archive.image_format,
+                "batch_function": cls._create_images_batch,
+                "on_batch": archive.write_many,
+            }
         else:
-            skip = set()
+            box_size = frame_opts.get("box_size", constants.DEFAULT_OPTS["box_size"])
+            indexes = list(range(len(data)))
+            run_opts = {
+                "target": None,
+                "batch_function": cls._create_matrices_batch,
+                "on_batch": cls.get_matrix_writer(writer, box_size),
+            }
         
-        pool_data = [
-            (
-                data,  # encoded string data
-                temp.joinpath(f"image-{i}.png"),  # Image path
-                frame_opts,  # options,
-            )
-            for i, data in enumerate(data)
-            if str(i) not in skip
-        ]
-        
-        logging.info(f'Using {threads} Threads to create frames.')
-        with Pool(threads) as pool:
-            list(
-                tqdm(
-                    pool.imap(cls._create_video_handle_thread, pool_data),
-                    desc="Creating frames",
-                    total=len(pool_data)
-                )
-            )
+        try:
+            if pool is not None:
+                cls._run_frame_batches(pool, threads, data, indexes, opts=frame_opts, **run_opts)
+                return
+            
+            logging.info(f'Using {threads} Threads to create frames.')
+            with Pool(threads, initializer=init_worker, initargs=(METRICS.profile_directory,)) as pool:
+                cls._run_frame_batches(pool, threads, data, indexes, opts=frame_opts, **run_opts)
+                
+                # Let the workers exit on their own, so their profiles are saved
+                pool.close()
+                pool.join()
+        finally:
+            if store is not None:
+                store.close()
     
     @classmethod
     def create_video(
@@ -172,6 +450,16 @@ class VideoDataInsertor(BaseDataInsertor):
             
             ffmpeg_location: Path = Path("ffmpeg"),
             ffmpeg_opts: Optional[dict] = None,
+            ffmpeg_profile: Optional[PathStr] = None,
+            writer: str = "ffmpeg",
+            fourcc: str = constants.OPENCV_FOURCC,
+            frame_format: str = constants.FRAME_ARCHIVE_FORMAT,
+            
+            frame_headers: bool = True,
+            archive_id: Optional[str] = None,
+            parity_frames: int = 0,
+            group_size: int = constants.ERASURE_GROUP_SIZE,
+            index: bool = True,
             
             **kwargs,
     ):
@@ -183,9 +471,28 @@ class VideoDataInsertor(BaseDataInsertor):
         :param clear_temp:
         :param ffmpeg_location:
         :param ffmpeg_opts:
+        :param ffmpeg_profile: Optional. A profile written by the autotuner (`qr_benchmark autotune`), its options
+        replace the defaults. `ffmpeg_opts` still take precedence.
+        :param writer: How the video is written: "ffmpeg" (saves the frames as images in `temp` and runs
+        `ffmpeg_location`) or "opencv" (writes the frames straight into the video using `cv2.VideoWriter`, see
+        `OpenCVWriter`). With "opencv" only the "-framerate" of `ffmpeg_opts` is used. "frames" doesn`t create a video
+        at all, `output` becomes a folder (or a .zip file) of 1-bit images, see `FrameArchiveWriter`.
+        :param fourcc: The codec used by the "opencv" writer, e.g. "FFV1" (lossless) or "MJPG".
+        :param frame_format: The image format used by the "frames" writer, "png" or "pbm".
+        :param frame_headers: Whether every frame should start with a header (archive id, frame index, total frames
+        and a checksum of the chunk). Required to decode frames out of order and to detect missing frames.
+        :param archive_id: Optional. The archive id used in the frame headers, if None, it`s derived from the data and
+        the options (see `create_archive_id`), so the frames in `temp` can be reused when encoding the same data again.
+        :param parity_frames: Amount of parity frames per `group_size` data frames. Up to `parity_frames` lost or
+        unreadable frames per group can be rebuilt by the decoder. Requires `frame_headers`.
+        :param group_size: Amount of data frames per parity group.
+        :param index: Whether an index mapping every package to its frames should be saved next to the video, so
+        single packages can be restored without decoding the whole video. Only used with `frame_headers`.
         :return:
         """
         # Constrain values
+        if writer not in {"ffmpeg", "opencv", "frames"}:
+            raise EncoderFailed(f'Unknown writer "{writer}"! Use "ffmpeg", "opencv" or "frames".')
         if type(data_or_split) is str:
             data = cls.split_data(data_or_split)
         elif type(data_or_split) is list:
@@ -193,8 +500,22 @@ class VideoDataInsertor(BaseDataInsertor):
         else:
             raise EncoderFailed(f'The given data can`t be used. It must be either str or a list containing strings!')
         CURRENT = Path.cwd()
+        output = pstrnone(output)
         if output is None:
-            output = CURRENT.joinpath("qr_data.avi")
+            output = CURRENT.joinpath("qr_frames" if writer == "frames" else "qr_data.avi")
+        if archive_id is None:
+            archive_id = create_archive_id(data, {
+                "frame_opts": kwargs.get("frame_opts"),
+                "parity_frames": parity_frames,
+                "group_size": group_size,
+            })
+        if frame_headers:
+            package_index = create_index(data, archive_id, parity_frames=parity_frames, group_size=group_size)
+            data = add_frame_headers(data, archive_id, parity_frames=parity_frames, group_size=group_size)
+        elif parity_frames:
+            raise EncoderFailed(f'Parity frames can only be used with frame headers!')
+        else:
+            index = False
         if temp is None:
             temp = CURRENT.joinpath("temp/")
         if ffmpeg_opts is None:
@@ -202,32 +523,105 @@ class VideoDataInsertor(BaseDataInsertor):
         
         # Merge opts
         use_opts = constants.DEFAULT_FFMPEG_OPTS.copy()
+        if index:
+            use_opts["-g"] = str(constants.INDEX_KEYFRAME_INTERVAL)
+        if ffmpeg_profile is not None:
+            use_opts.update(read_ffmpeg_profile(ffmpeg_profile))
         use_opts.update(ffmpeg_opts)
+        fps = float(use_opts["-framerate"])
         use_opts = list(chain.from_iterable(use_opts.items()))
         
         # Preparation
+        # Empty file
+        if output.is_file():
+            output.unlink()
+        
+        if writer == "frames":
+            from frame_archive import FrameArchiveWriter
+            
+            with FrameArchiveWriter(output, image_format=frame_format, archive_id=archive_id) as archive:
+                cls.create_frames(data=data, archive=archive, **kwargs)
+        elif writer == "opencv":
+            from video_writer import OpenCVWriter
+            
+            with OpenCVWriter(output, fourcc=fourcc, fps=fps) as video_writer:
+                cls.create_frames(data=data, writer=video_writer, **kwargs)
+        else:
+            cls.create_video_using_ffmpeg(data, output, temp, clear_temp, ffmpeg_location, use_opts, **kwargs)
+        
+        if index:
+            write_index(package_index, get_index_path(output))
+    
+    @classmethod
+    def create_video_using_ffmpeg(
+            cls,
+            data: List[str],
+            output: Path,
+            temp: Path,
+            clear_temp: bool,
+            ffmpeg_location: Path,
+            ffmpeg_opts: List[str],
+            **kwargs
+    ) -> None:
+        """Saves the frames as images in `temp` and creates the video of them using ffmpeg"""
         # Empty temp folder
         if clear_temp:
             if temp.exists():
                 shutil.rmtree(str(temp))
             temp.mkdir()
-        # Empty file
-        if output.exists():
-            output.unlink()
         
         # Create frames
         cls.create_frames(data=data, temp=temp, **kwargs)
         
         # Create video
         logging.warning("The video will be created now using ffmpeg, wait until it is finished before opening it!")
+        cls.run_ffmpeg(temp, output, len(data), ffmpeg_location, ffmpeg_opts)
+    
+    @staticmethod
+    def run_ffmpeg(
+            temp: Path,
+            output: Path,
+            frames: int,
+            ffmpeg_location: Path = Path("ffmpeg"),
+            ffmpeg_opts: Iterable[str] = (),
+            quiet: bool = False,
+    ) -> None:
+        """
+        Creates the video `output` of the frames in `temp` using ffmpeg. The frames are sharded into subfolders (see
+        `TempFrameStore`), so they`re piped to ffmpeg in order instead of letting it read them.
+        
+        :param frames: Amount of frames.
+        :param quiet: Whether the output of ffmpeg should be hidden.
+        :raises EncoderFailed: ffmpeg failed, e.g. because it doesn`t support an option.
+        """
+        output_opts = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL} if quiet else {}
+        
+        with METRICS.timer("ffmpeg"):
+            process = subprocess.Popen([
+                ffmpeg_location,
+                "-f", "image2pipe",
+                "-vcodec", "png",
+                "-i", "-",
+                *ffmpeg_opts,
+                output.absolute()
+            ], stdin=subprocess.PIPE, **output_opts)
+            
+            try:
+                for index in range(frames):
+                    with get_frame_path(temp, index).open("rb") as file:
+                        shutil.copyfileobj(file, process.stdin)
+            except BrokenPipeError:
+                # ffmpeg stopped early, its exit code tells why
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                process.wait()
         
-        process = subprocess.Popen([
-            ffmpeg_location,
-            "-i", temp.joinpath("image-%d.png").absolute(),
-            *use_opts,
-            output.absolute()
-        ])
-        process.communicate()
+        if process.returncode:
+            raise EncoderFailed(f'ffmpeg failed with the exit code {process.returncode}!')
 
 
 class FileDataInsertor(VideoDataInsertor):
@@ -249,35 +643,56 @@ class FileDataInsertor(VideoDataInsertor):
             cls,
             files: Iterable[PathStr],
             output: Optional[PathStr] = None,
+            *,
+            video_opts: Optional[Kwargs] = None,
             **kwargs
     ) -> str:
         # Constrain values
+        video_opts = get_kwargs(video_opts)
         data = "".join(list(cls.collect_data_from_files(files, **kwargs)))
         
-        cls.create_video(data, output)
+        cls.create_video(data, output, **video_opts)
         
         return data
     
     @classmethod
     def encode_multiple(
             cls,
-            targets: Iterator[PathStr],
+            targets: Union[Iterable[PathStr], BaseSource],
             output: Optional[PathStr] = None,
+            *,
+            video_opts: Optional[Kwargs] = None,
             **kwargs
     ) -> str:
+        """
+        Encodes multiple files into a video.
+        
+        Files are read one by one, but their encoded data is buffered until all of them have been read: the video
+        (its archive id, parity frames and index) is created from the whole data.
+        
+        :param targets: Either files and folders (all files inside them will be encoded) or a source from
+        `data.sources`, e.g. a `TarSource` to encode the members of a tar stream without extracting them. Files of a
+        source are encoded using `SOURCE_ENCODERS`, so `encoders` can only be passed for files and folders.
+        """
         # Constrain values
-        targets: List[Path] = list(map(lambda x: pstr(x), targets))
+        if not isinstance(targets, BaseSource):
+            targets = FileSystemSource(targets)
+        if "encoders" in kwargs and not isinstance(targets, FileSystemSource):
+            raise EncoderFailed(f'Files of a source are encoded using "SOURCE_ENCODERS", "encoders" can`t be used!')
+        video_opts = get_kwargs(video_opts)
         
         # Collect data
-        data: str = ""
-        for target in tqdm(targets, desc="Collecting data", total=len(targets)):
-            if target.is_dir():
-                files = {x for x in target.rglob("*/*") if x.is_file()}
-                data += "".join(list(cls.collect_data_from_files(files, **kwargs)))
+        from tqdm import tqdm
+        
+        found: List[str] = []
+        for target in tqdm(targets, desc="Collecting data"):
+            if isinstance(target, SourceFile):
+                found.append(cls.get_encoded_data(target, **{**kwargs, "encoders": SOURCE_ENCODERS}))
             else:
-                data += cls.get_encoded_data(target, **kwargs)
+                found.append(cls.get_encoded_data(target, **kwargs))
+        data = "".join(found)
         
-        cls.create_video(data, output)
+        cls.create_video(data, output, **video_opts)
         
         return data
     
@@ -286,17 +701,20 @@ class FileDataInsertor(VideoDataInsertor):
             cls,
             file: PathStr,
             output: Optional[PathStr] = None,
+            *,
+            video_opts: Optional[Kwargs] = None,
             **kwargs
     ) -> str:
         # Constrain values
         file = pstr(file)
+        video_opts = get_kwargs(video_opts)
         
         data = cls.get_encoded_data(
             file,
             **kwargs
         )
         
-        cls.create_video(data, output)
+        cls.create_video(data, output, **video_opts)
         
         return data
     
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+from typing import *
+
+import numpy as np
+
+from exceptions import DecoderFailed, EncoderFailed
+from reed_solomon import gf_div, gf_inverse, gf_mul, gf_mul_array
+
+
+# Systematic Reed-Solomon erasure code over GF(256): parity frame `j` of a group of `group_size` data frames is the sum
+# of all data frames `i` multiplied with the Cauchy matrix element 1 / ((group_size + j) ^ i). Every square submatrix of
+# a Cauchy matrix is invertible, so any `parity` lost data frames of a group can be rebuilt from `parity` parity frames.
+
+
+def get_coefficient(group_size: int, parity_index: int, data_index: int) -> int:
+    return gf_inverse((group_size + parity_index) ^ data_index)
+
+
+def _pad(chunks: Iterable[bytes], length: int) -> List[np.ndarray]:
+    return [np.frombuffer(chunk.ljust(length, b"\x00"), dtype=np.uint8) for chunk in chunks]
+
+
+def encode_group(chunks: List[bytes], group_size: int, parity: int) -> List[bytes]:
+    """
+    Creates the parity chunks of a group.
+    
+    :param chunks: The data chunks of the group, at most `group_size`. Shorter chunks are padded with zero bytes.
+    :param group_size: Amount of data chunks of a full group.
+    :param parity: Amount of parity chunks to create.
+    :return: `parity` chunks, each as long as the longest data chunk.
+    """
+    if group_size + parity > 256:
+        raise EncoderFailed(f'`group_size` + `parity` must not exceed 256, got {group_size + parity}.')
+    
+    length = max(len(chunk) for chunk in chunks)
+    padded = _pad(chunks, length)
+    found = []
+    
+    for parity_index in range(parity):
+        result = np.zeros(length, dtype=np.uint8)
+        for data_index, chunk in enumerate(padded):
+            result ^= gf_mul_array(get_coefficient(group_size, parity_index, data_index), chunk)
+        found.append(result.tobytes())
+    
+    return found
+
+
+def _invert_matrix(matrix: List[List[int]]) -> List[List[int]]:
+    """Inverts a square matrix over GF(256) using Gauss-Jordan elimination"""
+    size = len(matrix)
+    rows = [row[:] + [1 if i == j else 0 for j in range(size)] for i, row in enumerate(matrix)]
+    
+    for column in range(size):
+        pivot = next((row for row in range(column, size) if rows[row][column] != 0), None)
+        if pivot is None:
+            raise DecoderFailed("The parity matrix is singular.")
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        
+        factor = rows[column][column]
+        rows[column] = [gf_div(value, factor) for value in rows[column]]
+        
+        for row in range(size):
+            if row != column and (factor := rows[row][column]) != 0:
+                rows[row] = [value ^ gf_mul(factor, pivot_value) for value, pivot_value in zip(rows[row], rows[column])]
+    
+    return [row[size:] for row in rows]
+
+
+def decode_group(
+        chunks: Dict[int, bytes],
+        parities: Dict[int, bytes],
+        amount: int,
+        group_size: int
+) -> Dict[int, bytes]:
+    """
+    Rebuilds the missing data chunks of a group.
+    
+    :param chunks: The available data chunks, keyed by their index inside the group.
+    :param parities: The available parity chunks, keyed by their parity index.
+    :param amount: Amount of data chunks the group has (the last group may be smaller than `group_size`).
+    :param group_size: Amount of data chunks of a full group.
+    :return: The rebuilt chunks keyed by their index inside the group, padded with zero bytes.
+    
+    :raises:
+        DecoderFailed: More chunks are missing than parity chunks are available
+    """
+    missing = [index for index in range(amount) if index not in chunks]
+    
+    if len(missing) > len(parities):
+        raise DecoderFailed(f'{len(missing)} frames of the group are missing, but only {len(parities)} parity frames '
+                            f'are available.')
+    if not missing:
+        return {}
+    
+    length = max(len(chunk) for chunk in parities.values())
+    used = sorted(parities)[:len(missing)]
+    
+    # Subtract the known data chunks from the parity chunks, leaving the contribution of the missing ones
+    remaining = []
+    for parity_index in used:
+        result = _pad([parities[parity_index]], length)[0].copy()
+        for data_index, chunk in zip(chunks.keys(), _pad(chunks.values(), length)):
+            result ^= gf_mul_array(get_coefficient(group_size, parity_index, data_index), chunk)
+        remaining.append(result)
+    
+    inverse = _invert_matrix([
+        [get_coefficient(group_size, parity_index, data_index) for data_index in missing]
+        for parity_index in used
+    ])
+    
+    found = {}
+    for row, data_index in enumerate(missing):
+        result = np.zeros(length, dtype=np.uint8)
+        for column, value in enumerate(remaining):
+            result ^= gf_mul_array(inverse[row][column], value)
+        found[data_index] = result.tobytes()
+    
+    return found
@@ -20,3 +20,15 @@ class DecoderError(Exception):
 class DecoderFailed(Exception):
     """Should be used in the actual decoding process"""
     pass
+
+
+class FramesMissing(DecoderFailed):
+    """Should be used when frames of an archive are missing or corrupt"""
+    
+    def __init__(self, message: str, ranges: list):
+        super().__init__(message)
+        self.ranges = ranges
+    
+    def __reduce__(self):
+        # Pool workers pickle exceptions using their args only
+        return self.__class__, (str(self), self.ranges)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import io
+import json
+import shutil
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import *
+
+import numpy as np
+from PIL import Image
+from cv2.cv2 import CAP_PROP_FPS, CAP_PROP_FRAME_COUNT, CAP_PROP_FRAME_HEIGHT, CAP_PROP_FRAME_WIDTH, CAP_PROP_POS_FRAMES
+
+import constants
+from exceptions import DecoderFailed, EncoderFailed
+from metrics import METRICS, measure
+from typing_types import JsonSerializable, Kwargs, PathStr
+from utils import get_threads, pstr
+
+# Extension of the frames: format used by PIL. Both store one bit per pixel.
+FRAME_FORMATS = {
+    "png": "PNG",
+    "pbm": "PPM",
+}
+
+
+def get_frame_name(index: int, image_format: str, shard_size: int = constants.FRAME_ARCHIVE_SHARD_SIZE) -> str:
+    """Returns the path of a frame inside an archive, e.g. "00001/frame-1234.png" with a `shard_size` of 1000"""
+    return f"{index // shard_size:05d}/frame-{index}.{image_format}"
+
+
+def is_zip_archive(path: PathStr) -> bool:
+    return pstr(path).suffix.lower() == ".zip"
+
+
+def is_frame_archive(path: PathStr) -> bool:
+    """Whether `path` is a frame archive (a folder or a .zip file containing a manifest) instead of a video"""
+    path = pstr(path)
+    
+    if path.is_dir():
+        return path.joinpath(constants.FRAME_ARCHIVE_MANIFEST).exists()
+    if is_zip_archive(path) and zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return constants.FRAME_ARCHIVE_MANIFEST in archive.namelist()
+    return False
+
+
+@measure("encode_frame_image")
+def encode_frame_image(matrix: np.ndarray, box_size: int, image_format: str = constants.FRAME_ARCHIVE_FORMAT) -> bytes:
+    """
+    Returns a frame as a 1-bit image file.
+    
+    :param matrix: The modules, True is dark, see `VideoDataInsertor.create_matrix`.
+    :param box_size: Every module becomes a square of this many pixels.
+    :param image_format: One of `FRAME_FORMATS`.
+    """
+    light = ~matrix.repeat(box_size, axis=0).repeat(box_size, axis=1)
+    buffer = io.BytesIO()
+    # Boolean arrays become images with the mode "1"
+    Image.fromarray(light).save(buffer, FRAME_FORMATS[image_format])
+    
+    return buffer.getvalue()
+
+
+class FrameArchiveWriter:
+    """
+    Writes frames as 1-bit images instead of a video, into a folder or a .zip file (if `output` ends with ".zip").
+    The frames are sharded into subfolders of `shard_size` frames (see `get_frame_name`), so no folder gets too big.
+    
+    A manifest (`FRAME_ARCHIVE_MANIFEST`) describes the archive: the amount and size of the frames, their format and
+    the options of the QR-Codes, so the decoder can read the modules directly. It`s written by `close`, an archive
+    without it is incomplete.
+    """
+    
+    def __init__(
+            self,
+            output: PathStr,
+            *,
+            image_format: str = constants.FRAME_ARCHIVE_FORMAT,
+            shard_size: int = constants.FRAME_ARCHIVE_SHARD_SIZE,
+            archive_id: Optional[str] = None,
+    ):
+        """
+        :param output: The folder or .zip file. An existing archive will be replaced.
+        :param image_format: One of `FRAME_FORMATS`.
+        :param shard_size: Amount of frames per subfolder.
+        :param archive_id: Optional. The archive id of the frame headers, saved in the manifest.
+        """
+        # Constrain values
+        if image_format not in FRAME_FORMATS:
+            raise EncoderFailed(f'Unknown frame format "{image_format}"! Use one of: {", ".join(FRAME_FORMATS)}')
+        
+        self.output = pstr(output)
+        self.image_format = image_format
+        self.shard_size = shard_size
+        self.archive_id = archive_id
+        # Set by `create_frames`, once the version of the frames is known
+        self.frame_opts: Kwargs = {}
+        self.frames = 0
+        self.size: Optional[Tuple[int, int]] = None
+        self._zip: Optional[zipfile.ZipFile] = None
+        
+        if self.output.is_dir():
+            shutil.rmtree(self.output)
+        elif self.output.exists():
+            self.output.unlink()
+        
+        if is_zip_archive(self.output):
+            # The images are compressed already
+            self._zip = zipfile.ZipFile(self.output, "w", zipfile.ZIP_STORED)
+        else:
+            self.output.mkdir(parents=True)
+    
+    def write(self, index: int, image: bytes, size: Tuple[int, int]) -> None:
+        """Saves the image file of frame `index`, see `encode_frame_image`. Frames can be written in any order."""
+        name = get_frame_name(index, self.image_format, self.shard_size)
+        
+        if self._zip is not None:
+            self._zip.writestr(name, image)
+        else:
+            path = self.output.joinpath(name)
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(image)
+        
+        self.size = size
+        self.frames += 1
+    
+    def write_many(self, images: List[Tuple[int, bytes, Tuple[int, int]]]) -> None:
+        """Saves the frames of a batch, (index, image file, size) each"""
+        for image in images:
+            self.write(*image)
+    
+    def get_manifest(self) -> JsonSerializable:
+        width, height = self.size or (0, 0)
+        
+        return {
+            "frames": self.frames,
+            "format": self.image_format,
+            "shard_size": self.shard_size,
+            "width": width,
+            "height": height,
+            "archive_id": self.archive_id,
+            "frame_opts": self.frame_opts,
+        }
+    
+    def close(self) -> None:
+        """Writes the manifest, the archive is complete afterwards"""
+        manifest = json.dumps(self.get_manifest(), indent=4)
+        
+        if self._zip is not None:
+            self._zip.writestr(constants.FRAME_ARCHIVE_MANIFEST, manifest)
+            self._zip.close()
+            self._zip = None
+        elif self.output.exists():
+            self.output.joinpath(constants.FRAME_ARCHIVE_MANIFEST).write_text(manifest, encoding="utf-8")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        elif self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+
+class FrameArchiveCapture:
+    """
+    Reads the frames of a frame archive (see `FrameArchiveWriter`) as grayscale. Up to `readahead` of the following
+    frames are loaded by `threads` threads while the current one is decoded, no video has to be decoded at all.
+    
+    Implements the part of the `VideoCapture` interface used by the decoder (`read`, `get`, `set`, `isOpened`,
+    `release`), like `FFmpegCapture`. Seeking is exact, so single packages can be restored using the index.
+    
+    Missing frames are returned as empty (light) frames, the decoder reports them like unreadable frames.
+    """
+    
+    def __init__(
+            self,
+            path: PathStr,
+            *,
+            threads: Optional[int] = None,
+            readahead: int = constants.FRAME_ARCHIVE_READAHEAD,
+    ):
+        """
+        :param path: The folder or .zip file.
+        :param threads: Amount of threads loading the frames, if None, one per cpu will be used.
+        :param readahead: Amount of frames that are loaded in advance.
+        """
+        self.path = pstr(path)
+        self.readahead = max(readahead, 1)
+        self._zip = zipfile.ZipFile(self.path) if is_zip_archive(self.path) else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Deque[Future] = deque()
+        
+        try:
+            self.manifest = json.loads(self._read(constants.FRAME_ARCHIVE_MANIFEST))
+        except (FileNotFoundError, KeyError):
+            self.release()
+            raise DecoderFailed(f'"{self.path}" isn`t a complete frame archive, its manifest is missing!')
+        
+        self.frame_count: int = self.manifest["frames"]
+        self.width: int = self.manifest["width"]
+        self.height: int = self.manifest["height"]
+        self.frame_opts: Kwargs = self.manifest["frame_opts"]
+        
+        self.position = 0
+        self._executor = ThreadPoolExecutor(get_threads(threads))
+    
+    def _read(self, name: str) -> bytes:
+        if self._zip is not None:
+            return self._zip.read(name)
+        return self.path.joinpath(name).read_bytes()
+    
+    def _load(self, index: int) -> np.ndarray:
+        name = get_frame_name(index, self.manifest["format"], self.manifest["shard_size"])
+        
+        try:
+            image = Image.open(io.BytesIO(self._read(name)))
+        except (FileNotFoundError, KeyError):
+            METRICS.count("frames_missing")
+            return np.full((self.height, self.width), 255, dtype=np.uint8)
+        
+        return np.asarray(image.convert("L"))
+    
+    def _fill(self) -> None:
+        """Queues the following frames until `readahead` frames are pending"""
+        queued = self.position + len(self._pending)
+        
+        while len(self._pending) < self.readahead and queued < self.frame_count:
+            self._pending.append(self._executor.submit(self._load, queued))
+            queued += 1
+    
+    def _clear(self) -> None:
+        while self._pending:
+            self._pending.popleft().cancel()
+    
+    def isOpened(self) -> bool:
+        return self._executor is not None
+    
+    @measure("archive_read")
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Reads the next frame, like `VideoCapture.read`"""
+        if self._executor is None or self.position >= self.frame_count:
+            return False, None
+        
+        self._fill()
+        frame = self._pending.popleft().result()
+        self.position += 1
+        self._fill()
+        
+        return True, frame
+    
+    def get(self, prop: int) -> float:
+        if prop == CAP_PROP_POS_FRAMES:
+            return self.position
+        if prop == CAP_PROP_FRAME_COUNT:
+            return self.frame_count
+        if prop == CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == CAP_PROP_FPS:
+            return float(constants.DEFAULT_FFMPEG_OPTS["-framerate"])
+        return 0
+    
+    def set(self, prop: int, value: float) -> bool:
+        """Only seeking (`CAP_PROP_POS_FRAMES`) is supported"""
+        if prop != CAP_PROP_POS_FRAMES:
+            return False
+        
+        self._clear()
+        self.position = int(value)
+        
+        return True
+    
+    def release(self) -> None:
+        if self._executor is not None:
+            self._clear()
+            self._executor.shutdown()
+            self._executor = None
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+    
+    def __del__(self):
+        self.release()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import base64
+import hashlib
+import json
+import logging
+import re
+import secrets
+import zlib
+from typing import *
+
+import constants
+from exceptions import DecoderFailed, FramesMissing
+
+frame_header_regex = re.compile(constants.FRAME_HEADER_REGEX)
+parity_header_regex = re.compile(constants.PARITY_HEADER_REGEX)
+
+
+class FrameHeader(NamedTuple):
+    archive_id: str
+    index: int
+    total: int
+    crc: int
+
+
+class ParityHeader(NamedTuple):
+    archive_id: str
+    group: int
+    index: int
+    group_size: int
+    total: int
+    crc: int
+
+
+def create_archive_id(chunks: Optional[List[str]] = None, opts: Optional[dict] = None) -> str:
+    """
+    Returns an archive id. If `chunks` are given, it`s derived from them and `opts`, so encoding the same data
+    again (e.g. resuming an interrupted encoding) results in the same frames. Otherwise, it`s random.
+    """
+    if chunks is None:
+        return secrets.token_hex(4)
+    
+    digest = hashlib.blake2b(json.dumps(opts, sort_keys=True, default=str).encode("utf-8"), digest_size=4)
+    
+    for chunk in chunks:
+        digest.update(chunk.encode(constants.ENCODE_TYPE))
+        # Separates the chunks, they can`t contain it
+        digest.update(b"\0")
+    
+    return digest.hexdigest()
+
+
+def get_crc(chunk: str) -> int:
+    return zlib.crc32(chunk.encode(constants.ENCODE_TYPE))
+
+
+def add_frame_headers(
+        chunks: List[str],
+        archive_id: Optional[str] = None,
+        *,
+        parity_frames: int = 0,
+        group_size: int = constants.ERASURE_GROUP_SIZE,
+) -> List[str]:
+    """
+    Prefixes every chunk with a frame header.
+    
+    :param chunks: The split data
+    :param archive_id: Optional. An id consisting of 8 hex characters, if None, a random one will be used.
+    :param parity_frames: Amount of parity frames that will be added after every `group_size` data frames. Up to
+    `parity_frames` lost frames per group can be rebuilt. NOTE: Parity frames are 25% bigger than data frames.
+    :param group_size: Amount of data frames per group.
+    :return: The chunks with headers
+    """
+    if archive_id is None:
+        archive_id = create_archive_id()
+    total = len(chunks)
+    found = []
+    
+    for group, start in enumerate(range(0, total, group_size)):
+        group_chunks = chunks[start:start + group_size]
+        
+        found.extend(
+            constants.FRAME_HEADER.format(archive_id=archive_id, index=index, total=total, crc=get_crc(chunk)) + chunk
+            for index, chunk in enumerate(group_chunks, start)
+        )
+        
+        if parity_frames:
+            # numpy is only needed for parity frames
+            from erasure import encode_group
+            
+            parities = encode_group([chunk.encode(constants.ENCODE_TYPE) for chunk in group_chunks], group_size,
+                                    parity_frames)
+            
+            for index, parity in enumerate(parities):
+                parity = base64.b85encode(parity).decode("ascii")
+                found.append(constants.PARITY_HEADER.format(
+                    archive_id=archive_id, group=group, index=index, group_size=group_size, total=total,
+                    crc=get_crc(parity)
+                ) + parity)
+    
+    return found
+
+
+def read_frame(data: str) -> Tuple[Union[FrameHeader, ParityHeader, None], str]:
+    """Splits decoded frame data into its header and chunk. The header is None for frames without a header."""
+    if (match := frame_header_regex.match(data)) is not None:
+        archive_id, *values = match.groups()
+        return FrameHeader(archive_id, *(int(value, 16) for value in values)), data[match.end():]
+    
+    if (match := parity_header_regex.match(data)) is not None:
+        archive_id, *values = match.groups()
+        return ParityHeader(archive_id, *(int(value, 16) for value in values)), data[match.end():]
+    
+    return None, data
+
+
+def get_ranges(indexes: Iterable[int]) -> List[Tuple[int, int]]:
+    """Groups indexes into [start, end) ranges"""
+    ranges = []
+    
+    for index in sorted(indexes):
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    
+    return [(start, end) for start, end in ranges]
+
+
+class FrameAssembler:
+    """
+    Puts decoded frames back into order using their headers. Duplicated frames are ignored, missing and corrupt frames
+    are logged as soon as they are noticed and rebuilt from parity frames if possible. Frames without headers are passed
+    through unchanged.
+    """
+    # Released chunks are kept this long, so groups with a missing frame can be rebuilt
+    HISTORY = 256
+    
+    def __init__(self, start: int = 0, end: Optional[int] = None):
+        """
+        :param start: Index of the first frame that should be assembled, earlier frames are ignored.
+        :param end: Optional. Index after the last frame that should be assembled, later frames are ignored.
+        """
+        self.archive_id: Optional[str] = None
+        self.total: Optional[int] = None
+        self.start = start
+        self.end = end
+        self.position = start
+        self.highest = start - 1
+        self.duplicates = 0
+        self.corrupt: Set[int] = set()
+        self.recovered = 0
+        self._chunks: Dict[int, str] = {}
+        self._released: Dict[int, str] = {}
+        self._parities: Dict[int, Dict[int, bytes]] = {}
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Returns the state of the assembler as a json serializable dict, see `from_state`"""
+        return {
+            "archive_id": self.archive_id,
+            "total": self.total,
+            "start": self.start,
+            "end": self.end,
+            "position": self.position,
+            "highest": self.highest,
+            "chunks": {str(index): chunk for index, chunk in self._chunks.items()},
+            "released": {str(index): chunk for index, chunk in self._released.items()},
+            "parities": {
+                str(group): {str(index): base64.b85encode(chunk).decode("ascii") for index, chunk in parities.items()}
+                for group, parities in self._parities.items()
+            },
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "FrameAssembler":
+        """Restores an assembler from the state returned by `get_state`"""
+        assembler = cls(state["start"], state["end"])
+        assembler.archive_id = state["archive_id"]
+        assembler.total = state["total"]
+        assembler.position = state["position"]
+        assembler.highest = state["highest"]
+        assembler._chunks = {int(index): chunk for index, chunk in state["chunks"].items()}
+        assembler._released = {int(index): chunk for index, chunk in state["released"].items()}
+        assembler._parities = {
+            int(group): {int(index): base64.b85decode(chunk) for index, chunk in parities.items()}
+            for group, parities in state["parities"].items()
+        }
+        
+        return assembler
+    
+    @property
+    def has_headers(self) -> bool:
+        return self.archive_id is not None
+    
+    @property
+    def last(self) -> Optional[int]:
+        """Index after the last frame that should be assembled"""
+        if self.total is None:
+            return self.end
+        if self.end is None:
+            return self.total
+        return min(self.total, self.end)
+    
+    @property
+    def is_complete(self) -> bool:
+        return self.last is not None and self.position >= self.last
+    
+    def add(self, data: str) -> str:
+        """
+        Adds the decoded data of a frame.
+        
+        :return: The data that is ready now, in order. Empty if the frame can`t be used yet.
+        """
+        header, chunk = read_frame(data)
+        
+        if header is None:
+            return chunk
+        
+        if self.archive_id is None:
+            self.archive_id, self.total = header.archive_id, header.total
+        elif header.archive_id != self.archive_id:
+            logging.warning(f'Skipping a frame of a different archive "{header.archive_id}".')
+            return ""
+        
+        if type(header) is ParityHeader:
+            self._add_parity(header, chunk)
+        else:
+            if get_crc(chunk) != header.crc:
+                self.corrupt.add(header.index)
+                logging.warning(f'Frame {header.index} is corrupt.')
+                return ""
+            
+            if self.end is not None and header.index >= self.end:
+                return ""
+            
+            if header.index < self.position or header.index in self._chunks:
+                if header.index >= self.start:
+                    self.duplicates += 1
+                return ""
+            
+            if header.index > self.highest + 1:
+                logging.warning(f'Frames {self.highest + 1} to {header.index - 1} are missing so far.')
+            self.highest = max(self.highest, header.index)
+            self.corrupt.discard(header.index)
+            self._chunks[header.index] = chunk
+        
+        return self._release()
+    
+    def _release(self) -> str:
+        ready = []
+        while self.position in self._chunks:
+            chunk = self._chunks.pop(self.position)
+            ready.append(chunk)
+            self._released[self.position] = chunk
+            self._released.pop(self.position - self.HISTORY, None)
+            self.position += 1
+        
+        return "".join(ready)
+    
+    def _get_chunk(self, index: int) -> Optional[str]:
+        if index in self._chunks:
+            return self._chunks[index]
+        return self._released.get(index)
+    
+    def _add_parity(self, header: ParityHeader, chunk: str) -> None:
+        if get_crc(chunk) != header.crc:
+            logging.warning(f'Parity frame {header.index} of group {header.group} is corrupt.')
+            return
+        
+        self._parities.setdefault(header.group, {})[header.index] = base64.b85decode(chunk)
+        
+        start = header.group * header.group_size
+        end = min(start + header.group_size, header.total)
+        chunks = {
+            index - start: chunk.encode(constants.ENCODE_TYPE)
+            for index in range(start, end)
+            if (chunk := self._get_chunk(index)) is not None
+        }
+        
+        if len(chunks) == end - start:
+            # Nothing to rebuild
+            del self._parities[header.group]
+            return
+        
+        from erasure import decode_group
+        
+        try:
+            rebuilt = decode_group(chunks, self._parities[header.group], end - start, header.group_size)
+        except DecoderFailed:
+            # Wait for more parity frames
+            return
+        
+        del self._parities[header.group]
+        
+        for index, chunk in rebuilt.items():
+            index += start
+            if index < self.position or (self.end is not None and index >= self.end):
+                continue
+            logging.info(f'Rebuilt frame {index} from parity frames.')
+            self.recovered += 1
+            self.highest = max(self.highest, index)
+            self.corrupt.discard(index)
+            self._chunks[index] = chunk.rstrip(b"\x00").decode(constants.ENCODE_TYPE)
+    
+    def get_missing(self) -> List[int]:
+        """Returns the indexes of all frames that haven`t been decoded (yet)"""
+        if self.last is None:
+            return []
+        
+        return [index for index in range(self.position, self.last) if index not in self._chunks]
+    
+    def get_missing_ranges(self) -> List[Tuple[int, int]]:
+        """Returns the [start, end) frame ranges that need to be read again"""
+        return get_ranges(self.get_missing())
+    
+    def check(self) -> None:
+        """
+        :raises:
+            FramesMissing: Not all frames could be decoded
+        """
+        if missing := self.get_missing_ranges():
+            ranges = ", ".join(f"{start}-{end - 1}" for start, end in missing)
+            raise FramesMissing(f'Frames of archive "{self.archive_id}" are missing or corrupt: {ranges}', missing)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import hashlib
+import json
+from pathlib import Path
+from typing import *
+
+import constants
+from typing_types import PathStr
+from utils import pstr
+
+
+def get_frame_path(temp: Path, index: int, shard_size: int = constants.TEMP_SHARD_SIZE) -> Path:
+    """Returns the path of a frame in a temp folder, e.g. "temp/00001/image-1234.png" with a `shard_size` of 1000"""
+    return temp.joinpath(f"{index // shard_size:05d}", f"image-{index}.png")
+
+
+def get_frames_key(data: List[str], opts: dict) -> str:
+    """Returns a key of the chunks and the QR-Code options, frames of a journal with another key can`t be reused"""
+    digest = hashlib.blake2b(json.dumps(opts, sort_keys=True).encode("utf-8"), digest_size=16)
+    
+    for chunk in data:
+        digest.update(chunk.encode(constants.ENCODE_TYPE))
+        # Separates the chunks, they can`t contain it
+        digest.update(b"\0")
+    
+    return digest.hexdigest()
+
+
+class TempFrameStore:
+    """
+    The frames of the ffmpeg writer in the temp folder. They`re sharded into subfolders of `TEMP_SHARD_SIZE` frames
+    (see `get_frame_path`), so no folder gets too big.
+    
+    Finished frames are appended to a journal (`TEMP_JOURNAL`), resuming only reads it instead of listing the folder.
+    A frame is only added once its batch has been saved completely, so a crash never marks a broken frame as done.
+    The first line of the journal is the key of the frames (see `get_frames_key`), a journal of other data or
+    options is discarded.
+    """
+    
+    def __init__(self, temp: PathStr, key: str, shard_size: int = constants.TEMP_SHARD_SIZE):
+        """
+        :param temp: The temp folder.
+        :param key: The key of the frames, see `get_frames_key`.
+        :param shard_size: Amount of frames per subfolder.
+        """
+        self.temp = pstr(temp)
+        self.key = key
+        self.shard_size = shard_size
+        self.journal = self.temp.joinpath(constants.TEMP_JOURNAL)
+        self._file: Optional[IO[str]] = None
+    
+    def get_path(self, index: int) -> Path:
+        return get_frame_path(self.temp, index, self.shard_size)
+    
+    def load(self) -> Set[int]:
+        """Returns the indexes of the frames that are done, reading the journal once"""
+        if not self.has_key():
+            return set()
+        
+        with self.journal.open("r", encoding="utf-8") as file:
+            # Skip the key
+            file.readline()
+            # The last line is incomplete if the process has been killed while writing it
+            return {int(line) for line in file if line.endswith("\n") and line.strip().isdigit()}
+    
+    def open(self, resume: bool = True) -> Set[int]:
+        """
+        Opens the journal for appending and returns the indexes of the frames that are done.
+        
+        :param resume: Whether the frames of the journal should be reused. Otherwise, it`s started over.
+        """
+        self.temp.mkdir(exist_ok=True, parents=True)
+        
+        if resume and self.has_key():
+            done = self.load()
+            self._file = self.journal.open("a", encoding="utf-8")
+            # Ends an incomplete last line, empty lines are ignored
+            self._file.write("\n")
+            return done
+        
+        self._file = self.journal.open("w", encoding="utf-8")
+        self._file.write(self.key + "\n")
+        self._file.flush()
+        
+        return set()
+    
+    def has_key(self) -> bool:
+        """Whether the journal exists and belongs to the same frames"""
+        if not self.journal.exists():
+            return False
+        
+        with self.journal.open("r", encoding="utf-8") as file:
+            return file.readline().strip() == self.key
+    
+    def prepare(self, indexes: Iterable[int]) -> None:
+        """Creates the subfolders of the given frames, so the workers don`t have to"""
+        for shard in {index // self.shard_size for index in indexes}:
+            self.temp.joinpath(f"{shard:05d}").mkdir(exist_ok=True)
+    
+    def mark_done(self, indexes: Iterable[int]) -> None:
+        """Appends finished frames to the journal"""
+        self._file.write("".join(f"{index}\n" for index in indexes))
+        self._file.flush()
+    
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import cProfile
+import json
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from multiprocessing.util import Finalize
+from pathlib import Path
+from threading import Lock
+from typing import *
+
+from typing_types import JsonSerializable, PathStr
+from utils import pstr, pstrnone
+
+# Files with these suffixes are written in the Prometheus text format, everything else as JSON
+PROMETHEUS_SUFFIXES = (".prom", ".txt")
+PROMETHEUS_PREFIX = "datatoqr"
+
+
+class Metrics:
+    """
+    Collects timers (amount of calls, total and maximum seconds) and counters of the hot paths of the encoder and
+    decoder. Every process has its own instance (`METRICS`), worker processes send theirs to the main process using
+    `collect` and `merge`.
+    """
+    
+    def __init__(self):
+        # name: [calls, seconds, max seconds]
+        self.timers: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.profile_directory: Optional[Path] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._finalizer: Optional[Finalize] = None
+        self._lock = Lock()
+    
+    def add_time(self, name: str, seconds: float, calls: int = 1, maximum: Optional[float] = None) -> None:
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += calls
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds if maximum is None else maximum)
+    
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    @contextmanager
+    def timer(self, name: str):
+        """Measures the run time of the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+    
+    def snapshot(self) -> JsonSerializable:
+        """Returns the metrics as a dict"""
+        with self._lock:
+            return {
+                "timers": {
+                    name: {"calls": int(calls), "seconds": seconds, "max_seconds": maximum}
+                    for name, (calls, seconds, maximum) in sorted(self.timers.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+    
+    def collect(self) -> JsonSerializable:
+        """Returns the metrics and resets them. Used by worker processes to send their metrics to the main process."""
+        snapshot = self.snapshot()
+        self.reset()
+        return snapshot
+    
+    def merge(self, snapshot: JsonSerializable) -> None:
+        """Adds the metrics of a snapshot, e.g. of a worker process"""
+        for name, timer in snapshot["timers"].items():
+            self.add_time(name, timer["seconds"], timer["calls"], timer["max_seconds"])
+        for name, amount in snapshot["counters"].items():
+            self.count(name, amount)
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+    
+    def to_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text format"""
+        snapshot = self.snapshot()
+        lines = []
+        
+        for metric, key, kind in (
+                ("calls_total", "calls", "counter"),
+                ("seconds_total", "seconds", "counter"),
+                ("max_seconds", "max_seconds", "gauge"),
+        ):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} {kind}")
+            lines.extend(
+                f'{PROMETHEUS_PREFIX}_{metric}{{name="{name}"}} {timer[key]}'
+                for name, timer in snapshot["timers"].items()
+            )
+        
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_count_total counter")
+        lines.extend(
+            f'{PROMETHEUS_PREFIX}_count_total{{name="{name}"}} {amount}'
+            for name, amount in snapshot["counters"].items()
+        )
+        
+        return "\n".join(lines) + "\n"
+    
+    def write(self, file: PathStr) -> None:
+        """Writes the metrics to `file`, in the Prometheus text format if it ends with one of `PROMETHEUS_SUFFIXES`"""
+        file = pstr(file)
+        
+        with file.open("w", encoding="utf-8") as opened:
+            if file.suffix in PROMETHEUS_SUFFIXES:
+                opened.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), opened, indent=4)
+    
+    def enable_profiling(self, directory: Optional[PathStr]) -> None:
+        """
+        Profiles the current process using cProfile. The stats are saved as "<directory>/profile-<pid>.prof" when the
+        process exits and can be read using `pstats`. Worker processes started with `init_worker` are profiled as well.
+        
+        :param directory: The folder the stats are saved in, if None, profiling will be disabled.
+        """
+        # A forked worker inherits the profiler of its parent, it must not save its stats
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._finalizer.cancel()
+            self._profiler = None
+        
+        self.profile_directory = pstrnone(directory)
+        if self.profile_directory is None:
+            return
+        
+        self.profile_directory.mkdir(exist_ok=True, parents=True)
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        self._finalizer = Finalize(
+            self, self._save_profile, args=(self._profiler, self.profile_directory), exitpriority=10
+        )
+    
+    @staticmethod
+    def _save_profile(profiler: cProfile.Profile, directory: Path) -> None:
+        profiler.disable()
+        profiler.dump_stats(str(directory.joinpath(f"profile-{os.getpid()}.prof")))
+
+
+METRICS = Metrics()
+
+
+def measure(name: str) -> Callable:
+    """Decorator, measures every call of the function using the timer `name` of `METRICS`"""
+    
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                METRICS.add_time(name, time.perf_counter() - start)
+        
+        return wrapper
+    
+    return decorator
+
+
+def init_worker(profile_directory: Optional[Path] = None) -> None:
+    """Initializer of worker processes, starts with empty metrics and enables profiling if requested"""
+    METRICS.reset()
+    METRICS.enable_profiling(profile_directory)
+
+
+@contextmanager
+def report(file: Optional[PathStr] = None, profile_directory: Optional[PathStr] = None):
+    """
+    Collects the metrics of the block and writes them to `file` afterwards, even if the block fails.
+    
+    :param file: Optional. The metrics file, see `Metrics.write`.
+    :param profile_directory: Optional. If given, the block (and its worker processes) will be profiled, see
+    `Metrics.enable_profiling`.
+    """
+    if profile_directory is not None:
+        METRICS.enable_profiling(profile_directory)
+    
+    try:
+        yield METRICS
+    finally:
+        if file is not None:
+            METRICS.write(file)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import json
+from typing import *
+
+import constants
+from exceptions import DecoderFailed, FramesMissing
+from typing_types import JsonSerializable, PathStr
+from utils import pstr
+
+
+def split_range(total: int, parts: int) -> List[Tuple[int, int]]:
+    """Splits `total` frames into `parts` [start, end) ranges of about the same size"""
+    size, rest = divmod(total, parts)
+    ranges = []
+    start = 0
+    
+    for part in range(parts):
+        end = start + size + (1 if part < rest else 0)
+        ranges.append((start, end))
+        start = end
+    
+    return ranges
+
+
+def create_partial(
+        data: str,
+        start: int,
+        end: int,
+        *,
+        total: Optional[int] = None,
+        archive_id: Optional[str] = None,
+) -> JsonSerializable:
+    """
+    Splits the data of the frames [start, end) into the leading fragment (the end of a package that started before
+    `start`), the complete packages and the trailing fragment (the start of a package that ends after `end`).
+    If the data contains no package end at all, everything is part of the leading fragment.
+    """
+    first = data.find(constants.FULL_DELIMITER)
+    last = data.rfind(constants.FULL_DELIMITER)
+    
+    if first == -1:
+        leading, complete, trailing = data, "", ""
+    else:
+        leading, complete, trailing = data[:first + 1], data[first + 1:last + 1], data[last + 1:]
+    
+    return {
+        "archive_id": archive_id,
+        "total": total,
+        "start": start,
+        "end": end,
+        "leading": leading,
+        "complete": complete,
+        "trailing": trailing,
+    }
+
+
+def write_partial(partial: JsonSerializable, file: PathStr, *, encoding: str = "utf-8") -> None:
+    file = pstr(file)
+    
+    with file.open("w", encoding=encoding) as file:
+        json.dump(partial, file, separators=(",", ":"))
+
+
+def read_partial(file: PathStr, *, encoding: str = "utf-8") -> JsonSerializable:
+    file = pstr(file)
+    
+    with file.open("r", encoding=encoding) as file:
+        return json.load(file)
+
+
+def merge_partials(partials: Iterable[JsonSerializable]) -> str:
+    """
+    Stitches partial results of neighbouring frame ranges together.
+    
+    :return: The raw data of all packages
+    
+    :raises:
+        FramesMissing: The ranges of the partial results don`t cover the whole archive
+        DecoderFailed: The partial results belong to different archives
+    """
+    partials = sorted(partials, key=lambda x: x["start"])
+    
+    if len({partial["archive_id"] for partial in partials}) > 1:
+        raise DecoderFailed("The partial results belong to different archives.")
+    
+    total = next((partial["total"] for partial in partials if partial["total"] is not None), None)
+    missing = []
+    position = 0
+    for partial in partials:
+        if partial["start"] > position:
+            missing.append((position, partial["start"]))
+        elif partial["start"] < position:
+            raise DecoderFailed(f'The partial results overlap at frame {partial["start"]}.')
+        position = max(position, partial["end"])
+    if total is not None and position < total:
+        missing.append((position, total))
+    if missing:
+        ranges = ", ".join(f"{start}-{end - 1}" for start, end in missing)
+        raise FramesMissing(f'No partial results for the frames {ranges}.', missing)
+    
+    found = []
+    fragment = ""
+    for partial in partials:
+        fragment += partial["leading"]
+        
+        # The leading fragment only ends with a package end if the data contains one
+        if fragment.endswith(constants.FULL_DELIMITER):
+            found.append(fragment)
+            found.append(partial["complete"])
+            fragment = partial["trailing"]
+    
+    if fragment:
+        raise DecoderFailed(f'The last package is incomplete: "{fragment[:20]}"...')
+    
+    return "".join(found)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import argparse
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+import benchmark
+import constants
+from typing_types import *
+
+
+def parse_crf(value: str) -> Optional[int]:
+    """Parses a CRF of the command line, "none" uses the default of the codec"""
+    return None if value.lower() == "none" else int(value)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the encoder or decoder with synthetic data and compare the results with a baseline, "
+                    "check the start up time of the command line tools or find the best ffmpeg settings."
+    )
+    parser.add_argument(
+        "method",
+        type=str,
+        help='What should be benchmarked. "startup" imports every command line module in a fresh interpreter and '
+             'exits with 1 if one takes longer than the budget or imports a heavy dependency (cv2, numpy, pyzbar, '
+             'tqdm or libmagic). "autotune" tries several ffmpeg settings on a sample payload and saves the best '
+             'ones as a profile for the encoder (see --ffmpeg-profile), exits with 1 if none decodes well enough.',
+        choices=["encode", "decode", "startup", "autotune"]
+    )
+    parser.add_argument(
+        "-c", "--corpus",
+        type=str,
+        help=f'The synthetic corpora to use, multiple can be given. (default: all of {", ".join(benchmark.CORPORA)} '
+             f'when encoding, "mixed" when decoding, "sample" when autotuning, which only uses the first one)',
+        choices=list(benchmark.CORPORA),
+        action="append",
+    )
+    parser.add_argument(
+        "-s", "--scale",
+        type=float,
+        help="Multiplies the amount of files of every corpus. (default: 1)",
+        default=1.0
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed of the synthetic corpora, the same seed always creates the same data. (default: 0)",
+        default=0
+    )
+    parser.add_argument(
+        "-t", "--threads",
+        type=int,
+        help="Amount of processes used to create the frames in the end-to-end run. (default: one per cpu)",
+        default=None
+    )
+    parser.add_argument(
+        "--versions",
+        type=int,
+        help=f'Decoding only. The QR-Code versions to encode with. (default: {benchmark.DECODE_MATRIX["version"]})',
+        nargs="+",
+    )
+    parser.add_argument(
+        "--error-corrections",
+        type=str,
+        help=f'Decoding only. The error correction levels to encode with. '
+             f'(default: {benchmark.DECODE_MATRIX["error_correction"]})',
+        choices=list(benchmark.ERROR_CORRECTIONS),
+        nargs="+",
+    )
+    parser.add_argument(
+        "--box-sizes",
+        type=int,
+        help=f'Decoding only. The box sizes to encode with. (default: {benchmark.DECODE_MATRIX["box_size"]})',
+        nargs="+",
+    )
+    parser.add_argument(
+        "--chunk-sizes",
+        type=int,
+        help=f'Decoding only. The amounts of characters per frame to encode with. '
+             f'(default: {benchmark.DECODE_MATRIX["chunk_size"]})',
+        nargs="+",
+    )
+    parser.add_argument(
+        "--codecs",
+        type=str,
+        help=f'Decoding and autotuning. The ffmpeg video codecs to encode with. '
+             f'(default: {benchmark.DECODE_MATRIX["codec"]} when decoding, {benchmark.AUTOTUNE_MATRIX["codec"]} when '
+             f'autotuning)',
+        nargs="+",
+    )
+    parser.add_argument(
+        "--presets",
+        type=str,
+        help=f'Decoding and autotuning. The ffmpeg presets to encode with, only used by '
+             f'{", ".join(sorted(benchmark.PRESET_CODECS))}. (default: {benchmark.DECODE_MATRIX["preset"]} when '
+             f'decoding, {benchmark.AUTOTUNE_MATRIX["preset"]} when autotuning)',
+        nargs="+",
+    )
+    parser.add_argument(
+        "--crfs",
+        type=parse_crf,
+        help=f'Autotuning only. The CRFs to try, "none" uses the default of the codec. Only used by '
+             f'{", ".join(sorted(benchmark.CRF_CODECS))}. (default: {benchmark.AUTOTUNE_MATRIX["crf"]})',
+        nargs="+",
+    )
+    parser.add_argument(
+        "--pix-fmts",
+        type=str,
+        help=f'Autotuning only. The pixel formats to try, "none" uses the default of the codec. '
+             f'(default: {benchmark.AUTOTUNE_MATRIX["pix_fmt"]})',
+        nargs="+",
+    )
+    parser.add_argument(
+        "--min-success-rate",
+        type=float,
+        help=f'Autotuning only. Settings decoding a smaller share of the frames can`t be picked. '
+             f'(default: {constants.AUTOTUNE_MIN_SUCCESS_RATE})',
+        default=constants.AUTOTUNE_MIN_SUCCESS_RATE
+    )
+    parser.add_argument(
+        "--ffmpeg-profile",
+        type=str,
+        help='Autotuning only. Save the best settings to this file, pass it to "qr_encoder --ffmpeg-profile". '
+             '(default: "ffmpeg_profile.json")',
+        default="ffmpeg_profile.json"
+    )
+    parser.add_argument(
+        "--methods",
+        type=str,
+        help=f'Decoding only. The decode methods to benchmark. (default: all)',
+        choices=list(benchmark.DECODE_METHODS),
+        nargs="+",
+    )
+    parser.add_argument(
+        "--no-crop",
+        help="Decoding and autotuning. Search the whole frame instead of only the region of the QR-Code.",
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "-w", "--work-dir",
+        type=str,
+        help="Folder for the corpora and the videos. (default: a temporary folder)",
+        default=None
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=str,
+        help="Save the results as JSON to this file, e.g. to use it as a baseline later.",
+        default=None
+    )
+    parser.add_argument(
+        "-b", "--baseline",
+        type=str,
+        help="Compare the results with a previously saved JSON file. Exits with 1 if a measurement regressed.",
+        default=None
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help=f'Relative slowdown that counts as a regression. '
+             f'(default: {constants.BENCHMARK_REGRESSION_THRESHOLD})',
+        default=constants.BENCHMARK_REGRESSION_THRESHOLD
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        help=f'Startup only. Maximum import time of a module in seconds. (default: {constants.STARTUP_BUDGET})',
+        default=constants.STARTUP_BUDGET
+    )
+    parser.add_argument(
+        "--ffmpeg",
+        type=str,
+        help='Path to the ffmpeg executable. (default: "ffmpeg")',
+        default="ffmpeg"
+    )
+    
+    return parser
+
+
+def parse_parser(parser: argparse.ArgumentParser) -> Kwargs:
+    args = vars(parser.parse_args())
+    
+    baseline = args["baseline"]
+    if baseline is not None and not (baseline := Path(baseline)).exists():
+        raise ValueError(f'Baseline not found! Given path: "{args["baseline"]}"')
+    
+    method = args["method"]
+    method_kwargs = {}
+    if method == "decode":
+        matrix = {
+            key: values
+            for key, values in {
+                "version": args["versions"],
+                "error_correction": args["error_corrections"],
+                "box_size": args["box_sizes"],
+                "chunk_size": args["chunk_sizes"],
+                "codec": args["codecs"],
+                "preset": args["presets"],
+            }.items()
+            if values
+        }
+        method_kwargs = {
+            "matrix": matrix,
+            "methods": args["methods"] or list(benchmark.DECODE_METHODS),
+            "crop": not args["no_crop"],
+        }
+    elif method == "autotune":
+        matrix = {
+            key: values
+            for key, values in {
+                "codec": args["codecs"],
+                "preset": args["presets"],
+                "crf": args["crfs"],
+                "pix_fmt": [None if value.lower() == "none" else value for value in args["pix_fmts"] or []],
+            }.items()
+            if values
+        }
+        method_kwargs = {
+            "matrix": matrix,
+            "min_success_rate": args["min_success_rate"],
+            "crop": not args["no_crop"],
+            "ffmpeg_profile": Path(args["ffmpeg_profile"]),
+        }
+    
+    if args["corpus"]:
+        corpora = args["corpus"]
+    else:
+        corpora = {"encode": list(benchmark.CORPORA), "autotune": ["sample"]}.get(method, ["mixed"])
+    
+    return {
+        "method": method,
+        "corpora": corpora,
+        **method_kwargs,
+        "scale": args["scale"],
+        "seed": args["seed"],
+        "threads": args["threads"],
+        "work_dir": Path(args["work_dir"]) if args["work_dir"] is not None else None,
+        "output": Path(args["output"]) if args["output"] is not None else None,
+        "baseline": baseline,
+        "threshold": args["threshold"],
+        "budget": args["budget"],
+        "ffmpeg_location": Path(args["ffmpeg"]),
+    }
+
+
+def handle(**arguments) -> int:
+    """Runs the benchmark and returns the exit code, 1 if a measurement regressed"""
+    method = arguments.pop("method")
+    work_dir = arguments.pop("work_dir")
+    output = arguments.pop("output")
+    baseline = arguments.pop("baseline")
+    threshold = arguments.pop("threshold")
+    budget = arguments.pop("budget")
+    
+    if method == "startup":
+        results = benchmark.run_startup_benchmark(budget=budget)
+        print(benchmark.format_startup_results(results))
+        
+        if output is not None:
+            benchmark.write_results(results, output)
+        
+        return 0 if all(values["passed"] for values in results["results"].values()) else 1
+    
+    with tempfile.TemporaryDirectory() as temp:
+        folder = work_dir or Path(temp)
+        
+        if method == "encode":
+            results = benchmark.run_encode_benchmark(folder, **arguments)
+            print(benchmark.format_encode_results(results))
+        elif method == "autotune":
+            ffmpeg_profile = arguments.pop("ffmpeg_profile")
+            corpus = arguments.pop("corpora")[0]
+            results = benchmark.run_autotune(folder, corpus, **arguments)
+            print(benchmark.format_autotune_results(results))
+        else:
+            results = benchmark.run_decode_benchmark(folder, **arguments)
+            print(benchmark.format_decode_results(results))
+    
+    if output is not None:
+        benchmark.write_results(results, output)
+    
+    if method == "autotune":
+        if results["best"] is None:
+            logging.warning("No settings decoded well enough, no profile has been written.")
+            return 1
+        benchmark.write_ffmpeg_profile(results, ffmpeg_profile)
+    
+    if baseline is not None:
+        rows, regressions = benchmark.compare_results(results, benchmark.read_results(baseline), threshold)
+        print()
+        print(benchmark.format_comparison(rows, regressions))
+        
+        if regressions:
+            logging.warning(f"{len(regressions)} measurements regressed by more than {threshold:.0%}")
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    logging.info("Preparing...")
+    parser = create_parser()
+    
+    logging.info("Reading input")
+    kwargs = parse_parser(parser)
+    
+    logging.info("Running benchmark")
+    sys.exit(handle(**kwargs))
@@ -7,13 +7,19 @@ import logging
 import os
 from pathlib import Path
 
+import constants
+from archive_index import find_index
+from data.sinks import create_sink
 from decode import DumpDataExtractor, HandleDataExtractor
+from metrics import PROMETHEUS_SUFFIXES, report
+from stream_cache import StreamCache
 from typing_types import Kwargs
 
 AVAILABLE_METHODS = {
     "HANDLE": "handle",
     "DUMP": "dump",
-    "REVIEW": "review"
+    "REVIEW": "review",
+    "PARTIAL": "partial"
 }
 DEFAULT_AVAILABLE_METHODS = AVAILABLE_METHODS["HANDLE"]
 
@@ -23,7 +29,7 @@ def create_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "video",
         type=str,
-        help="Path to the video",
+        help='Path to the video, or to a folder or .zip file of frames created using "qr_encoder -w frames"',
     )
     parser.add_argument(
         "-m", "--method",
@@ -40,6 +46,102 @@ def create_parser() -> argparse.ArgumentParser:
         default=False,
         action="store_true"
     )
+    parser.add_argument(
+        "-d", "--direct",
+        help="Read the QR-Codes directly using the known geometry of the encoder (much faster for unscaled videos). "
+             "Frames that can`t be read this way will be decoded using pyzbar.",
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "--ffmpeg",
+        type=str,
+        help="Read the frames as grayscale from an ffmpeg subprocess using multiple threads instead of OpenCV. "
+             "Optionally the path to the ffmpeg executable. (default: \"ffmpeg\")",
+        nargs="?",
+        const="ffmpeg",
+        default=None
+    )
+    parser.add_argument(
+        "--no-crop",
+        help="Search the whole frame for the QR-Code every time. By default, only the region where the QR-Code has "
+             "been found is searched (faster for scaled or letterboxed videos).",
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "-s", "--skip-duplicates",
+        help="Decode consecutive identical frames only once. Use this for videos that have been re-muxed or played "
+             "back with a different frame rate.",
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "--cache",
+        help=f'Cache the decoded data of the video in "{constants.CACHE_DIRECTORY}", so dumping and handling the same '
+             f'video only decodes it once.',
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help='Save the progress of the "handle" method regularly to "<video>.checkpoint.json", so an interrupted '
+             'decoding can be continued using "--resume". The checkpoint is removed once the video has been handled.',
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "--resume",
+        help='Continue an interrupted decoding at its checkpoint (see "--checkpoint"), files that have already been '
+             'handled won`t be written again. Implies "--checkpoint".',
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "-i", "--include",
+        type=str,
+        help="Only handle files whose path matches this glob pattern (e.g. \"folder/*.txt\"). Can be used multiple "
+             "times. If the video has an index, only the frames of these files will be decoded.",
+        action="append",
+        default=[]
+    )
+    parser.add_argument(
+        "-e", "--exclude",
+        type=str,
+        help="Don`t handle files whose path matches this glob pattern. Can be used multiple times.",
+        action="append",
+        default=[]
+    )
+    parser.add_argument(
+        "-r", "--range",
+        type=str,
+        help='The data frames "<start>:<end>" (end exclusive) that should be decoded by the "partial" method. Use '
+             '"qr_merge" to merge the partial results.',
+        default=None
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=str,
+        help='Where the files of the "handle" method should be restored to: a folder, a ".tar", ".tar.gz", ".tgz", '
+             '".tar.bz2", ".tar.xz" or ".zip" archive or "-" to stream a tar archive to stdout. (default: cwd) For the '
+             '"partial" method, the path the partial result should be saved to. (default: '
+             '"<video>.<start>-<end>.partial.json")',
+        default=None
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        help=f'Save timings and counters of the hot paths to this file when finished, in the Prometheus text format '
+             f'if it ends with {" or ".join(PROMETHEUS_SUFFIXES)}, otherwise as JSON.',
+        default=None
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help='Profile the main process and every worker process using cProfile. The stats are saved in this folder '
+             'as "profile-<pid>.prof".',
+        default=None
+    )
     parser.add_argument(
         "-k", "--kwargs",
         type=argparse.FileType("r", encoding="utf-8"),
@@ -63,30 +165,108 @@ def parse_parser(parser: argparse.ArgumentParser) -> Kwargs:
     if not video.exists():
         raise ValueError(f'Video not found! Given path: "{str(video)}"')
     
+    frame_range = None
+    if args["method"] == AVAILABLE_METHODS["PARTIAL"]:
+        if args["range"] is None:
+            raise ValueError(f'The "{AVAILABLE_METHODS["PARTIAL"]}" method requires a range!')
+        
+        start, end = args["range"].split(":")
+        frame_range = (int(start), int(end))
+    
     return {
         "video": video,
         "method": args["method"],
         "log": args["log"],
+        "direct": args["direct"],
+        "crop": not args["no_crop"],
+        "ffmpeg": args["ffmpeg"],
+        "skip_duplicates": args["skip_duplicates"],
+        "checkpoint": args["checkpoint"] or args["resume"],
+        "resume": args["resume"],
+        "cache": args["cache"],
+        "include": args["include"],
+        "exclude": args["exclude"],
+        "range": frame_range,
+        "output": args["output"],
+        "metrics": args["metrics"],
+        "profile": args["profile"],
         "kwargs": kwargs
     }
 
 
 def handle(**arguments):
+    # These need cv2 and numpy, they`re only imported once needed, so e.g. "--help" stays fast
+    from ffmpeg_capture import FFmpegCapture
+    from frame_archive import FrameArchiveCapture, is_frame_archive
+    from roi import RegionOfInterest
+    from sampler import ModuleSampler
+    
     video = arguments.pop("video")
     method = arguments.pop("method")
     log = arguments.pop("log")
+    direct = arguments.pop("direct")
+    roi = RegionOfInterest() if arguments.pop("crop") else None
+    ffmpeg = arguments.pop("ffmpeg")
+    skip_duplicates = arguments.pop("skip_duplicates")
+    checkpoint = arguments.pop("checkpoint")
+    resume = arguments.pop("resume")
+    cache = StreamCache() if arguments.pop("cache") else None
+    include = arguments.pop("include")
+    exclude = arguments.pop("exclude")
+    frame_range = arguments.pop("range")
+    output = arguments.pop("output")
     kwargs = arguments.pop("kwargs")
+    sampler = ModuleSampler.from_opts(kwargs.pop("frame_opts", None)) if direct else None
     
     if log is not False and (key := "log") not in kwargs:
         kwargs[key] = log
+    cap = FFmpegCapture(video, ffmpeg_location=Path(ffmpeg)) if ffmpeg is not None else None
+    
+    if is_frame_archive(video):
+        cap = FrameArchiveCapture(video)
+        # The frames haven`t been scaled, their modules can always be read directly
+        if sampler is None:
+            sampler = ModuleSampler.from_opts(cap.frame_opts)
     
-    if method == AVAILABLE_METHODS["HANDLE"]:
+    if method == AVAILABLE_METHODS["PARTIAL"]:
+        start, end = frame_range
+        if output is None:
+            output = video.with_name(f"{video.name}.{start}-{end}.partial.json")
+        
+        HandleDataExtractor.decode_video_partial(video, start, end, output, cap=cap, sampler=sampler, roi=roi)
+    elif method == AVAILABLE_METHODS["HANDLE"]:
         if (key := "base_path") not in kwargs:
             kwargs[key] = Path.cwd()
+        if output is not None:
+            kwargs["sink"] = create_sink(output)
         
-        HandleDataExtractor.handle_video_instantly(video, skip_error=False, **kwargs)
+        try:
+            if (
+                    (include or exclude) and (index := find_index(video)) is not None and
+                    (cache is None or not cache.contains(video, {"skip_duplicates": skip_duplicates}))
+            ):
+                logging.info("Using the index to decode the matching files only")
+                HandleDataExtractor.handle_video_from_index(
+                    video, include=include, exclude=exclude, index=index, cap=cap, sampler=sampler, roi=roi, **kwargs
+                )
+            else:
+                HandleDataExtractor.handle_video_instantly(
+                    video, skip_error=False, cap=cap, sampler=sampler, roi=roi, skip_duplicates=skip_duplicates,
+                    include=include, exclude=exclude, checkpoint=checkpoint, resume=resume, cache=cache, **kwargs
+                )
+        finally:
+            if (sink := kwargs.get("sink")) is not None:
+                sink.close()
+    elif method == AVAILABLE_METHODS["DUMP"] and Path(kwargs.get("file", "")).suffix in constants.JSON_LINES_SUFFIXES:
+        # JSON Lines are written while the video is decoded
+        DumpDataExtractor.dump_video_to_json_lines(
+            video, kwargs["file"], encoding=kwargs.get("encoding", "utf-8"), cap=cap, sampler=sampler, roi=roi,
+            skip_duplicates=skip_duplicates, cache=cache
+        )
     else:
-        data = HandleDataExtractor.decode_video(video)
+        data = HandleDataExtractor.decode_video(
+            video, cap=cap, sampler=sampler, roi=roi, skip_duplicates=skip_duplicates, cache=cache
+        )
         
         if method == AVAILABLE_METHODS["DUMP"]:
             DumpDataExtractor.dump_to_json(data, **kwargs)
@@ -111,4 +291,5 @@ if __name__ == "__main__":
     kwargs = parse_parser(parser)
     
     logging.info("Handling data")
-    handle(**kwargs)
+    with report(kwargs.pop("metrics"), kwargs.pop("profile")):
+        handle(**kwargs)
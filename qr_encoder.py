@@ -5,7 +5,10 @@ import argparse
 import json
 import logging
 
+import constants
+from data.sources import SOURCES, ChainSource, StdinSource
 from encode import FileDataInsertor
+from metrics import PROMETHEUS_SUFFIXES, report
 from typing_types import *
 from typing_types import Kwargs
 
@@ -16,8 +19,23 @@ def create_parser() -> argparse.ArgumentParser:
         "target",
         type=str,
         help=f'A single file, a folder or multiple files. You can use an absolute path or a relative one, '
-             f'which is relative to "{Path.cwd().absolute()}".',
-        nargs="+",
+             f'which is relative to "{Path.cwd().absolute()}". With the "tar" or "zip" source, the archives to '
+             f'encode ("-" for stdin).',
+        nargs="*",
+    )
+    parser.add_argument(
+        "-s", "--source",
+        type=str,
+        help='Where the files come from: "files" (the targets), "tar" or "zip" (the members of the target archives, '
+             'without extracting them) or "stdin" (everything from stdin as a single file). (default: "files")',
+        default="files",
+        choices=["files", "tar", "zip", "stdin"]
+    )
+    parser.add_argument(
+        "-n", "--name",
+        type=str,
+        help='The file name of the data read by the "stdin" source. (default: "stdin")',
+        default="stdin"
     )
     parser.add_argument(
         "-o", "--output",
@@ -25,6 +43,62 @@ def create_parser() -> argparse.ArgumentParser:
         help="The output video file path",
         default=None
     )
+    parser.add_argument(
+        "-p", "--parity-frames",
+        type=int,
+        help="Amount of parity frames per group of frames. Up to this many lost or unreadable frames per group can be "
+             "rebuilt when decoding. (default: 0)",
+        default=None
+    )
+    parser.add_argument(
+        "-g", "--group-size",
+        type=int,
+        help=f'Amount of data frames per parity group (default: {constants.ERASURE_GROUP_SIZE}).',
+        default=None
+    )
+    parser.add_argument(
+        "--ffmpeg-profile",
+        type=str,
+        help='Use the ffmpeg settings of a profile created by "qr_benchmark autotune".',
+        default=None
+    )
+    parser.add_argument(
+        "-w", "--writer",
+        type=str,
+        help='How the video is written: "ffmpeg" (saves the frames as images and runs ffmpeg), "opencv" (writes '
+             'the frames straight into the video, without temporary images) or "frames" (no video, the output is a '
+             'folder or .zip file of 1-bit images that "qr_decoder" can read directly). (default: "ffmpeg")',
+        default=None,
+        choices=["ffmpeg", "opencv", "frames"]
+    )
+    parser.add_argument(
+        "--fourcc",
+        type=str,
+        help=f'The codec of the "opencv" writer, e.g. "FFV1" (lossless) or "MJPG". '
+             f'(default: "{constants.OPENCV_FOURCC}")',
+        default=None
+    )
+    parser.add_argument(
+        "--frame-format",
+        type=str,
+        help=f'The image format of the "frames" writer. (default: "{constants.FRAME_ARCHIVE_FORMAT}")',
+        default=None,
+        choices=["png", "pbm"]
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        help=f'Save timings and counters of the hot paths to this file when finished, in the Prometheus text format '
+             f'if it ends with {" or ".join(PROMETHEUS_SUFFIXES)}, otherwise as JSON.',
+        default=None
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help='Profile the main process and every worker process using cProfile. The stats are saved in this folder '
+             'as "profile-<pid>.prof".',
+        default=None
+    )
     parser.add_argument(
         "-k", "--kwargs",
         type=argparse.FileType("r", encoding="utf-8"),
@@ -46,16 +120,33 @@ def parse_parser(parser: argparse.ArgumentParser) -> Kwargs:
     output = args.get("output")
     
     target: List[str] = args["target"]
-    found: Set[Path] = set()
-    for element in target:
-        if (path := Path(element)).exists():
-            found.add(path)
-        else:
-            logging.warning(f'Path "{element}" will be skipped because it doesn`t exist.')
+    source: str = args["source"]
+    if source == "stdin":
+        found = StdinSource(args["name"])
+    elif not target:
+        raise ValueError("No target given!")
+    elif source in SOURCES:
+        found = ChainSource(SOURCES[source](element) for element in target)
+    else:
+        found: Set[Path] = set()
+        for element in target:
+            if (path := Path(element)).exists():
+                found.add(path)
+            else:
+                logging.warning(f'Path "{element}" will be skipped because it doesn`t exist.')
+    
+    video_opts = kwargs.pop("video_opts", {})
+    # Given arguments take precedence over the kwargs file. Otherwise, the defaults of `create_video` are used.
+    for key in ("parity_frames", "group_size", "writer", "fourcc", "frame_format", "ffmpeg_profile"):
+        if args[key] is not None:
+            video_opts[key] = args[key]
     
     return {
         "target": found,
         "output": output,
+        "video_opts": video_opts,
+        "metrics": args["metrics"],
+        "profile": args["profile"],
         "kwargs": kwargs
     }
 
@@ -63,9 +154,10 @@ def parse_parser(parser: argparse.ArgumentParser) -> Kwargs:
 def handle(**arguments):
     target = arguments.pop("target")
     output = arguments.pop("output")
+    video_opts = arguments.pop("video_opts")
     kwargs = arguments.pop("kwargs")
     
-    FileDataInsertor.encode_multiple(target, output, **kwargs)
+    FileDataInsertor.encode_multiple(target, output, video_opts=video_opts, **kwargs)
 
 
 if __name__ == "__main__":
@@ -76,4 +168,5 @@ if __name__ == "__main__":
     kwargs = parse_parser(parser)
     
     logging.info("Handling data")
-    handle(**kwargs)
+    with report(kwargs.pop("metrics"), kwargs.pop("profile")):
+        handle(**kwargs)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import argparse
+import json
+import logging
+from pathlib import Path
+
+from decode import HandleDataExtractor
+from typing_types import *
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Merge the partial results of "qr_decoder -m partial" and handle the data.'
+    )
+    parser.add_argument(
+        "partials",
+        type=str,
+        help="The partial result files of all frame ranges of a video.",
+        nargs="+",
+    )
+    parser.add_argument(
+        "-l", "--log",
+        help="Whether the decoder should log its state.",
+        default=False,
+        action="store_true"
+    )
+    parser.add_argument(
+        "-k", "--kwargs",
+        type=argparse.FileType("r", encoding="utf-8"),
+        help="A .json file that should be read for kwargs that should be passed"
+    )
+    
+    return parser
+
+
+def parse_parser(parser: argparse.ArgumentParser) -> Kwargs:
+    args = vars(parser.parse_args())
+    kwargs_file = args.get("kwargs")
+    
+    if kwargs_file is not None:
+        kwargs = json.load(kwargs_file)
+    else:
+        kwargs = {}
+    
+    partials: List[Path] = []
+    for element in args["partials"]:
+        if not (path := Path(element)).exists():
+            raise ValueError(f'Partial result not found! Given path: "{element}"')
+        partials.append(path)
+    
+    return {
+        "partials": partials,
+        "log": args["log"],
+        "kwargs": kwargs
+    }
+
+
+def handle(**arguments):
+    partials = arguments.pop("partials")
+    log = arguments.pop("log")
+    kwargs = arguments.pop("kwargs")
+    
+    if log is not False and (key := "log") not in kwargs:
+        kwargs[key] = log
+    if (key := "base_path") not in kwargs:
+        kwargs[key] = Path.cwd()
+    
+    HandleDataExtractor.handle_partial_results(partials, **kwargs)
+
+
+if __name__ == "__main__":
+    logging.info("Preparing...")
+    parser = create_parser()
+    
+    logging.info("Reading input")
+    kwargs = parse_parser(parser)
+    
+    logging.info("Handling data")
+    handle(**kwargs)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+# Reed-Solomon arithmetic over GF(256) using the QR-Code field (primitive polynomial 0x11D, generator 2)
+
+from typing import *
+
+import numpy as np
+
+from exceptions import DecoderFailed
+
+PRIMITIVE = 0x11D
+
+GF_EXP = np.zeros(512, dtype=np.uint8)
+GF_LOG = np.zeros(256, dtype=np.int32)
+
+
+def _build_tables() -> None:
+    value = 1
+    for i in range(255):
+        GF_EXP[i] = value
+        GF_LOG[value] = i
+        value <<= 1
+        if value & 0x100:
+            value ^= PRIMITIVE
+    GF_EXP[255:510] = GF_EXP[:255]
+
+
+_build_tables()
+
+# Plain python copies, indexing numpy arrays element-wise is slow
+_EXP: List[int] = GF_EXP.tolist()
+_LOG: List[int] = GF_LOG.tolist()
+
+# Exponent matrices for `syndromes`, keyed by (codeword length, amount of ecc codewords)
+_syndrome_exponents: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+def gf_mul(x: int, y: int) -> int:
+    if x == 0 or y == 0:
+        return 0
+    return _EXP[_LOG[x] + _LOG[y]]
+
+
+def gf_div(x: int, y: int) -> int:
+    if y == 0:
+        raise ZeroDivisionError()
+    if x == 0:
+        return 0
+    return _EXP[(_LOG[x] + 255 - _LOG[y]) % 255]
+
+
+def gf_pow(x: int, power: int) -> int:
+    return _EXP[(_LOG[x] * power) % 255]
+
+
+def gf_inverse(x: int) -> int:
+    return _EXP[255 - _LOG[x]]
+
+
+def gf_poly_scale(poly: List[int], x: int) -> List[int]:
+    return [gf_mul(coefficient, x) for coefficient in poly]
+
+
+def gf_poly_add(first: List[int], second: List[int]) -> List[int]:
+    result = [0] * max(len(first), len(second))
+    for i, coefficient in enumerate(first):
+        result[i + len(result) - len(first)] = coefficient
+    for i, coefficient in enumerate(second):
+        result[i + len(result) - len(second)] ^= coefficient
+    return result
+
+
+def gf_poly_mul(first: List[int], second: List[int]) -> List[int]:
+    result = [0] * (len(first) + len(second) - 1)
+    for j, y in enumerate(second):
+        for i, x in enumerate(first):
+            result[i + j] ^= gf_mul(x, y)
+    return result
+
+
+def gf_poly_eval(poly: List[int], x: int) -> int:
+    """Evaluates `poly` (highest degree first) at `x`"""
+    y = poly[0]
+    for coefficient in poly[1:]:
+        y = gf_mul(y, x) ^ coefficient
+    return y
+
+
+def gf_mul_array(x: int, values: np.ndarray) -> np.ndarray:
+    """Multiplies every byte of `values` with the scalar `x`"""
+    if x == 0:
+        return np.zeros_like(values)
+    result = GF_EXP[GF_LOG[values] + _LOG[x]]
+    result[values == 0] = 0
+    return result
+
+
+def syndromes(codewords: np.ndarray, nsym: int) -> np.ndarray:
+    """
+    Calculates the syndromes of a block. The first codeword is the coefficient of the highest degree.
+    
+    :param codewords: The data and ecc codewords of a single block as uint8 array.
+    :param nsym: Amount of ecc codewords.
+    :return: `nsym` syndromes, all of them are zero if the block is intact.
+    """
+    key = (len(codewords), nsym)
+    
+    if (exponents := _syndrome_exponents.get(key)) is None:
+        powers = np.arange(len(codewords) - 1, -1, -1)
+        exponents = (np.arange(nsym)[:, None] * powers[None, :]) % 255
+        _syndrome_exponents[key] = exponents
+    
+    terms = GF_EXP[(GF_LOG[codewords][None, :] + exponents) % 255]
+    terms[:, codewords == 0] = 0
+    
+    return np.bitwise_xor.reduce(terms, axis=1)
+
+
+def _find_error_locator(synd: List[int], nsym: int) -> List[int]:
+    # Berlekamp-Massey
+    error_locator = [1]
+    old_locator = [1]
+    
+    for i in range(nsym):
+        delta = synd[i]
+        for j in range(1, min(len(error_locator), i + 1)):
+            delta ^= gf_mul(error_locator[-(j + 1)], synd[i - j])
+        
+        old_locator = old_locator + [0]
+        
+        if delta != 0:
+            if len(old_locator) > len(error_locator):
+                new_locator = gf_poly_scale(old_locator, delta)
+                old_locator = gf_poly_scale(error_locator, gf_inverse(delta))
+                error_locator = new_locator
+            error_locator = gf_poly_add(error_locator, gf_poly_scale(old_locator, delta))
+    
+    while error_locator and error_locator[0] == 0:
+        del error_locator[0]
+    
+    if (len(error_locator) - 1) * 2 > nsym:
+        raise DecoderFailed("Too many errors to correct.")
+    
+    return error_locator
+
+
+def _find_error_positions(error_locator: List[int], length: int) -> List[int]:
+    # Chien search, the locator is evaluated with its lowest degree first
+    error_locator = error_locator[::-1]
+    positions = [
+        length - 1 - i
+        for i in range(length)
+        if gf_poly_eval(error_locator, gf_pow(2, i)) == 0
+    ]
+    
+    if len(positions) != len(error_locator) - 1:
+        raise DecoderFailed("Couldn`t locate the errors.")
+    
+    return positions
+
+
+def _correct_errata(codewords: List[int], synd: List[int], positions: List[int]) -> List[int]:
+    # Forney
+    coefficient_positions = [len(codewords) - 1 - position for position in positions]
+    
+    errata_locator = [1]
+    for position in coefficient_positions:
+        errata_locator = gf_poly_mul(errata_locator, gf_poly_add([1], [gf_pow(2, position), 0]))
+    
+    # Omega(x) = S(x) * Lambda(x) mod x^(nsym)
+    evaluator = gf_poly_mul(synd[::-1], errata_locator)
+    evaluator = evaluator[-len(synd):]
+    
+    locations = [gf_pow(2, position) for position in coefficient_positions]
+    corrected = list(codewords)
+    
+    for i, location in enumerate(locations):
+        location_inverse = gf_inverse(location)
+        
+        derivative = 1
+        for j, other in enumerate(locations):
+            if j != i:
+                derivative = gf_mul(derivative, 1 ^ gf_mul(location_inverse, other))
+        
+        if derivative == 0:
+            raise DecoderFailed("Couldn`t correct the errors.")
+        
+        y = gf_poly_eval(evaluator, location_inverse)
+        corrected[positions[i]] ^= gf_div(y, derivative)
+    
+    return corrected
+
+
+def correct_block(codewords: np.ndarray, nsym: int) -> np.ndarray:
+    """
+    Checks a block and corrects errors if there are any.
+    
+    :param codewords: The data and ecc codewords of a single block as uint8 array.
+    :param nsym: Amount of ecc codewords.
+    :return: The corrected codewords.
+    
+    :raises:
+        DecoderFailed: The block couldn`t be corrected
+    """
+    synd = syndromes(codewords, nsym)
+    
+    if not synd.any():
+        return codewords
+    
+    synd = synd.tolist()
+    positions = _find_error_positions(_find_error_locator(synd, nsym), len(codewords))
+    corrected = np.array(_correct_errata(codewords.tolist(), synd, positions), dtype=np.uint8)
+    
+    if syndromes(corrected, nsym).any():
+        raise DecoderFailed("Couldn`t correct the errors.")
+    
+    return corrected
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+from typing import *
+
+import numpy as np
+from cv2.cv2 import INTER_AREA, resize
+
+import constants
+
+
+class RegionOfInterest:
+    """
+    Remembers where the QR-Code is in the frames of a video. After it has been found once, only that region (plus a
+    margin) is searched, downscaled if the modules are larger than needed. It has to be found again only if decoding
+    the region fails, e.g. after a scene change.
+    """
+    
+    def __init__(self, margin: float = constants.ROI_MARGIN, module_size: int = constants.ROI_MODULE_SIZE):
+        """
+        :param margin: The margin around the QR-Code, relative to its size.
+        :param module_size: The region is downscaled so a module is about this many pixels large.
+        """
+        self.margin = margin
+        self.module_size = module_size
+        # top, bottom, left, right
+        self.box: Optional[Tuple[int, int, int, int]] = None
+        self.scale = 1.0
+        self.detections = 0
+    
+    @staticmethod
+    def get_luma(frame: np.ndarray) -> np.ndarray:
+        return frame[:, :, 1] if frame.ndim == 3 else frame
+    
+    @staticmethod
+    def estimate_module_size(luma: np.ndarray, left: int, top: int, width: int) -> float:
+        """
+        Estimates the size of a module in pixels using the top row of the top left finder pattern, which consists of 7
+        dark modules. Returns 0 if it can`t be estimated.
+        """
+        row = luma[min(top + 1, luma.shape[0] - 1), left:left + width]
+        if row.size == 0:
+            return 0
+        
+        dark = row < (int(row.min()) + int(row.max())) // 2
+        if not dark[0]:
+            return 0
+        
+        # Length of the first dark run
+        length = np.argmin(dark) if not dark.all() else dark.size
+        return length / 7
+    
+    def locate(self, frame: np.ndarray, rect: Tuple[int, int, int, int]) -> None:
+        """
+        Remembers the location of the QR-Code.
+        
+        :param frame: The whole frame.
+        :param rect: The bounding box (left, top, width, height) of the QR-Code in the frame.
+        """
+        left, top, width, height = rect
+        height_margin, width_margin = int(height * self.margin), int(width * self.margin)
+        
+        self.box = (
+            max(top - height_margin, 0),
+            min(top + height + height_margin, frame.shape[0]),
+            max(left - width_margin, 0),
+            min(left + width + width_margin, frame.shape[1]),
+        )
+        
+        module_size = self.estimate_module_size(self.get_luma(frame), left, top, width)
+        self.scale = min(self.module_size / module_size, 1.0) if module_size else 1.0
+        self.detections += 1
+    
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Returns the region of a frame (luma only), downscaled if possible"""
+        top, bottom, left, right = self.box
+        region = self.get_luma(frame)[top:bottom, left:right]
+        
+        if self.scale < 1.0:
+            region = resize(region, None, fx=self.scale, fy=self.scale, interpolation=INTER_AREA)
+        
+        return region
+    
+    def reset(self) -> None:
+        self.box = None
+        self.scale = 1.0
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+from typing import *
+
+import numpy as np
+
+import constants
+from exceptions import DecoderFailed
+from reed_solomon import correct_block
+
+# Format bits of the error correction levels in the order of the tables below
+ECC_LEVELS = (1, 0, 3, 2)  # L, M, Q, H
+
+#                          Version: 1 - 40
+ECC_CODEWORDS_PER_BLOCK = (
+    (7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28, 28, 28, 30, 30, 26, 28, 30, 30,
+     30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    (10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26, 26, 28, 28, 28, 28, 28, 28, 28,
+     28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    (13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30, 28, 30, 30, 30, 30, 28, 30, 30,
+     30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    (17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28, 30, 24, 30, 30, 30, 30, 30, 30,
+     30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+)
+NUM_ERROR_CORRECTION_BLOCKS = (
+    (1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8, 8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19,
+     19, 20, 21, 22, 24, 25),
+    (1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16, 17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33,
+     35, 37, 38, 40, 43, 45, 47, 49),
+    (1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20, 23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43,
+     45, 48, 51, 53, 56, 59, 62, 65, 68),
+    (1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25, 25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51,
+     54, 57, 60, 63, 66, 70, 74, 77, 81),
+)
+
+ALPHANUMERIC_CHARACTERS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+MODE_NUMERIC = 0b0001
+MODE_ALPHANUMERIC = 0b0010
+MODE_BYTE = 0b0100
+MODE_TERMINATOR = 0b0000
+
+MASK_FUNCTIONS = (
+    lambda i, j: (i + j) % 2 == 0,
+    lambda i, j: i % 2 == 0,
+    lambda i, j: j % 3 == 0,
+    lambda i, j: (i + j) % 3 == 0,
+    lambda i, j: (i // 2 + j // 3) % 2 == 0,
+    lambda i, j: (i * j) % 2 + (i * j) % 3 == 0,
+    lambda i, j: ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+    lambda i, j: ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+)
+
+
+def _get_format_codes() -> Dict[int, Tuple[int, int]]:
+    """Returns all 32 valid format bit sequences mapped to (error correction bits, mask pattern)"""
+    generator = 0b10100110111
+    codes = {}
+    
+    for data in range(32):
+        remainder = data << 10
+        while remainder.bit_length() >= generator.bit_length():
+            remainder ^= generator << (remainder.bit_length() - generator.bit_length())
+        codes[((data << 10) | remainder) ^ 0b101010000010010] = (data >> 3, data & 0b111)
+    
+    return codes
+
+
+FORMAT_CODES = _get_format_codes()
+
+
+def get_alignment_positions(version: int) -> List[int]:
+    if version == 1:
+        return []
+    
+    amount = version // 7 + 2
+    step = 26 if version == 32 else (version * 4 + amount * 2 + 1) // (amount * 2 - 2) * 2
+    size = version * 4 + 17
+    
+    return [6] + sorted(size - 7 - i * step for i in range(amount - 1))
+
+
+def get_raw_codewords(version: int) -> int:
+    """Returns the amount of data and ecc codewords a symbol of `version` can hold"""
+    modules = (16 * version + 128) * version + 64
+    
+    if version >= 2:
+        amount = version // 7 + 2
+        modules -= (25 * amount - 10) * amount - 55
+        if version >= 7:
+            modules -= 36
+    
+    return modules // 8
+
+
+class SymbolLayout:
+    """
+    Module positions of a QR-Code symbol of a given version. The positions are sorted in the order the data bits are
+    placed, so a sampled symbol can be read with a single index operation.
+    """
+    
+    def __init__(self, version: int):
+        self.version = version
+        self.size = size = version * 4 + 17
+        
+        reserved = self._get_function_modules()
+        
+        # Format information, both copies read from bit 0 to bit 14
+        first_copy = [(i if i < 6 else i + 1 if i < 8 else size - 15 + i, 8) for i in range(15)]
+        second_copy = [(8, size - i - 1 if i < 8 else 15 - i if i < 9 else 14 - i) for i in range(15)]
+        
+        # Data modules, zigzag from the bottom right
+        data = []
+        row, increment = size - 1, -1
+        for column in range(size - 1, 0, -2):
+            if column <= 6:
+                column -= 1
+            while True:
+                for current in (column, column - 1):
+                    if not reserved[row, current]:
+                        data.append((row, current))
+                row += increment
+                if row < 0 or row >= size:
+                    row -= increment
+                    increment = -increment
+                    break
+        data = data[:get_raw_codewords(version) * 8]
+        
+        positions = np.array(first_copy + second_copy + data, dtype=np.intp)
+        self.rows = positions[:, 0]
+        self.columns = positions[:, 1]
+        self.masks = np.array([
+            [function(row, column) for row, column in data]
+            for function in MASK_FUNCTIONS
+        ], dtype=bool)
+        self._blocks: Dict[int, Tuple[List[np.ndarray], List[int], int]] = {}
+    
+    def _get_function_modules(self) -> np.ndarray:
+        size = self.size
+        reserved = np.zeros((size, size), dtype=bool)
+        
+        # Finder patterns, separators and format information
+        reserved[:9, :9] = True
+        reserved[:9, size - 8:] = True
+        reserved[size - 8:, :9] = True
+        # Alignment patterns, unless they overlap with the finder patterns
+        positions = get_alignment_positions(self.version)
+        for row in positions:
+            for column in positions:
+                if not reserved[row, column]:
+                    reserved[row - 2:row + 3, column - 2:column + 3] = True
+        # Timing patterns
+        reserved[6, :] = True
+        reserved[:, 6] = True
+        # Version information
+        if self.version >= 7:
+            reserved[:6, size - 11:size - 8] = True
+            reserved[size - 11:size - 8, :6] = True
+        
+        return reserved
+    
+    def get_blocks(self, level: int) -> Tuple[List[np.ndarray], List[int], int]:
+        """
+        Returns how the codewords are interleaved for the error correction `level`.
+        
+        :return: The codeword indexes of every block, the amount of data codewords of every block and the amount of
+        ecc codewords per block.
+        """
+        if level in self._blocks:
+            return self._blocks[level]
+        
+        index = ECC_LEVELS.index(level)
+        amount = NUM_ERROR_CORRECTION_BLOCKS[index][self.version - 1]
+        ecc_length = ECC_CODEWORDS_PER_BLOCK[index][self.version - 1]
+        raw = get_raw_codewords(self.version)
+        short_blocks = amount - raw % amount
+        data_lengths = [raw // amount - ecc_length + (0 if block < short_blocks else 1) for block in range(amount)]
+        
+        blocks = [[] for _ in range(amount)]
+        position = 0
+        for i in range(max(data_lengths)):
+            for block in range(amount):
+                if i < data_lengths[block]:
+                    blocks[block].append(position)
+                    position += 1
+        for _ in range(ecc_length):
+            for block in range(amount):
+                blocks[block].append(position)
+                position += 1
+        
+        self._blocks[level] = result = ([np.array(block, dtype=np.intp) for block in blocks], data_lengths, ecc_length)
+        return result
+
+
+class _BitReader:
+    def __init__(self, data: np.ndarray):
+        self.bits = np.unpackbits(data)
+        self.position = 0
+    
+    @property
+    def remaining(self) -> int:
+        return len(self.bits) - self.position
+    
+    def read(self, length: int) -> int:
+        if length > self.remaining:
+            raise DecoderFailed("The symbol ended unexpectedly.")
+        
+        value = 0
+        for bit in self.bits[self.position:self.position + length]:
+            value = (value << 1) | int(bit)
+        self.position += length
+        
+        return value
+    
+    def read_bytes(self, length: int) -> bytes:
+        if length * 8 > self.remaining:
+            raise DecoderFailed("The symbol ended unexpectedly.")
+        
+        value = np.packbits(self.bits[self.position:self.position + length * 8]).tobytes()
+        self.position += length * 8
+        
+        return value
+
+
+class ModuleSampler:
+    """
+    Reads QR-Codes directly from frames with a known geometry (no border offset search, no perspective, no
+    binarization of the whole frame). Only works for unscaled frames as created by `VideoDataInsertor`.
+    """
+    
+    def __init__(
+            self,
+            box_size: int = constants.DEFAULT_OPTS["box_size"],
+            border: int = constants.DEFAULT_OPTS["border"],
+            version: Optional[int] = None,
+    ):
+        """
+        :param box_size: How many pixels each module has.
+        :param border: How many modules the quiet zone has.
+        :param version: Optional. The version of the symbols. If None, it will be read from the frame size.
+        """
+        self.box_size = box_size
+        self.border = border
+        self.version = version
+        self._layouts: Dict[int, SymbolLayout] = {}
+        self._pixels: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    @classmethod
+    def from_opts(cls, opts: Optional[dict] = None) -> "ModuleSampler":
+        """Creates a sampler for frames created with the given qrcode `opts` (the `frame_opts` of the encoder)"""
+        use_opts = constants.DEFAULT_OPTS.copy()
+        use_opts.update(opts or {})
+        
+        return cls(box_size=use_opts["box_size"], border=use_opts["border"])
+    
+    def get_version(self, shape: Tuple[int, ...]) -> int:
+        """Returns the version of a symbol that fills a frame with the given `shape`"""
+        if self.version is not None:
+            return self.version
+        
+        height, width = shape[:2]
+        modules, rest = divmod(width, self.box_size)
+        modules -= self.border * 2
+        version, version_rest = divmod(modules - 17, 4)
+        # Frames with an odd size are padded by one pixel, e.g. by `OpenCVWriter`
+        if rest == 1 and width % 2 == 0:
+            rest = 0
+        
+        if rest or version_rest or height != width or not 1 <= version <= 40:
+            raise DecoderFailed(f'A frame with the size {width}x{height} doesn`t match the known geometry.')
+        
+        return version
+    
+    def _get_layout(self, shape: Tuple[int, ...]) -> Tuple[SymbolLayout, np.ndarray, np.ndarray]:
+        version = self.get_version(shape)
+        
+        if version not in self._layouts:
+            layout = SymbolLayout(version)
+            offset = self.border * self.box_size + self.box_size // 2
+            self._layouts[version] = layout
+            self._pixels[version] = (layout.rows * self.box_size + offset, layout.columns * self.box_size + offset)
+        
+        return (self._layouts[version], *self._pixels[version])
+    
+    @staticmethod
+    def _read_format(bits: np.ndarray) -> Tuple[int, int]:
+        best_distance, best = 16, None
+        
+        for copy in (bits[:15], bits[15:]):
+            value = int(np.dot(copy.astype(np.int64), 1 << np.arange(15)))
+            for code, information in FORMAT_CODES.items():
+                if (distance := bin(value ^ code).count("1")) < best_distance:
+                    best_distance, best = distance, information
+        
+        if best_distance > 3:
+            raise DecoderFailed("The format information couldn`t be read.")
+        
+        return best
+    
+    @staticmethod
+    def _parse_segments(reader: _BitReader, version: int) -> bytes:
+        size_class = 0 if version <= 9 else 1 if version <= 26 else 2
+        found = b""
+        
+        while reader.remaining >= 4:
+            mode = reader.read(4)
+            
+            if mode == MODE_TERMINATOR:
+                break
+            elif mode == MODE_BYTE:
+                length = reader.read((8, 16, 16)[size_class])
+                found += reader.read_bytes(length)
+            elif mode == MODE_NUMERIC:
+                length = reader.read((10, 12, 14)[size_class])
+                digits = []
+                for rest in range(length, 0, -3):
+                    amount = min(rest, 3)
+                    digits.append(str(reader.read((0, 4, 7, 10)[amount])).zfill(amount))
+                found += "".join(digits).encode("ascii")
+            elif mode == MODE_ALPHANUMERIC:
+                length = reader.read((9, 11, 13)[size_class])
+                characters = []
+                for _ in range(length // 2):
+                    first, second = divmod(reader.read(11), 45)
+                    characters.append(ALPHANUMERIC_CHARACTERS[first] + ALPHANUMERIC_CHARACTERS[second])
+                if length % 2:
+                    characters.append(ALPHANUMERIC_CHARACTERS[reader.read(6)])
+                found += "".join(characters).encode("ascii")
+            else:
+                raise DecoderFailed(f'Unsupported segment mode "{mode}".')
+        
+        return found
+    
+    def decode(self, frame: np.ndarray) -> str:
+        """
+        Decodes the QR-Code of a frame and returns it`s data.
+        
+        :raises:
+            DecoderFailed: The frame couldn`t be decoded (wrong geometry, unreadable format or checksum errors).
+        """
+        layout, rows, columns = self._get_layout(frame.shape)
+        
+        # Sample module centres, using the green channel as luma for colored frames
+        if frame.ndim == 3:
+            samples = frame[rows, columns, 1]
+        else:
+            samples = frame[rows, columns]
+        
+        low, high = int(samples.min()), int(samples.max())
+        if high - low < 32:
+            raise DecoderFailed("The frame doesn`t contain enough contrast.")
+        dark = samples < (low + high) // 2
+        
+        level, mask = self._read_format(dark[:30])
+        codewords = np.packbits(dark[30:] ^ layout.masks[mask])
+        
+        blocks, data_lengths, ecc_length = layout.get_blocks(level)
+        data = np.concatenate([
+            correct_block(codewords[block], ecc_length)[:data_length]
+            for block, data_length in zip(blocks, data_lengths)
+        ])
+        
+        try:
+            return self._parse_segments(_BitReader(data), layout.version).decode("utf-8")
+        except (UnicodeDecodeError, IndexError):
+            raise DecoderFailed("The decoded data is invalid.")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+from multiprocessing import Pool
+from multiprocessing.pool import AsyncResult
+from pathlib import Path
+from typing import *
+
+from data.sources import BaseSource
+from metrics import METRICS, init_worker
+from typing_types import JsonSerializable, Kwargs, PathStr
+from utils import get_threads, pstr
+
+# State of a decoder worker process, created once by `_init_decoder_worker`
+_decoder_state: Dict[str, Any] = {}
+
+
+class BaseSession:
+    """
+    Owns worker processes that are started once and used by every job of the session. Call `close` (or use the
+    session as a context manager) to stop them.
+    """
+    
+    def __init__(self, threads: Optional[int] = None, initializer: Optional[Callable] = None, initargs: tuple = ()):
+        self.threads = get_threads(threads)
+        self.pool = Pool(self.threads, initializer=initializer, initargs=initargs)
+        self.closed = False
+    
+    def _check_open(self) -> None:
+        if self.closed:
+            raise ValueError(f"The {self.__class__.__name__} has been closed!")
+    
+    def close(self) -> None:
+        """Waits for the running jobs and stops the worker processes"""
+        if not self.closed:
+            self.closed = True
+            self.pool.close()
+            self.pool.join()
+    
+    def terminate(self) -> None:
+        """Stops the worker processes immediately, running jobs are aborted"""
+        if not self.closed:
+            self.closed = True
+            self.pool.terminate()
+            self.pool.join()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+
+def _init_encoder_worker(profile_directory: Optional[Path] = None) -> None:
+    from data.encoders import get_mime
+    
+    init_worker(profile_directory)
+    # Import everything a frame needs and load libmagic now, instead of during the first job
+    import encode
+    
+    get_mime()
+
+
+class EncoderSession(BaseSession):
+    """
+    Encodes many targets into videos using the same worker processes. The workers keep their state between jobs,
+    e.g. their `QRCode` instances (see `encode.get_qr_code`) and their libmagic handle.
+    
+    Example:
+        with EncoderSession() as session:
+            for folder in folders:
+                session.encode([folder], folder.with_suffix(".avi"))
+    """
+    
+    def __init__(self, threads: Optional[int] = None, *, video_opts: Optional[Kwargs] = None):
+        """
+        :param threads: Amount of worker processes creating the frames, if None, one per cpu will be used.
+        :param video_opts: Default options for `create_video` of every job, e.g. "frame_opts" or "parity_frames".
+        """
+        super().__init__(threads, _init_encoder_worker, (METRICS.profile_directory,))
+        self.video_opts = video_opts or {}
+    
+    def get_video_opts(self, video_opts: Optional[Kwargs] = None) -> Kwargs:
+        """Returns the options for `create_video` of a job, using the worker processes of the session"""
+        return {**self.video_opts, **(video_opts or {}), "pool": self.pool, "threads": self.threads}
+    
+    def encode(
+            self,
+            targets: Union[Iterable[PathStr], BaseSource],
+            output: PathStr,
+            *,
+            video_opts: Optional[Kwargs] = None,
+            **kwargs
+    ) -> str:
+        """
+        Encodes the targets into a video, see `FileDataInsertor.encode_multiple`.
+        
+        :param targets: Files and folders or a source from `data.sources`.
+        :param output: The output video.
+        :param video_opts: Options for `create_video`, they`re merged with the options of the session. Use a
+        separate "temp" folder per job if jobs run at the same time.
+        :return: The encoded data
+        """
+        from encode import FileDataInsertor
+        
+        self._check_open()
+        
+        return FileDataInsertor.encode_multiple(
+            targets, pstr(output), video_opts=self.get_video_opts(video_opts), **kwargs
+        )
+    
+    def encode_text(self, text: str, output: PathStr, *, video_opts: Optional[Kwargs] = None, **kwargs) -> str:
+        """Encodes a text into a video, see `TextDataInsertor.encode_text`. Returns the encoded data."""
+        from encode import TextDataInsertor
+        
+        self._check_open()
+        data = TextDataInsertor.get_encoded_data(text, **kwargs)
+        TextDataInsertor.create_video(data, pstr(output), **self.get_video_opts(video_opts))
+        
+        return data
+
+
+def _init_decoder_worker(
+        profile_directory: Optional[Path] = None,
+        frame_opts: Optional[Kwargs] = None,
+        direct: bool = False,
+        cache: bool = False,
+        cache_directory: Optional[PathStr] = None,
+) -> None:
+    from data.encoders import get_mime
+    from sampler import ModuleSampler
+    from stream_cache import StreamCache
+    
+    init_worker(profile_directory)
+    # Import cv2, pyzbar and the decoder now, instead of during the first job. `decode` loads pyzbar lazily.
+    import decode
+    import pyzbar.pyzbar
+    import roi
+    
+    get_mime()
+    
+    _decoder_state["sampler"] = ModuleSampler.from_opts(frame_opts) if direct else None
+    _decoder_state["cache"] = StreamCache(cache_directory) if cache else None
+
+
+def _run_decoder_job(method: str, video: Path, crop: bool, kwargs: Kwargs) -> Tuple[Any, JsonSerializable]:
+    """Runs a job in a decoder worker and returns its result and the metrics of the worker"""
+    from decode import DumpDataExtractor, HandleDataExtractor
+    from roi import RegionOfInterest
+    
+    sampler, cache = _decoder_state["sampler"], _decoder_state["cache"]
+    # Every video has its own region of interest
+    roi = RegionOfInterest() if crop else None
+    
+    if method == "handle":
+        result = HandleDataExtractor.handle_video_instantly(
+            video, sampler=sampler, roi=roi, cache=cache, **kwargs
+        )
+    elif method == "decode":
+        result = HandleDataExtractor.decode_video(video, sampler=sampler, roi=roi, cache=cache, **kwargs)
+    else:
+        result = DumpDataExtractor.dump_video_to_json_lines(video, sampler=sampler, roi=roi, cache=cache, **kwargs)
+    
+    return result, METRICS.collect()
+
+
+class DecoderSession(BaseSession):
+    """
+    Decodes many videos using the same worker processes, one video per worker at a time. The workers keep their
+    state between jobs: cv2, pyzbar and libmagic are loaded once, the `ModuleSampler` keeps its cached layouts and the
+    `StreamCache` is shared.
+    
+    Example:
+        with DecoderSession() as session:
+            jobs = [session.submit(video, base_path=video.with_suffix("")) for video in videos]
+            for job in jobs:
+                session.wait(job)
+    """
+    
+    def __init__(
+            self,
+            threads: Optional[int] = None,
+            *,
+            frame_opts: Optional[Kwargs] = None,
+            direct: bool = False,
+            crop: bool = True,
+            cache: bool = False,
+            cache_directory: Optional[PathStr] = None,
+    ):
+        """
+        :param threads: Amount of worker processes, i.e. how many videos are decoded at the same time. If None, one
+        per cpu will be used.
+        :param frame_opts: Optional. The options the videos were encoded with, used by the `ModuleSampler`.
+        :param direct: Whether the modules should be read directly using the known geometry, see `decode_qr`.
+        :param crop: Whether only the region of the QR-Code should be searched, see `RegionOfInterest`.
+        :param cache: Whether decoded streams should be cached, see `StreamCache`.
+        :param cache_directory: Optional. The folder of the cache, if None, `CACHE_DIRECTORY` will be used.
+        """
+        super().__init__(
+            threads, _init_decoder_worker, (METRICS.profile_directory, frame_opts, direct, cache, cache_directory)
+        )
+        self.crop = crop
+    
+    def submit(self, video: PathStr, method: str = "handle", **kwargs) -> AsyncResult:
+        """
+        Queues a job and returns immediately. Pass the result to `wait` to get the result of the job.
+        
+        :param video: The video.
+        :param method: "handle" (`handle_video_instantly`, writes the files), "decode" (`decode_video`, returns the
+        data) or "dump" (`dump_video_to_json_lines`, requires "file").
+        :param kwargs: Arguments for the method, e.g. "base_path" or "sink". They`re sent to a worker, so they must
+        be picklable.
+        """
+        # Constrain values
+        if method not in {"handle", "decode", "dump"}:
+            raise ValueError(f'Unknown method "{method}"! Use "handle", "decode" or "dump".')
+        self._check_open()
+        
+        return self.pool.apply_async(_run_decoder_job, (method, pstr(video), self.crop, kwargs))
+    
+    @staticmethod
+    def wait(job: AsyncResult) -> Any:
+        """Waits for a job, merges the metrics of its worker and returns its result. Raises the error of the job."""
+        result, worker_metrics = job.get()
+        METRICS.merge(worker_metrics)
+        
+        return result
+    
+    def handle(self, video: PathStr, **kwargs) -> None:
+        """Decodes a video and handles its data, see `HandleDataExtractor.handle_video_instantly`"""
+        return self.wait(self.submit(video, "handle", **kwargs))
+    
+    def decode(self, video: PathStr, **kwargs) -> str:
+        """Decodes a video and returns its data, see `HandleDataExtractor.decode_video`"""
+        return self.wait(self.submit(video, "decode", **kwargs))
+    
+    def dump(self, video: PathStr, file: PathStr, **kwargs) -> None:
+        """Decodes a video into a JSON Lines file, see `DumpDataExtractor.dump_video_to_json_lines`"""
+        return self.wait(self.submit(video, "dump", file=pstr(file), **kwargs))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+import hashlib
+import json
+import logging
+import os
+import zlib
+from pathlib import Path
+from typing import *
+
+import constants
+from typing_types import Kwargs, PathStr
+from utils import pstr, pstrnone
+
+
+class StreamCacheWriter:
+    """Compresses a decoded stream while it`s being decoded. Nothing is cached until `commit` is called."""
+    
+    def __init__(self, cache: "StreamCache", key: str):
+        self.cache = cache
+        self.key = key
+        self.temp = cache.get_path(key).with_suffix(".tmp")
+        self._compressor = zlib.compressobj()
+        self._file = self.temp.open("wb")
+    
+    def write(self, data: str) -> None:
+        if data:
+            self._file.write(self._compressor.compress(data.encode(constants.ENCODE_TYPE)))
+    
+    def commit(self) -> None:
+        self._file.write(self._compressor.flush())
+        self._file.close()
+        os.replace(self.temp, self.cache.get_path(self.key))
+        
+        self.cache.evict()
+    
+    def discard(self) -> None:
+        self._file.close()
+        if self.temp.exists():
+            self.temp.unlink()
+
+
+class StreamCache:
+    """
+    Caches the decoded raw stream of videos, so dumping and handling the same video only decodes it once.
+    
+    A video is identified by its size, modification time and a hash of some blocks spread over the whole file, together
+    with the options of the decoder that change the decoded stream (e.g. `skip_duplicates`). The streams are stored
+    compressed, the least recently used ones are removed once the cache gets larger than `max_size`.
+    """
+    SUFFIX = ".z"
+    
+    def __init__(self, directory: Optional[PathStr] = None, max_size: int = constants.CACHE_MAX_SIZE):
+        """
+        :param directory: Optional. Where the streams should be stored, if None, `CACHE_DIRECTORY` will be used.
+        :param max_size: Maximum size of all cached streams in bytes.
+        """
+        # Constrain values
+        directory = pstrnone(directory)
+        if directory is None:
+            directory = constants.CACHE_DIRECTORY
+        
+        self.directory = directory
+        self.max_size = max_size
+        self.directory.mkdir(exist_ok=True, parents=True)
+    
+    @staticmethod
+    def get_key(
+            video: PathStr,
+            opts: Optional[Kwargs] = None,
+            blocks: int = constants.CACHE_SAMPLE_BLOCKS,
+            block_size: int = constants.CACHE_SAMPLE_SIZE
+    ) -> str:
+        """
+        Returns the cache key of a video, without reading the whole file.
+        
+        :param video: Path to the video.
+        :param opts: Optional. The options of the decoder that change the decoded stream, a stream decoded with other
+        options isn`t used.
+        """
+        video = pstr(video)
+        # A folder of frames is rewritten completely when it changes, including its manifest
+        if video.is_dir():
+            video = video.joinpath(constants.FRAME_ARCHIVE_MANIFEST)
+        stat = video.stat()
+        digest = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}".encode("ascii"), digest_size=16)
+        digest.update(json.dumps(opts or {}, sort_keys=True).encode("utf-8"))
+        
+        with video.open("rb") as file:
+            step = max(stat.st_size // blocks, block_size)
+            for position in range(0, stat.st_size, step):
+                file.seek(position)
+                digest.update(file.read(block_size))
+        
+        return digest.hexdigest()
+    
+    def get_path(self, key: str) -> Path:
+        return self.directory.joinpath(key + self.SUFFIX)
+    
+    def contains(self, video: PathStr, opts: Optional[Kwargs] = None) -> bool:
+        return self.get_path(self.get_key(video, opts)).exists()
+    
+    def load(self, video: PathStr, opts: Optional[Kwargs] = None) -> Optional[str]:
+        """
+        Returns the cached stream of a video or None if it isn`t cached, see `get_key` for `opts`. The stream is
+        decompressed as a whole, so it`s held in memory completely.
+        """
+        path = self.get_path(self.get_key(video, opts))
+        
+        if not path.exists():
+            return None
+        
+        # Mark as recently used
+        path.touch()
+        
+        data = zlib.decompress(path.read_bytes()).decode(constants.ENCODE_TYPE)
+        
+        logging.info(f'Using the cached stream of "{video}".')
+        
+        return data
+    
+    def writer(self, video: PathStr, opts: Optional[Kwargs] = None) -> StreamCacheWriter:
+        return StreamCacheWriter(self, self.get_key(video, opts))
+    
+    def store(self, video: PathStr, data: str, opts: Optional[Kwargs] = None) -> None:
+        writer = self.writer(video, opts)
+        writer.write(data)
+        writer.commit()
+    
+    def evict(self) -> None:
+        """Removes the least recently used streams until the cache isn`t larger than `max_size`"""
+        files = sorted(
+            ((path, path.stat()) for path in self.directory.glob("*" + self.SUFFIX)),
+            key=lambda x: x[1].st_mtime
+        )
+        size = sum(stat.st_size for _, stat in files)
+        
+        for path, stat in files:
+            if size <= self.max_size:
+                break
+            path.unlink()
+            size -= stat.st_size
+    
+    def clear(self) -> None:
+        for path in self.directory.glob("*" + self.SUFFIX):
+            path.unlink()
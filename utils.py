@@ -1,12 +1,14 @@
 import os
 import re
+from fnmatch import fnmatch
 from pathlib import Path, PurePath
 from typing import *
 
-from cv2.cv2 import VideoCapture
-
 from typing_types import Kwargs, PathStr, SimpleBuiltinTypes
 
+if TYPE_CHECKING:
+    from cv2.cv2 import VideoCapture
+
 
 def pstr(data: PathStr) -> Path:
     if type(data) is str:
@@ -118,11 +120,6 @@ def create_temp(temp: Optional[PathStr]) -> Path:
     return temp
 
 
-def get_skip_files(regex: str, folder: PathStr, glob: str) -> Set[str]:
-    compiled = re.compile(regex)
-    return {compiled.match(file.name).group(1) for file in folder.glob(glob)}
-
-
 def get_kwargs(data) -> Kwargs:
     if type(data) is dict:
         return data
@@ -163,9 +160,42 @@ def rstrip_until(data: str, character: str) -> str:
     raise ValueError(f'Character "{character}" not found in data "{data[:20]}"...!')
 
 
-def constrain_cap(video: Optional[PathStr] = None, cap: Optional[VideoCapture] = None) -> VideoCapture:
+def normalize_package_path(path: str) -> str:
+    """Returns a package path with forward slashes and without the leading slash of relative paths"""
+    return path.replace("\\", "/").lstrip("/")
+
+
+def path_matches(
+        path: Optional[str],
+        include: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None
+) -> bool:
+    """
+    Checks a package path against glob patterns.
+    
+    :param path: The path from the package information. Packages without a path only match if `include` is empty.
+    :param include: Optional. The path must match at least one of these patterns.
+    :param exclude: Optional. The path must not match any of these patterns.
+    """
+    if path is None:
+        return not include
+    
+    path = normalize_package_path(path)
+    
+    if include and not any(fnmatch(path, normalize_package_path(pattern)) for pattern in include):
+        return False
+    if exclude and any(fnmatch(path, normalize_package_path(pattern)) for pattern in exclude):
+        return False
+    
+    return True
+
+
+def constrain_cap(video: Optional[PathStr] = None, cap: Optional["VideoCapture"] = None) -> "VideoCapture":
+    """Returns `cap` if given (a `VideoCapture` or `FFmpegCapture` instance), otherwise opens `video`"""
+    if cap is not None:
+        return cap
     if video is not None:
+        from cv2.cv2 import VideoCapture
+        
         return VideoCapture(str(pstr(video)))
-    if isinstance(cap, VideoCapture):
-        return cap
-    raise ValueError(f'Either a video path or a `{VideoCapture.__name__}` instance must be passed!')
+    raise ValueError('Either a video path or a `VideoCapture` instance must be passed!')
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+__author__ = "Miguel Krasniqi"
+
+from typing import *
+
+import numpy as np
+from cv2.cv2 import VIDEOWRITER_PROP_QUALITY, VideoWriter, VideoWriter_fourcc
+
+import constants
+from exceptions import EncoderFailed
+from typing_types import PathStr
+from utils import pstr
+
+
+class OpenCVWriter:
+    """
+    Writes grayscale frames straight into a video using `cv2.VideoWriter`, without temporary images or an ffmpeg
+    binary. The video is opened once the size of the first frame is known.
+    
+    Frames with an odd width or height are padded with a light row or column, because the writer crops them otherwise.
+    The padding is at the right and bottom, so the modules stay where the decoder expects them.
+    """
+    
+    def __init__(
+            self,
+            output: PathStr,
+            *,
+            fourcc: str = constants.OPENCV_FOURCC,
+            fps: float = float(constants.DEFAULT_FFMPEG_OPTS["-framerate"]),
+            quality: int = 100,
+    ):
+        """
+        :param output: Path of the video.
+        :param fourcc: The codec, e.g. "FFV1" (lossless) or "MJPG".
+        :param fps: Frames per second.
+        :param quality: Quality of lossy codecs (0-100), e.g. of "MJPG".
+        """
+        self.output = pstr(output)
+        self.fourcc = fourcc
+        self.fps = fps
+        self.quality = quality
+        self.size: Optional[Tuple[int, int]] = None
+        self.frames = 0
+        self._writer: Optional[VideoWriter] = None
+    
+    def _open(self, width: int, height: int) -> None:
+        self.size = (width, height)
+        self._writer = VideoWriter(str(self.output), VideoWriter_fourcc(*self.fourcc), self.fps, self.size, False)
+        
+        if not self._writer.isOpened():
+            raise EncoderFailed(f'OpenCV can`t write "{self.output}" using the codec "{self.fourcc}"!')
+        
+        self._writer.set(VIDEOWRITER_PROP_QUALITY, self.quality)
+    
+    def write(self, frame: np.ndarray) -> None:
+        """Writes a grayscale frame (uint8), all frames must have the same size"""
+        height, width = frame.shape[:2]
+        if height % 2 or width % 2:
+            frame = np.pad(frame, ((0, height % 2), (0, width % 2)), constant_values=255)
+            height, width = frame.shape[:2]
+        
+        if self._writer is None:
+            self._open(width, height)
+        elif (width, height) != self.size:
+            raise EncoderFailed(f'All frames must have the same size! Expected {self.size}, got {(width, height)}.')
+        
+        self._writer.write(frame)
+        self.frames += 1
+    
+    def release(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()